@@ -1,1849 +1,3008 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-MCD图标工具 (IconForge Pro) V4.0 - 专业图标批量生成与处理套件
-作者：跳舞的火公子
-功能：批量处理、预设系统、撤销/重做、高级图像调整 (颜色叠加)、平台化输出模板。
-"""
-
-# ==============================================================================
-# SECTION 0: 核心依赖导入
-# ==============================================================================
-import sys
-import os
-import json
-import re       # [新增] 用于处理 SVG 文件内容的正则表达式
-import shutil   # [新增] 用于文件复制
-import zipfile  # [新增] 用于处理 ZIP 压缩文件
-from io import BytesIO
-from typing import List, Tuple, Optional, Dict, Any
-
-from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
-    QPushButton, QLabel, QLineEdit, QCheckBox, QFrame, QFileDialog,
-    QMessageBox, QGroupBox, QStatusBar, QSlider, QColorDialog, QRadioButton,
-    QButtonGroup, QDockWidget, QTabWidget, QListWidget, QListWidgetItem,
-    QAbstractItemView, QProgressDialog, QUndoStack, QUndoView, QUndoCommand,
-    QToolBar, QSizePolicy, QStackedWidget
-)
-from PyQt5.QtGui import QPixmap, QImage, QPainter, QColor, QIcon, QBrush
-from PyQt5.QtSvg import QSvgRenderer  # [核心修正] QSvgRenderer 属于 QtSvg 模块
-from PyQt5.QtCore import Qt, QSize, pyqtSignal, QRunnable, QObject, QThreadPool, QBuffer
-
-try:
-    from PIL import Image, ImageDraw, ImageFilter, ImageEnhance
-    PILLOW_AVAILABLE = True
-except ImportError:
-    # Pillow是核心依赖，没有它程序无法运行
-    print("严重错误: Pillow (PIL) 库未找到。程序无法运行。请运行: pip install Pillow")
-    sys.exit(1)
-
-try:
-    import requests  # [新增] 用于下载图标库文件
-except ImportError:
-    # requests 是自动下载功能的核心依赖，但我们可以让程序在没有它的情况下也能运行，只是功能降级
-    print("警告: requests 库未找到。'图标库自动下载'功能将被禁用。若要启用，请运行: pip install requests")
-    # 为了防止程序崩溃，我们可以在后面创建一个假的 requests 对象或在调用处检查
-    # 但更简单的做法是让依赖明确，如果需要自动下载，就必须安装。
-    # 这里我们选择让程序继续运行，并在需要下载时再处理错误。
-    pass
-
-# --- [核心修正] 移除顶层的 rembg 导入，改为在主窗口中异步加载 ---
-# 默认情况下，rembg 功能是不可用的，直到后台初始化成功。
-REMBG_AVAILABLE = False
-
-# ==============================================================================
-# SECTION 1: 数据模型与核心逻辑 (MODELS & CORE LOGIC)
-# ==============================================================================
-
-class IconGenerator:
-    """
-    核心图标生成器 (V4.0)，支持更复杂的处理链和批量操作。
-    [已修正] 支持 SVG 源文件输入、rembg 异步加载和独立的单尺寸ICO文件生成。
-    """
-    
-    def process_image(self, source_img: Image.Image, options: Dict[str, Any], remove_func: Optional[callable] = None) -> Image.Image:
-        """
-        [已重写] 根据指定的选项，对源图像进行一系列处理，包含高级效果。
-        处理顺序: 校正 -> 基础处理 -> 特效 -> 水印 -> 最终裁剪/塑形
-        """
-        img = source_img.copy().convert("RGBA")
-
-        # --- 阶段 1: 图像校正 ---
-        brightness = 1.0 + (options.get('adv_brightness', 0) / 100.0)
-        contrast = 1.0 + (options.get('adv_contrast', 0) / 100.0)
-        saturation = 1.0 + (options.get('adv_saturation', 0) / 100.0)
-
-        if brightness != 1.0: img = ImageEnhance.Brightness(img).enhance(brightness)
-        if contrast != 1.0: img = ImageEnhance.Contrast(img).enhance(contrast)
-        if saturation != 1.0: img = ImageEnhance.Color(img).enhance(saturation)
-
-        # --- 阶段 2: 核心处理 (背景和颜色) ---
-        if options.get('remove_bg') and REMBG_AVAILABLE and remove_func:
-            try: img = remove_func(img)
-            except Exception as e: print(f"背景移除失败: {e}")
-        
-        if options.get('bg_color'):
-            background = Image.new("RGBA", img.size, options['bg_color'])
-            background.paste(img, (0, 0), img)
-            img = background
-        
-        if options.get('color_overlay_enabled'):
-            overlay_color = options.get('color_overlay', '#ffffff')
-            overlay = Image.new("RGBA", img.size, overlay_color)
-            alpha = img.getchannel('A')
-            img.paste(overlay, (0,0), alpha)
-
-        # --- 阶段 3: 阴影与描边 ---
-        if options.get('adv_fx_enabled'):
-            alpha = img.getchannel('A')
-            
-            if options.get('adv_fx_mode') == 'shadow':
-                blur = options.get('adv_shadow_blur', 5)
-                offset_x = options.get('adv_shadow_offset_x', 5)
-                offset_y = options.get('adv_shadow_offset_y', 5)
-                color = options.get('adv_shadow_color', '#000000')
-
-                shadow = Image.new('RGBA', img.size, color)
-                shadow_alpha = alpha.filter(ImageFilter.GaussianBlur(blur))
-                
-                fx_canvas = Image.new('RGBA', (img.width + abs(offset_x) + blur*2, img.height + abs(offset_y) + blur*2), (0,0,0,0))
-                shadow_paste_pos = (blur + (offset_x if offset_x > 0 else 0), blur + (offset_y if offset_y > 0 else 0))
-                fx_canvas.paste(shadow, shadow_paste_pos, shadow_alpha)
-                img_paste_pos = (blur - (offset_x if offset_x < 0 else 0), blur - (offset_y if offset_y < 0 else 0))
-                fx_canvas.paste(img, img_paste_pos, img)
-                img = fx_canvas
-
-            elif options.get('adv_fx_mode') == 'stroke':
-                width = options.get('adv_stroke_width', 2)
-                color = options.get('adv_stroke_color', '#ffffff')
-
-                stroke_alpha = alpha
-                for _ in range(width):
-                    stroke_alpha = stroke_alpha.filter(ImageFilter.MaxFilter(3))
-                
-                stroke = Image.new('RGBA', img.size, color)
-                
-                fx_canvas = Image.new('RGBA', img.size, (0,0,0,0))
-                fx_canvas.paste(stroke, (0,0), stroke_alpha)
-                fx_canvas.paste(img, (0,0), img)
-                img = fx_canvas
-
-        # --- 阶段 4: 尺寸与内边距 ---
-        padding = options.get('padding', 0)
-        if padding > 0:
-            target_size_inner = max(img.width, img.height)
-            new_size = int(target_size_inner / (1 - (padding / 100)))
-            padded_img = Image.new("RGBA", (new_size, new_size), (0, 0, 0, 0))
-            paste_pos = ((new_size - img.width) // 2, (new_size - img.height) // 2)
-            padded_img.paste(img, paste_pos, img)
-            img = padded_img
-
-        # --- 阶段 5: 水印 ---
-        if options.get('adv_watermark_enabled') and options.get('adv_watermark_path'):
-            watermark_path = options.get('adv_watermark_path')
-            if os.path.exists(watermark_path):
-                try:
-                    watermark = Image.open(watermark_path).convert("RGBA")
-                    
-                    wm_size_perc = options.get('adv_watermark_size', 20) / 100.0
-                    base_size = min(img.width, img.height)
-                    new_wm_width = int(base_size * wm_size_perc)
-                    wm_ratio = watermark.height / watermark.width
-                    new_wm_height = int(new_wm_width * wm_ratio)
-                    watermark = watermark.resize((new_wm_width, new_wm_height), Image.LANCZOS)
-                    
-                    opacity_perc = options.get('adv_watermark_opacity', 50)
-                    if opacity_perc < 100:
-                        alpha = watermark.getchannel('A')
-                        alpha = ImageEnhance.Brightness(alpha).enhance(opacity_perc / 100.0)
-                        watermark.putalpha(alpha)
-                    
-                    pos_map = {
-                        'top_left': (0, 0), 'top_center': ((img.width - new_wm_width)//2, 0), 'top_right': (img.width - new_wm_width, 0),
-                        'mid_left': (0, (img.height - new_wm_height)//2), 'center': ((img.width - new_wm_width)//2, (img.height - new_wm_height)//2), 'mid_right': (img.width - new_wm_width, (img.height - new_wm_height)//2),
-                        'bottom_left': (0, img.height - new_wm_height), 'bottom_center': ((img.width - new_wm_width)//2, img.height - new_wm_height), 'bottom_right': (img.width - new_wm_width, img.height - new_wm_height)
-                    }
-                    pos = pos_map.get(options.get('adv_watermark_pos'), 'bottom_right')
-                    
-                    img.paste(watermark, pos, watermark)
-                except Exception as e:
-                    print(f"应用水印失败: {e}")
-
-        # --- 阶段 6: 最终塑形 (圆角) ---
-        radius_percent = options.get('radius', 0)
-        if radius_percent > 0:
-            radius = int(min(img.width, img.height) * (radius_percent / 100) / 2)
-            if radius > 0:
-                mask = Image.new("L", img.size, 0)
-                draw = ImageDraw.Draw(mask)
-                draw.rounded_rectangle((0, 0) + img.size, radius, fill=255)
-                img.putalpha(mask)
-
-        return img
-
-
-    def _generate_svg(self, source_path: str, output_dir: str, base_name: str, options: Dict[str, Any]):
-        """
-        [新增] 专门处理 SVG 到 SVG 的生成。
-        仅支持颜色叠加，忽略其他所有光栅效果。
-        """
-        output_file = os.path.join(output_dir, f"{base_name}.svg")
-        
-        # 如果未启用颜色叠加，直接复制源文件
-        if not options.get('color_overlay_enabled'):
-            shutil.copy2(source_path, output_file)
-            return
-
-        # 如果启用了颜色叠加，读取 SVG 内容并替换颜色
-        try:
-            with open(source_path, 'r', encoding='utf-8') as f:
-                svg_content = f.read()
-            
-            new_color = options.get('color_overlay', '#000000')
-            
-            # 使用正则表达式替换 fill 和 stroke 属性中的颜色
-            # 这个正则表达式会避免替换 "none" 或 "url(...)"
-            svg_content = re.sub(r'fill="(?!(none|url))[^\"]+"', f'fill="{new_color}"', svg_content)
-            svg_content = re.sub(r'stroke="(?!(none|url))[^\"]+"', f'stroke="{new_color}"', svg_content)
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(svg_content)
-
-        except Exception as e:
-            raise IOError(f"处理 SVG 文件 '{os.path.basename(source_path)}' 失败: {e}")
-    def generate(self, source_path: str, output_dir: str, base_name: str, options: Dict[str, Any], remove_func: Optional[callable] = None):
-        """
-        [已重构] 生成图标的主入口点。
-        - 支持 SVG 源文件输入。
-        - 接收 remove_func 以支持异步加载。
-        - ICO格式现在会为每个选定的尺寸生成一个单独的文件。
-        - [新增] 增加了对 SVG 输出格式的特殊处理分支。
-        """
-        fmt = options.get('format', 'ico')
-        
-        # 确保输出目录存在
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-        # --- [核心修正] SVG 输出的独立处理路径 ---
-        if fmt == 'svg':
-            # SVG输出格式仅在源文件也是SVG时有效
-            if not source_path.lower().endswith('.svg'):
-                raise ValueError("SVG输出格式仅支持SVG源文件。")
-            
-            # 调用专门的SVG处理方法，该方法仅处理颜色替换
-            self._generate_svg(source_path, output_dir, base_name, options)
-            return # SVG 处理完毕，直接返回，不执行后续的光栅化操作
-
-        # --- 原有的光栅图像处理路径 (ICO, ICNS, PNG) ---
-        # 步骤 1: 将源文件（无论是SVG还是位图）加载为 Pillow Image 对象
-        if source_path.lower().endswith('.svg'):
-            renderer = QSvgRenderer(source_path)
-            # 渲染到一个足够大的 QPixmap (例如 1024x1024) 以保留矢量细节
-            pixmap = QPixmap(1024, 1024)
-            pixmap.fill(Qt.transparent)
-            painter = QPainter(pixmap)
-            renderer.render(painter)
-            painter.end()
-            
-            # 将 QPixmap 转换为 Pillow Image 以便后续处理
-            buffer = QBuffer()
-            buffer.open(QBuffer.ReadWrite)
-            pixmap.save(buffer, "PNG")
-            source_img = Image.open(BytesIO(buffer.data()))
-        else:
-            # 原有的位图文件处理逻辑
-            source_img = Image.open(source_path)
-        
-        # 步骤 2: 对加载好的 Pillow Image 进行所有光栅效果处理
-        processed_img = self.process_image(source_img, options, remove_func)
-        
-        # 步骤 3: 根据目标格式保存处理后的图像
-        sizes = options.get('sizes', [])
-
-        if fmt == 'ico':
-            if not sizes: raise ValueError("ICO 格式必须至少选择一个尺寸。")
-            for size_tuple in sizes:
-                size = size_tuple[0]
-                resized_img = processed_img.resize((size, size), Image.LANCZOS)
-                filename = os.path.join(output_dir, f"{base_name}_{size}x{size}.ico")
-                resized_img.save(filename, format='ICO')
-        
-        elif fmt == 'icns':
-            output_file = os.path.join(output_dir, f"{base_name}.icns")
-            processed_img.save(output_file, format='ICNS')
-            
-        elif fmt == 'png_suite':
-            if not sizes: raise ValueError("PNG套件必须至少选择一个尺寸。")
-            for size_tuple in sizes:
-                size = size_tuple[0]
-                resized_img = processed_img.resize((size, size), Image.LANCZOS)
-                filename = os.path.join(output_dir, f"{base_name}_{size}x{size}.png")
-                resized_img.save(filename, format='PNG')
-        else:
-            # 如果程序执行到这里，说明是一个未知的非SVG格式
-            raise ValueError(f"不支持的输出格式: {fmt}")
-
-
-class GenerateWorker(QRunnable):
-    """
-    [已修正] 在后台线程中执行批量生成任务。
-    现在会接收并传递 remove_func 以支持异步加载的 rembg。
-    """
-    class Signals(QObject):
-        progress = pyqtSignal(int, int, str)
-        finished = pyqtSignal(str)
-        error = pyqtSignal(str)
-
-    def __init__(self, generator: IconGenerator, batch: List[str], output_path: str, options: Dict[str, Any], remove_func: Optional[callable]):
-        super().__init__()
-        self.signals = self.Signals()
-        self.generator = generator
-        self.batch = batch
-        self.output_path = output_path
-        self.options = options
-        # [核心修正] 存储从主线程传入的 rembg 的 remove 函数
-        self.remove_func = remove_func
-        self.is_cancelled = False
-
-    def cancel(self):
-        """设置取消标志，以请求中断任务。"""
-        self.is_cancelled = True
-
-    def run(self):
-        try:
-            total = len(self.batch)
-            fmt = self.options.get('format')
-            is_batch = total > 1
-            
-            # 采用更健壮的方式来确定输出目录 (output_dir)
-            if is_batch or fmt == 'png_suite':
-                output_dir = self.output_path
-            else:
-                output_dir = os.path.dirname(self.output_path)
-            
-            for i, source_path in enumerate(self.batch):
-                if self.is_cancelled:
-                    self.signals.finished.emit("操作已取消。")
-                    return
-                
-                base_name = os.path.splitext(os.path.basename(source_path))[0]
-
-                # 如果是单文件 ico/icns，base_name 需要被重写为用户指定的文件名
-                if not is_batch and fmt in ['ico', 'icns']:
-                    base_name = os.path.splitext(os.path.basename(self.output_path))[0]
-
-                self.signals.progress.emit(i, total, base_name)
-                
-                # [核心修正] 将存储的 remove_func 传递给 generate 方法
-                self.generator.generate(source_path, output_dir, base_name, self.options, self.remove_func)
-            
-            self.signals.finished.emit(f"成功生成 {total} 个图标批次到:\n{output_dir}")
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            self.signals.error.emit(str(e))
-class ThumbnailWorker(QRunnable):
-    """在后台线程中为列表项生成缩略图。"""
-    class Signals(QObject):
-        finished = pyqtSignal(QListWidgetItem, QIcon)
-
-    def __init__(self, item: QListWidgetItem, source_path: str, size: QSize):
-        super().__init__()
-        self.signals = self.Signals()
-        self.item = item
-        self.source_path = source_path
-        self.size = size
-
-    def run(self):
-        try:
-            # [核心修正] 增加对 SVG 的处理
-            if self.source_path.lower().endswith('.svg'):
-                # 使用 Qt 的原生 SVG 渲染器
-                renderer = QSvgRenderer(self.source_path)
-                qimage = QImage(self.size, QImage.Format_ARGB32)
-                qimage.fill(Qt.transparent)
-                painter = QPainter(qimage)
-                renderer.render(painter)
-                painter.end() # 必须在 QImage 被使用前结束绘制
-                pixmap = QPixmap.fromImage(qimage)
-            else:
-                # 保持对 PNG/JPG 的原有处理逻辑
-                img = Image.open(self.source_path)
-                img.thumbnail((self.size.width(), self.size.height()), Image.LANCZOS)
-                buffer = BytesIO()
-                img.save(buffer, "PNG")
-                qimage = QImage.fromData(buffer.getvalue())
-                pixmap = QPixmap.fromImage(qimage)
-            
-            icon = QIcon(pixmap)
-            self.signals.finished.emit(self.item, icon)
-        except Exception as e:
-            print(f"为 {os.path.basename(self.source_path)} 生成缩略图失败: {e}")
-
-class RembgInitializer(QRunnable):
-    """在后台线程中安全地初始化rembg库，避免阻塞UI。"""
-    class Signals(QObject):
-        # 信号：(初始化是否成功, 成功时返回的 remove 函数)
-        finished = pyqtSignal(bool, object)
-
-    def __init__(self):
-        super().__init__()
-        self.signals = self.Signals()
-
-    def run(self):
-        """尝试导入 rembg。这可能会触发模型下载。"""
-        try:
-            from rembg import remove
-            # 成功，发射带有 True 和 remove 函数的信号
-            self.signals.finished.emit(True, remove)
-        except Exception as e:
-            print(f"Rembg 初始化失败: {e}")
-            # 失败，发射带有 False 和 None 的信号
-            self.signals.finished.emit(False, None)
-
-class LibraryScanner(QRunnable):
-    """
-    [最终修正版] 在后台扫描本地的图标库目录，现在支持 SVG 文件。
-    """
-    class Signals(QObject):
-        finished = pyqtSignal(dict)
-        # [核心修正] 恢复 progress 信号，以修复 AttributeError
-        progress = pyqtSignal(int, int, str)
-
-    def __init__(self, library_path="icon_library"):
-        super().__init__()
-        self.signals = self.Signals()
-        self.library_path = library_path
-
-    def run(self):
-        """直接扫描本地目录并构建索引。"""
-        icon_library = {}
-        if not os.path.isdir(self.library_path):
-            print(f"提示: 图标库目录 '{self.library_path}' 未找到。请根据说明手动创建并填充。")
-            self.signals.finished.emit({})
-            return
-
-        try:
-            # 因为 lucide 的 svg 是扁平结构，我们不再寻找子目录
-            self.signals.progress.emit(0, 100, "正在扫描图标库...")
-            icons = []
-            all_files = os.listdir(self.library_path)
-            total_files = len(all_files)
-            
-            for i, icon_file in enumerate(sorted(all_files)):
-                if icon_file.lower().endswith('.svg'):
-                    icons.append(os.path.join(self.library_path, icon_file))
-                # [核心修正] 在扫描时发射进度信号
-                if total_files > 0:
-                    progress = int((i + 1) / total_files * 100)
-                    self.signals.progress.emit(progress, 100, "正在扫描图标库...")
-
-            if icons:
-                icon_library["通用图标"] = icons
-            
-            self.signals.finished.emit(icon_library)
-
-        except Exception as e:
-            print(f"扫描图标库时出错: {e}")
-            self.signals.finished.emit({})
-
-
-
-
-
-
-
-
-
-
-
-# ==============================================================================
-# SECTION 2: QT 特定模型与命令 (QT MODELS & COMMANDS)
-# ==============================================================================
-class ModifyOptionsCommand(QUndoCommand):
-    """一个用于记录处理选项修改的 QUndoCommand。"""
-    def __init__(self, main_window: 'IconForgeWindow', key: str, new_value: Any, description: str):
-        super().__init__(description)
-        self.main = main_window
-        self.key = key
-        self.new_value = new_value
-        self.old_value = self.main.current_options[key]
-
-    def redo(self):
-        self.main.current_options[self.key] = self.new_value
-        self.main._update_ui_from_options()
-        self.main._update_realtime_preview()
-
-    def undo(self):
-        self.main.current_options[self.key] = self.old_value
-        self.main._update_ui_from_options()
-        self.main._update_realtime_preview()
-
-# ==============================================================================
-# SECTION 3: 主窗口与控制器 (MAIN WINDOW & CONTROLLER)
-# ==============================================================================
-class Theme:
-    """管理应用程序的颜色和全局样式表 (QSS)。"""
-    LIGHT = {
-        "bg-primary": "#f8fafc", "bg-secondary": "#ffffff", "bg-tertiary": "#f1f5f9",
-        "content-primary": "#0f172a", "content-secondary": "#64748b",
-        "accent-primary": "#4f46e5", "accent-primary-hover": "#6366f1", "accent-primary-pressed": "#4338ca",
-        "border-primary": "#e2e8f0", "danger": "#ef4444", "success": "#22c55e",
-        "warning": "#f59e0b", "info": "#3b82f6"
-    }
-    @staticmethod
-    def get_qss() -> str:
-        colors = Theme.LIGHT
-        return f"""
-            QMainWindow, QStatusBar, QDockWidget {{
-                background-color: {colors['bg-primary']};
-            }}
-            QToolBar {{
-                background-color: {colors['accent-primary']};
-                border: none;
-                padding: 0px;
-                spacing: 10px;
-            }}
-            QLabel#NavTitleLabel {{
-                color: white;
-                font-size: 16pt;
-                font-weight: bold;
-                padding-left: 10px;
-            }}
-            QTabWidget::pane {{
-                border: none;
-            }}
-            QTabBar::tab {{
-                background: transparent;
-                color: {colors['content-secondary']};
-                padding: 8px 15px;
-                border-bottom: 2px solid transparent;
-                font-weight: bold;
-            }}
-            QTabBar::tab:hover {{
-                color: {colors['content-primary']};
-            }}
-            QTabBar::tab:selected {{
-                color: {colors['accent-primary']};
-                border-bottom: 2px solid {colors['accent-primary']};
-            }}
-            QListWidget {{
-                background-color: {colors['bg-secondary']};
-                border: 1px solid {colors['border-primary']};
-                border-radius: 4px;
-            }}
-            QListWidget::item:selected {{
-                background-color: {colors['accent-primary']};
-                color: white;
-            }}
-            QPushButton {{
-                border: none;
-                padding: 8px 12px;
-                border-radius: 4px;
-                font-weight: bold;
-                font-size: 10pt;
-            }}
-            QPushButton[cssClass="toolbar"] {{
-                background-color: {colors['accent-primary-hover']};
-                color: white;
-                padding: 8px 14px;
-            }}
-            QPushButton[cssClass="toolbar"]:hover {{
-                background-color: {colors['accent-primary-pressed']};
-            }}
-            QPushButton#PrimaryButton {{
-                background-color: {colors['success']};
-                color: white;
-                font-size: 11pt;
-                padding: 12px;
-            }}
-            QPushButton#PrimaryButton:hover {{
-                background-color: #16a34a;
-            }}
-            QSlider::groove:horizontal {{
-                border: 1px solid #bbb;
-                background: white;
-                height: 8px;
-                border-radius: 4px;
-            }}
-            QSlider::handle:horizontal {{
-                background: {colors['accent-primary']};
-                border: 1px solid {colors['accent-primary']};
-                width: 16px;
-                margin: -4px 0;
-                border-radius: 8px;
-            }}
-            QLineEdit {{
-                border: 1px solid {colors['border-primary']};
-                border-radius: 4px;
-                padding: 5px;
-            }}
-        """
-
-class CardWidget(QFrame):
-    """一个可重用的、带标题的卡片式布局容器。"""
-    def __init__(self, title: str, parent: Optional[QWidget] = None):
-        super().__init__(parent)
-        self.theme = Theme.LIGHT
-        main_layout = QVBoxLayout(self)
-        main_layout.setContentsMargins(1, 1, 1, 1)
-        main_layout.setSpacing(0)
-        
-        self.title_bar = QLabel(title)
-        self._content_widget = QWidget()
-        
-        main_layout.addWidget(self.title_bar)
-        main_layout.addWidget(self._content_widget, 1)
-        
-        self.setObjectName("CardWidget")
-        self.setStyleSheet(f"""
-            #CardWidget {{
-                background-color: {self.theme['bg-secondary']};
-                border: 1px solid {self.theme['border-primary']};
-                border-radius: 6px;
-            }}
-        """)
-        self.title_bar.setStyleSheet(f"""
-            QLabel {{
-                background-color: {self.theme['bg-tertiary']};
-                color: {self.theme['content-primary']};
-                padding: 10px 15px;
-                border-top-left-radius: 6px;
-                border-top-right-radius: 6px;
-                border-bottom: 1px solid {self.theme['border-primary']};
-                font-size: 11pt;
-                font-weight: bold;
-            }}
-        """)
-    def contentWidget(self) -> QWidget:
-        return self._content_widget
-class EmptyListWidget(QWidget):
-    """
-    当列表为空时显示的引导性Widget。
-    [已升级] 文件夹图标现在可以点击，并会发射一个信号。
-    """
-    # 1. 定义一个自定义信号，当图标被点击时发射
-    folder_icon_clicked = pyqtSignal()
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        layout = QVBoxLayout(self)
-        layout.setAlignment(Qt.AlignCenter)
-        layout.setSpacing(15)
-
-        # 2. 将原来的 QLabel 换成 QPushButton
-        self.icon_button = QPushButton("📂")
-        # 3. 为按钮设置样式，让它看起来像一个无边框的图标，并在悬停时显示手形光标
-        self.icon_button.setCursor(Qt.PointingHandCursor)
-        self.icon_button.setStyleSheet("""
-            QPushButton {
-                font-size: 48pt;
-                border: none;
-                background: transparent;
-                padding: 10px;
-            }
-            QPushButton:hover {
-                /* 可以添加一个轻微的背景色来提示可点击 */
-                background-color: #f0f0f0;
-                border-radius: 8px;
-            }
-        """)
-        
-        text_label = QLabel("列表为空")
-        text_label.setStyleSheet(f"color: {Theme.LIGHT['content-primary']}; font-size: 14pt; font-weight: bold;")
-        
-        info_label = QLabel("将文件/文件夹拖拽到此处\n或点击上方图标及顶部工具栏按钮添加")
-        info_label.setAlignment(Qt.AlignCenter)
-        info_label.setStyleSheet(f"color: {Theme.LIGHT['content-secondary']};")
-
-        # 4. 将按钮的 clicked 信号连接到我们自定义信号的 emit() 方法
-        self.icon_button.clicked.connect(self.folder_icon_clicked.emit)
-
-        # 5. 将新的按钮添加到布局中
-        layout.addWidget(self.icon_button, alignment=Qt.AlignCenter)
-        layout.addWidget(text_label, alignment=Qt.AlignCenter)
-        layout.addWidget(info_label, alignment=Qt.AlignCenter)
-
-
-class IconForgeWindow(QMainWindow):
-    """应用程序的主窗口 V4.0。"""
-    
-    PLATFORM_TEMPLATES = {
-        "Windows (.ico)": {'sizes': [16, 24, 32, 48, 256], 'format': 'ico'},
-        "macOS (.icns)": {'sizes': [], 'format': 'icns'},
-        "Android Adaptive": {'sizes': [48, 72, 96, 144, 192, 512], 'format': 'png_suite'},
-        "iOS AppIcon": {'sizes': [20, 29, 40, 58, 60, 76, 80, 87, 120, 152, 167, 180, 1024], 'format': 'png_suite'},
-        "Vector (.svg)": {'sizes': [], 'format': 'svg'} # [新增] SVG 模板
-    }
-    def __init__(self):
-        super().__init__()
-        self.icon_generator = IconGenerator()
-        self.batch_items: List[str] = []
-        self.presets: Dict[str, Dict] = {}
-        self.current_options: Dict[str, Any] = self._get_default_options()
-        self.undo_stack = QUndoStack(self)
-        self.setAcceptDrops(True)
-        self.thread_pool = QThreadPool.globalInstance()
-        self.active_workers = [] 
-        # [新增] 定义内置样本图片的路径，用于生成预设预览
-        self.preview_sample_path = "preview_sample.png"
-
-        # [核心修正] 用于存储异步加载成功的 rembg.remove 函数
-        self.rembg_remove_func: Optional[callable] = None
-        # [核心修正] 用于存储已加载水印图片的 Pillow Image 对象
-        self.watermark_image: Optional[Image.Image] = None
-        # [核心修正] 用于追踪当前加载的水印图片的文件路径
-        self.watermark_image_path: str = ""
-        self.icon_library_data: Dict[str, List[str]] = {}
-
-        self.setWindowTitle("MCD图标工具 (IconForge Pro) V4.0")
-        self.setGeometry(100, 100, 1300, 850)
-        self.setStyleSheet(Theme.get_qss())
-
-        self._create_toolbar()
-        self._create_central_widget()
-        self._create_docks()
-        self._create_statusbar()
-        self._connect_signals()
-        
-        self.setDockOptions(QMainWindow.AnimatedDocks | QMainWindow.AllowNestedDocks)
-        self.setTabPosition(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea, QTabWidget.North)
-        self._load_presets()
-
-        # [核心修正] 在UI完全加载后，启动 rembg 后台初始化
-        self._initialize_rembg_async()
-        self._initialize_library_async()
-    
-    # --- 添加一个新的方法 ---
-    def _initialize_rembg_async(self):
-        """启动一个后台任务来加载 rembg 库。"""
-        self.statusBar().showMessage("正在初始化背景移除模块，请稍候...")
-        self.remove_bg_cb.setEnabled(False)
-        self.remove_bg_cb.setToolTip("正在加载 rembg 模块...")
-
-        worker = RembgInitializer()
-        worker.signals.finished.connect(self._on_rembg_initialized)
-        
-        # [核心修正] 将 worker 添加到 active_workers 列表以保持其存活
-        self.active_workers.append(worker)
-        worker.signals.finished.connect(lambda: self.active_workers.remove(worker)) # 任务完成后自动移除
-
-        self.thread_pool.start(worker)
-
-    # --- 添加一个新的槽函数 ---
-    def _on_rembg_initialized(self, success: bool, remove_function: Optional[callable]):
-        """当 rembg 初始化完成后，此槽函数被调用。"""
-        global REMBG_AVAILABLE
-        if success:
-            REMBG_AVAILABLE = True
-            self.rembg_remove_func = remove_function
-            self.remove_bg_cb.setEnabled(True)
-            self.remove_bg_cb.setToolTip("启用或禁用背景移除功能 (由 rembg 提供)")
-            self.statusBar().showMessage("背景移除功能已准备就绪。", 5000)
-        else:
-            REMBG_AVAILABLE = False
-            self.remove_bg_cb.setToolTip("rembg 模块加载失败，此功能不可用。")
-            self.statusBar().showMessage("背景移除模块加载失败。", 5000)
-
-    def _initialize_library_async(self):
-        """
-        [已修正] 启动一个后台任务来扫描本地图标库。
-        现在会正确管理 worker 的生命周期，防止其被意外销毁。
-        """
-        self.statusBar().showMessage("正在加载图标库...")
-        
-        worker = LibraryScanner()
-        worker.signals.finished.connect(self._on_library_loaded)
-        worker.signals.progress.connect(lambda cur, tot, msg: self.statusBar().showMessage(msg))
-        
-        # [核心修正] 将 worker 添加到 active_workers 列表以保持其存活，
-        # 并在其任务完成后（finished信号发出时）自动从列表中移除。
-        self.active_workers.append(worker)
-        worker.signals.finished.connect(lambda: self.active_workers.remove(worker))
-
-        self.thread_pool.start(worker)
-    def _on_library_progress(self, current, total, message):
-        """更新图标库下载/解压的进度对话框。"""
-        if hasattr(self, 'library_progress_dialog'):
-            self.library_progress_dialog.setMaximum(total)
-            self.library_progress_dialog.setValue(current)
-            self.library_progress_dialog.setLabelText(message)
-    def _on_library_loaded(self, library_data: dict):
-        """当图标库扫描完成后，此槽函数被调用。"""
-        self.icon_library_data = library_data
-        if not library_data:
-            self.statusBar().showMessage("图标库为空或未找到。", 5000)
-            # 可以在“图标库”选项卡中显示一个“空”状态的提示
-            return
-        
-        self.library_categories.clear()
-        self.library_categories.addItems(self.icon_library_data.keys())
-        # 默认选中第一个分类并加载其图标
-        if self.library_categories.count() > 0:
-            self.library_categories.setCurrentRow(0)
-        
-        self.statusBar().showMessage("图标库已加载。", 5000)
-
-    def _on_library_category_changed(self):
-        """当用户选择一个新的图标分类时，更新右侧的图标展示区。"""
-        self.library_icons.clear()
-        selected_item = self.library_categories.currentItem()
-        if not selected_item:
-            return
-            
-        category = selected_item.text()
-        if category in self.icon_library_data:
-            icon_paths = self.icon_library_data[category]
-            for path in icon_paths:
-                # 创建列表项，但不立即加载图标
-                item = QListWidgetItem(os.path.splitext(os.path.basename(path))[0])
-                item.setData(Qt.UserRole, path)
-                item.setToolTip(path)
-                # 先设置一个占位符或留空
-                self.library_icons.addItem(item)
-                # 启动后台工作器来异步加载缩略图
-                worker = ThumbnailWorker(item, path, self.library_icons.iconSize())
-                worker.signals.finished.connect(self._on_thumbnail_ready) # 复用已有的槽函数
-                self.thread_pool.start(worker)
-
-    def _on_library_icon_activated(self, item: QListWidgetItem):
-        """当用户双击图标库中的一个图标时，将其添加到“我的文件”列表。"""
-        icon_path = item.data(Qt.UserRole)
-        if icon_path:
-            # 1. 添加文件到处理批次
-            self._add_files_to_batch([icon_path])
-            
-            # 2. 切换到“我的文件”选项卡
-            self.source_tabs.setCurrentIndex(0) # 假设“我的文件”是第一个选项卡
-            
-            # 3. 在列表中找到并选中刚刚添加的项
-            # (这是一个小优化，确保用户能立即看到它)
-            for i in range(self.batch_list.count()):
-                list_item = self.batch_list.item(i)
-                if list_item.data(Qt.UserRole) == icon_path:
-                    self.batch_list.setCurrentItem(list_item)
-                    break
-    # --- UI 创建辅助函数 ---
-    def _create_toolbar(self):
-        toolbar = QToolBar("主工具栏")
-        toolbar.setMovable(False)
-        title = QLabel("MCD图标工具   作者：跳舞的火公子")
-        title.setObjectName("NavTitleLabel")
-        toolbar.addWidget(title)
-        
-        spacer = QWidget()
-        spacer.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        toolbar.addWidget(spacer)
-        
-        self.add_files_btn = QPushButton("添加文件")
-        self.add_folder_btn = QPushButton("添加文件夹")
-        self.clear_batch_btn = QPushButton("清空列表")
-        for btn in [self.add_files_btn, self.add_folder_btn, self.clear_batch_btn]:
-            btn.setProperty("cssClass", "toolbar")
-            toolbar.addWidget(btn)
-        self.addToolBar(toolbar)
-
-    def _create_central_widget(self):
-        main_widget = QWidget()
-        layout = QVBoxLayout(main_widget)
-        layout.setSpacing(0)
-        layout.setContentsMargins(0, 0, 0, 0)
-        
-        self.central_header = QLabel("未选择文件")
-        self.central_header.setFixedHeight(40)
-        self.central_header.setStyleSheet(f"""
-            background-color: {Theme.LIGHT['bg-secondary']};
-            padding-left: 15px;
-            font-weight: bold;
-            border-bottom: 1px solid {Theme.LIGHT['border-primary']};
-        """)
-        
-        self.main_preview = QLabel("请从左侧列表选择一张图片")
-        self.main_preview.setAlignment(Qt.AlignCenter)
-        self.main_preview.setStyleSheet(f"background-color: {Theme.LIGHT['bg-tertiary']};")
-        
-        layout.addWidget(self.central_header)
-        layout.addWidget(self.main_preview, 1)
-        self.setCentralWidget(main_widget)
-
-    def _create_docks(self):
-        """
-        [已重写] 创建左右两侧的可停靠面板。
-        左侧源浏览器现在包含“我的文件”和“图标库”两个选项卡。
-        """
-        # --- 左侧：源浏览器 ---
-        left_dock = QDockWidget("源浏览器", self)
-        left_dock.setAllowedAreas(Qt.LeftDockWidgetArea)
-        left_dock.setMinimumWidth(320) # 稍微加宽以容纳新UI
-        left_dock.setTitleBarWidget(QWidget())
-        left_dock.setFeatures(QDockWidget.NoDockWidgetFeatures)
-
-        # 创建一个包含选项卡和内容区域的容器
-        left_dock_content = QWidget()
-        left_layout = QVBoxLayout(left_dock_content)
-        left_layout.setSpacing(0)
-        left_layout.setContentsMargins(0, 0, 0, 0)
-        
-        # 1. [新增] 创建顶部选项卡栏
-        self.source_tabs = QTabWidget()
-        left_layout.addWidget(self.source_tabs)
-        
-        # --- 选项卡1: 我的文件 ---
-        my_files_widget = QWidget()
-        my_files_layout = QVBoxLayout(my_files_widget)
-        my_files_layout.setContentsMargins(0,0,0,0)
-        
-        # 使用 QStackedWidget 来切换“空列表”和“文件列表”
-        self.left_stack = QStackedWidget()
-        self.empty_list_widget = EmptyListWidget()
-        self.empty_list_widget.folder_icon_clicked.connect(self._add_folder_to_batch)
-        self.batch_list = QListWidget()
-        self.batch_list.setIconSize(QSize(48, 48))
-        self.batch_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
-        self.left_stack.addWidget(self.empty_list_widget)
-        self.left_stack.addWidget(self.batch_list)
-        
-        my_files_layout.addWidget(self.left_stack)
-        self.source_tabs.addTab(my_files_widget, "我的文件")
-        self.left_stack.setCurrentWidget(self.empty_list_widget)
-
-        # --- [新增] 选项卡2: 图标库 ---
-        library_widget = QWidget()
-        library_layout = QHBoxLayout(library_widget)
-        library_layout.setSpacing(5)
-        
-        # 图标库左侧：分类列表
-        self.library_categories = QListWidget()
-        self.library_categories.setMaximumWidth(120)
-        
-        # 图标库右侧：图标展示区
-        self.library_icons = QListWidget()
-        self.library_icons.setViewMode(QListWidget.IconMode)
-        self.library_icons.setIconSize(QSize(64, 64))
-        self.library_icons.setResizeMode(QListWidget.Adjust)
-        self.library_icons.setSpacing(10)
-        
-        library_layout.addWidget(self.library_categories)
-        library_layout.addWidget(self.library_icons)
-        self.source_tabs.addTab(library_widget, "图标库")
-
-        # --- 最终设置 ---
-        left_dock.setWidget(left_dock_content)
-        self.addDockWidget(Qt.LeftDockWidgetArea, left_dock)
-
-        # --- 右侧：属性检查器 (保持不变) ---
-        right_dock = QDockWidget("属性检查器", self)
-        right_dock.setAllowedAreas(Qt.RightDockWidgetArea)
-        right_dock.setMinimumWidth(380)
-        right_dock.setTitleBarWidget(QWidget())
-        right_dock.setFeatures(QDockWidget.NoDockWidgetFeatures)
-        
-        self.inspector_tabs = QTabWidget()
-        self._create_process_tab()
-        self._create_output_tab()
-        self._create_presets_tab()
-        self._create_history_tab()
-        
-        right_dock.setWidget(self.inspector_tabs)
-        self.addDockWidget(Qt.RightDockWidgetArea, right_dock)
-
-
-    def dragEnterEvent(self, event):
-        """处理文件拖拽进入主窗口区域的事件。"""
-        if event.mimeData().hasUrls():
-            event.acceptProposedAction()
-        else:
-            event.ignore()
-
-    def dropEvent(self, event):
-        """
-        处理文件在主窗口区域释放的事件。
-        [已修正] 增加了对拖拽 .svg 文件的支持。
-        """
-        urls = event.mimeData().urls()
-        files_to_add = []
-        
-        # [核心修正] 定义支持的文件扩展名元组
-        supported_extensions = ('.png', '.jpg', '.jpeg', '.bmp', '.svg')
-
-        for url in urls:
-            if url.isLocalFile():
-                path = url.toLocalFile()
-                if os.path.isdir(path):
-                    for f in os.listdir(path):
-                        # 使用 .endswith(supported_extensions) 进行检查
-                        if f.lower().endswith(supported_extensions):
-                            files_to_add.append(os.path.join(path, f))
-                # 使用 .endswith(supported_extensions) 进行检查
-                elif path.lower().endswith(supported_extensions):
-                    files_to_add.append(path)
-        
-        if files_to_add:
-            self._add_files_to_batch(files_to_add)
-
-    def _create_process_tab(self):
-        widget = QWidget()
-        layout = QVBoxLayout(widget)
-        layout.setSpacing(15)
-        layout.setContentsMargins(10, 15, 10, 10)
-
-        # --- 卡片1: 基础图像处理 (大部分不变) ---
-        base_card = CardWidget("图像处理")
-        proc_layout = QGridLayout(base_card.contentWidget())
-        
-        self.padding_slider, self.padding_label = self._create_slider_with_label(0, 0, 80, "%")
-        self.radius_slider, self.radius_label = self._create_slider_with_label(0, 0, 100, "%")
-        self.color_overlay_cb = QCheckBox("颜色叠加:")
-        self.color_overlay_btn = QPushButton()
-        self._update_color_btn(self.color_overlay_btn)
-        self.remove_bg_cb = QCheckBox("移除背景")
-        self.remove_bg_cb.setEnabled(False) # 初始禁用，等待异步加载
-        self.fill_bg_cb = QCheckBox("填充背景色:")
-        self.bg_color_btn = QPushButton()
-        self._update_color_btn(self.bg_color_btn, "#ffffff")
-
-        proc_layout.addWidget(QLabel("内边距:"), 0, 0); proc_layout.addWidget(self.padding_slider, 0, 1); proc_layout.addWidget(self.padding_label, 0, 2)
-        proc_layout.addWidget(QLabel("圆角半径:"), 1, 0); proc_layout.addWidget(self.radius_slider, 1, 1); proc_layout.addWidget(self.radius_label, 1, 2)
-        overlay_layout = QHBoxLayout(); overlay_layout.addWidget(self.color_overlay_cb); overlay_layout.addWidget(self.color_overlay_btn); overlay_layout.addStretch()
-        proc_layout.addLayout(overlay_layout, 2, 0, 1, 3)
-        proc_layout.addWidget(self.remove_bg_cb, 3, 0, 1, 3)
-        bg_layout = QHBoxLayout(); bg_layout.addWidget(self.fill_bg_cb); bg_layout.addWidget(self.bg_color_btn); bg_layout.addStretch()
-        proc_layout.addLayout(bg_layout, 4, 0, 1, 3)
-        
-        self.reset_options_btn = QPushButton("恢复默认")
-        reset_layout = QHBoxLayout(); reset_layout.addStretch(); reset_layout.addWidget(self.reset_options_btn)
-        proc_layout.addLayout(reset_layout, 5, 0, 1, 3)
-
-        self.color_overlay_btn.setEnabled(self.color_overlay_cb.isChecked())
-        self.bg_color_btn.setEnabled(self.fill_bg_cb.isChecked())
-
-        # --- [新增] 卡片2: 高级效果 ---
-        adv_card = CardWidget("高级效果")
-        adv_layout = QVBoxLayout(adv_card.contentWidget())
-
-        # 1. 图像校正组
-        correction_group = QGroupBox("图像校正")
-        correction_layout = QGridLayout(correction_group)
-        self.brightness_slider, self.brightness_label = self._create_slider_with_label(0, -100, 100, "%")
-        self.contrast_slider, self.contrast_label = self._create_slider_with_label(0, -100, 100, "%")
-        self.saturation_slider, self.saturation_label = self._create_slider_with_label(0, -100, 100, "%")
-        correction_layout.addWidget(QLabel("亮度:"), 0, 0); correction_layout.addWidget(self.brightness_slider, 0, 1); correction_layout.addWidget(self.brightness_label, 0, 2)
-        correction_layout.addWidget(QLabel("对比度:"), 1, 0); correction_layout.addWidget(self.contrast_slider, 1, 1); correction_layout.addWidget(self.contrast_label, 1, 2)
-        correction_layout.addWidget(QLabel("饱和度:"), 2, 0); correction_layout.addWidget(self.saturation_slider, 2, 1); correction_layout.addWidget(self.saturation_label, 2, 2)
-        
-        # 2. 阴影/描边组
-        # [核心修正] 使用 self.fx_group
-        self.fx_group = QGroupBox("阴影与描边")
-        self.fx_group.setCheckable(True) # 总开关
-        fx_layout = QVBoxLayout(self.fx_group)
-        
-        self.fx_mode_group = QButtonGroup(self)
-        self.fx_shadow_rb = QRadioButton("阴影")
-        self.fx_stroke_rb = QRadioButton("描边")
-        self.fx_mode_group.addButton(self.fx_shadow_rb, 0)
-        self.fx_mode_group.addButton(self.fx_stroke_rb, 1)
-        self.fx_shadow_rb.setChecked(True)
-        
-        mode_layout = QHBoxLayout(); mode_layout.addWidget(self.fx_shadow_rb); mode_layout.addWidget(self.fx_stroke_rb); mode_layout.addStretch()
-        
-        self.fx_stack = QStackedWidget()
-        
-        # 阴影设置面板
-        shadow_widget = QWidget()
-        shadow_layout = QGridLayout(shadow_widget)
-        self.shadow_color_btn = QPushButton(); self._update_color_btn(self.shadow_color_btn, "#000000")
-        self.shadow_blur_slider, self.shadow_blur_label = self._create_slider_with_label(5, 0, 20, "px")
-        self.shadow_x_slider, self.shadow_x_label = self._create_slider_with_label(5, -20, 20, "px")
-        self.shadow_y_slider, self.shadow_y_label = self._create_slider_with_label(5, -20, 20, "px")
-        shadow_layout.addWidget(QLabel("颜色:"), 0, 0); shadow_layout.addWidget(self.shadow_color_btn, 0, 1)
-        shadow_layout.addWidget(QLabel("模糊:"), 1, 0); shadow_layout.addWidget(self.shadow_blur_slider, 1, 1); shadow_layout.addWidget(self.shadow_blur_label, 1, 2)
-        shadow_layout.addWidget(QLabel("X偏移:"), 2, 0); shadow_layout.addWidget(self.shadow_x_slider, 2, 1); shadow_layout.addWidget(self.shadow_x_label, 2, 2)
-        shadow_layout.addWidget(QLabel("Y偏移:"), 3, 0); shadow_layout.addWidget(self.shadow_y_slider, 3, 1); shadow_layout.addWidget(self.shadow_y_label, 3, 2)
-        
-        # 描边设置面板
-        stroke_widget = QWidget()
-        stroke_layout = QGridLayout(stroke_widget)
-        self.stroke_color_btn = QPushButton(); self._update_color_btn(self.stroke_color_btn, "#FFFFFF")
-        self.stroke_width_slider, self.stroke_width_label = self._create_slider_with_label(2, 1, 10, "px")
-        stroke_layout.addWidget(QLabel("颜色:"), 0, 0); stroke_layout.addWidget(self.stroke_color_btn, 0, 1)
-        stroke_layout.addWidget(QLabel("宽度:"), 1, 0); stroke_layout.addWidget(self.stroke_width_slider, 1, 1); stroke_layout.addWidget(self.stroke_width_label, 1, 2)
-        
-        self.fx_stack.addWidget(shadow_widget)
-        self.fx_stack.addWidget(stroke_widget)
-        
-        fx_layout.addLayout(mode_layout)
-        fx_layout.addWidget(self.fx_stack)
-        self.fx_mode_group.buttonClicked.connect(lambda btn: self.fx_stack.setCurrentIndex(self.fx_mode_group.id(btn)))
-
-        # 3. 水印组
-        # [核心修正] 使用 self.watermark_group
-        self.watermark_group = QGroupBox("水印/角标")
-        self.watermark_group.setCheckable(True)
-        watermark_layout = QVBoxLayout(self.watermark_group)
-        
-        wm_file_layout = QHBoxLayout()
-        self.watermark_select_btn = QPushButton("选择图片...")
-        self.watermark_path_label = QLabel("未选择文件")
-        self.watermark_path_label.setStyleSheet("font-size: 8pt; color: grey;")
-        wm_file_layout.addWidget(self.watermark_select_btn)
-        wm_file_layout.addWidget(self.watermark_path_label, 1)
-        
-        wm_props_layout = QGridLayout()
-        self.watermark_size_slider, self.watermark_size_label = self._create_slider_with_label(20, 5, 50, "%")
-        self.watermark_opacity_slider, self.watermark_opacity_label = self._create_slider_with_label(50, 0, 100, "%")
-        wm_props_layout.addWidget(QLabel("大小:"), 0, 0); wm_props_layout.addWidget(self.watermark_size_slider, 0, 1); wm_props_layout.addWidget(self.watermark_size_label, 0, 2)
-        wm_props_layout.addWidget(QLabel("不透明度:"), 1, 0); wm_props_layout.addWidget(self.watermark_opacity_slider, 1, 1); wm_props_layout.addWidget(self.watermark_opacity_label, 1, 2)
-        
-        self.watermark_pos_group = QButtonGroup(self)
-        pos_grid = QGridLayout()
-        pos_names = ['top_left', 'top_center', 'top_right', 'mid_left', 'center', 'mid_right', 'bottom_left', 'bottom_center', 'bottom_right']
-        for i, name in enumerate(pos_names):
-            rb = QRadioButton(); rb.setFixedSize(20, 20)
-            self.watermark_pos_group.addButton(rb, i)
-            pos_grid.addWidget(rb, i // 3, i % 3)
-        self.watermark_pos_group.button(8).setChecked(True) # Default to bottom right
-
-        watermark_layout.addLayout(wm_file_layout)
-        watermark_layout.addLayout(wm_props_layout)
-        watermark_layout.addWidget(QLabel("位置:"))
-        watermark_layout.addLayout(pos_grid)
-        
-        adv_layout.addWidget(correction_group)
-        adv_layout.addWidget(self.fx_group)
-        adv_layout.addWidget(self.watermark_group)
-        
-        # 将所有卡片添加到主布局
-        layout.addWidget(base_card)
-        layout.addWidget(adv_card)
-        layout.addStretch()
-        self.inspector_tabs.addTab(widget, "🎨 处理")
-    def _create_output_tab(self):
-        """
-        [已重构] 创建“输出”选项卡，区分“生成当前”和“批量生成”操作。
-        [新增] 增加了对SVG导出模式的UI支持（警告标签和单列布局）。
-        """
-        widget = QWidget()
-        layout = QVBoxLayout(widget)
-        layout.setSpacing(15)
-        layout.setContentsMargins(10, 15, 10, 10)
-        
-        # --- 卡片1: 平台模板 ---
-        template_card = CardWidget("平台模板")
-        template_layout = QGridLayout(template_card.contentWidget())
-        self.template_group = QButtonGroup(self)
-        
-        # 遍历所有模板并创建单选按钮
-        for i, name in enumerate(self.PLATFORM_TEMPLATES.keys()):
-            radio = QRadioButton(name)
-            self.template_group.addButton(radio, i)
-            # [修正] 改为单列布局，以更好地适应新添加的模板选项
-            template_layout.addWidget(radio, i, 0)
-        
-        self.template_group.button(0).setChecked(True)
-
-        # [新增] SVG 模式下的警告标签
-        self.svg_warning_label = QLabel(
-            "ℹ️ SVG导出模式下，仅“颜色叠加”生效。\n源文件也必须是SVG。"
-        )
-        self.svg_warning_label.setStyleSheet(
-            f"color: {Theme.LIGHT['info']}; background-color: #eff6ff; "
-            f"border: 1px solid #dbeafe; border-radius: 4px; padding: 8px;"
-        )
-        self.svg_warning_label.setWordWrap(True)
-        self.svg_warning_label.hide() # 默认隐藏，由 _on_template_changed 控制显示
-        
-        # 将警告标签添加到模板列表的下方
-        template_layout.addWidget(self.svg_warning_label, len(self.PLATFORM_TEMPLATES), 0)
-
-        # --- 卡片2: 自定义尺寸 ---
-        sizes_card = CardWidget("自定义尺寸")
-        sizes_layout = QGridLayout(sizes_card.contentWidget())
-        self.size_checkboxes: Dict[int, QCheckBox] = {}
-        standard_sizes = [16, 24, 32, 48, 64, 128, 256, 512, 1024]
-        for i, size in enumerate(standard_sizes):
-            cb = QCheckBox(f"{size}x{size}")
-            self.size_checkboxes[size] = cb
-            sizes_layout.addWidget(cb, i % 5, i // 5)
-
-        # --- 卡片3: 导出当前选中的图标 ---
-        export_current_card = CardWidget("导出当前图标")
-        export_current_layout = QVBoxLayout(export_current_card.contentWidget())
-        self.generate_current_button = QPushButton("📄 生成当前选中图标")
-        self.generate_current_button.setStyleSheet(f"background-color: {Theme.LIGHT['info']}; color: white;")
-        export_current_layout.addWidget(self.generate_current_button)
-
-        # --- 卡片4: 批量导出所有图标 ---
-        export_batch_card = CardWidget("批量导出")
-        export_batch_layout = QVBoxLayout(export_batch_card.contentWidget())
-        
-        prefix_layout = QHBoxLayout()
-        self.prefix_label = QLabel("PNG文件名前缀:")
-        self.prefix_edit = QLineEdit("icon")
-        prefix_layout.addWidget(self.prefix_label)
-        prefix_layout.addWidget(self.prefix_edit)
-        export_batch_layout.addLayout(prefix_layout)
-
-        self.generate_batch_button = QPushButton("🚀 批量生成所有图标")
-        self.generate_batch_button.setObjectName("PrimaryButton")
-        self.generate_batch_button.setFixedHeight(50)
-        export_batch_layout.addWidget(self.generate_batch_button)
-
-        # 将所有卡片添加到主布局中
-        layout.addWidget(template_card)
-        layout.addWidget(sizes_card)
-        layout.addWidget(export_current_card)
-        layout.addWidget(export_batch_card)
-        layout.addStretch()
-        
-        self.inspector_tabs.addTab(widget, "📤 输出")
-        
-        # 初始化UI状态
-        self._on_template_changed()
-
-    def _set_svg_mode_ui(self, is_svg_mode: bool):
-        """[新增] 根据是否为SVG导出模式，启用或禁用相关UI控件。"""
-        # 这些控件在SVG模式下无效，应禁用
-        controls_to_disable = [
-            self.padding_slider, self.radius_slider, self.remove_bg_cb,
-            self.fill_bg_cb, self.reset_options_btn,
-            # 高级效果中的所有控件
-            self.brightness_slider, self.contrast_slider, self.saturation_slider,
-            self.fx_group, self.watermark_group
-        ]
-        
-        for control in controls_to_disable:
-            control.setEnabled(not is_svg_mode)
-            
-        # “颜色叠加”是唯一在SVG模式下仍可用的选项
-        self.color_overlay_cb.setEnabled(True)
-        self.color_overlay_btn.setEnabled(self.color_overlay_cb.isChecked())
-        
-        # 显示或隐藏警告信息
-        self.svg_warning_label.setVisible(is_svg_mode)
-    def _create_presets_tab(self):
-        widget = QWidget(); layout = QVBoxLayout(widget); layout.setSpacing(15); layout.setContentsMargins(10,15,10,10)
-        card = CardWidget("预设管理"); card_layout = QVBoxLayout(card.contentWidget())
-        
-        self.presets_list = QListWidget()
-        card_layout.addWidget(self.presets_list, 1)
-        
-        btn_layout = QGridLayout()
-        self.preset_name_edit = QLineEdit("我的预设"); btn_layout.addWidget(self.preset_name_edit, 0, 0, 1, 2)
-        self.save_preset_btn = QPushButton("保存/更新"); btn_layout.addWidget(self.save_preset_btn, 1, 0)
-        self.delete_preset_btn = QPushButton("删除选中"); btn_layout.addWidget(self.delete_preset_btn, 1, 1)
-        card_layout.addLayout(btn_layout)
-
-        layout.addWidget(card); layout.addStretch()
-        self.inspector_tabs.addTab(widget, "⚙️ 预设")
-
-    def _create_history_tab(self):
-        widget = QWidget(); layout = QVBoxLayout(widget); layout.setContentsMargins(10,15,10,10)
-        card = CardWidget("操作历史"); card_layout = QVBoxLayout(card.contentWidget())
-        history_view = QUndoView(self.undo_stack)
-        history_view.setEmptyLabel("尚无操作")
-        card_layout.addWidget(history_view)
-        layout.addWidget(card); layout.addStretch()
-        self.inspector_tabs.addTab(widget, "📜 历史")
-
-    def _create_statusbar(self): self.statusBar().showMessage("就绪。")
-    
-    def _connect_signals(self):
-        """连接所有UI组件的信号到本类的槽函数。"""
-        # --- 工具栏与源浏览器信号 ---
-        self.add_files_btn.clicked.connect(lambda: self._add_files_to_batch())
-        self.add_folder_btn.clicked.connect(self._add_folder_to_batch)
-        self.clear_batch_btn.clicked.connect(self._clear_batch)
-        self.batch_list.currentItemChanged.connect(self._on_batch_selection_changed)
-        
-        # --- 基础处理选项卡信号 ---
-        self.padding_slider.sliderReleased.connect(lambda: self._on_property_changed('padding', self.padding_slider.value(), f"调整内边距"))
-        self.radius_slider.sliderReleased.connect(lambda: self._on_property_changed('radius', self.radius_slider.value(), f"调整圆角"))
-        self.color_overlay_cb.stateChanged.connect(lambda s: self._on_property_changed('color_overlay_enabled', bool(s), "切换颜色叠加"))
-        self.color_overlay_btn.clicked.connect(lambda: self._select_color_for_btn(self.color_overlay_btn, 'color_overlay', "更改叠加颜色"))
-        self.remove_bg_cb.stateChanged.connect(lambda s: self._on_property_changed('remove_bg', bool(s), "切换移除背景"))
-        self.fill_bg_cb.stateChanged.connect(lambda s: self._on_property_changed('bg_color', self.bg_color_btn.property("color") if s else None, "切换填充背景"))
-        self.bg_color_btn.clicked.connect(lambda: self._select_color_for_btn(self.bg_color_btn, 'bg_color', "更改背景色", self.fill_bg_cb))
-        self.color_overlay_cb.stateChanged.connect(self.color_overlay_btn.setEnabled)
-        self.fill_bg_cb.stateChanged.connect(self.bg_color_btn.setEnabled)
-        self.reset_options_btn.clicked.connect(self._reset_process_options)
-
-        # --- [新增] 高级效果信号 ---
-        # 图像校正
-        self.brightness_slider.sliderReleased.connect(lambda: self._on_property_changed('adv_brightness', self.brightness_slider.value(), "调整亮度"))
-        self.contrast_slider.sliderReleased.connect(lambda: self._on_property_changed('adv_contrast', self.contrast_slider.value(), "调整对比度"))
-        self.saturation_slider.sliderReleased.connect(lambda: self._on_property_changed('adv_saturation', self.saturation_slider.value(), "调整饱和度"))
-        
-        # 阴影/描边
-        self.fx_group.toggled.connect(lambda on: self._on_property_changed('adv_fx_enabled', on, "切换阴影/描边"))
-        self.fx_mode_group.buttonClicked.connect(lambda btn: self._on_property_changed('adv_fx_mode', 'stroke' if self.fx_mode_group.id(btn) == 1 else 'shadow', "切换效果模式"))
-        self.shadow_color_btn.clicked.connect(lambda: self._select_color_for_btn(self.shadow_color_btn, 'adv_shadow_color', "更改阴影颜色"))
-        self.shadow_blur_slider.sliderReleased.connect(lambda: self._on_property_changed('adv_shadow_blur', self.shadow_blur_slider.value(), "调整阴影模糊"))
-        self.shadow_x_slider.sliderReleased.connect(lambda: self._on_property_changed('adv_shadow_offset_x', self.shadow_x_slider.value(), "调整阴影X偏移"))
-        self.shadow_y_slider.sliderReleased.connect(lambda: self._on_property_changed('adv_shadow_offset_y', self.shadow_y_slider.value(), "调整阴影Y偏移"))
-        self.stroke_color_btn.clicked.connect(lambda: self._select_color_for_btn(self.stroke_color_btn, 'adv_stroke_color', "更改描边颜色"))
-        self.stroke_width_slider.sliderReleased.connect(lambda: self._on_property_changed('adv_stroke_width', self.stroke_width_slider.value(), "调整描边宽度"))
-
-        # 水印
-        self.watermark_group.toggled.connect(lambda on: self._on_property_changed('adv_watermark_enabled', on, "切换水印"))
-        self.watermark_select_btn.clicked.connect(self._select_watermark_image)
-        self.watermark_pos_group.buttonClicked.connect(self._on_watermark_pos_changed)
-        self.watermark_size_slider.sliderReleased.connect(lambda: self._on_property_changed('adv_watermark_size', self.watermark_size_slider.value(), "调整水印大小"))
-        self.watermark_opacity_slider.sliderReleased.connect(lambda: self._on_property_changed('adv_watermark_opacity', self.watermark_opacity_slider.value(), "调整水印不透明度"))
-
-        # --- 输出选项卡信号 ---
-        self.template_group.buttonClicked.connect(self._on_template_changed)
-        self.generate_current_button.clicked.connect(self._start_single_generation)
-        self.generate_batch_button.clicked.connect(self._start_batch_generation)
-        
-        # --- 预设选项卡信号 ---
-        self.presets_list.itemClicked.connect(self._on_preset_selected)
-        self.save_preset_btn.clicked.connect(self._save_preset)
-        self.delete_preset_btn.clicked.connect(self._delete_preset)
-
-        # --- [新增] 图标库信号 ---
-        self.library_categories.currentItemChanged.connect(self._on_library_category_changed)
-        self.library_icons.itemDoubleClicked.connect(self._on_library_icon_activated)
-    def _on_watermark_pos_changed(self, button):
-        pos_names = ['top_left', 'top_center', 'top_right', 'mid_left', 'center', 'mid_right', 'bottom_left', 'bottom_center', 'bottom_right']
-        pos_id = self.watermark_pos_group.id(button)
-        self._on_property_changed('adv_watermark_pos', pos_names[pos_id], "更改水印位置")
-    # --- 槽函数与核心逻辑 ---
-    def _on_property_changed(self, key: str, value: Any, description: str):
-        if self.current_options.get(key) != value:
-            command = ModifyOptionsCommand(self, key, value, description)
-            self.undo_stack.push(command)
-
-    def _update_ui_from_options(self, block_signals=True):
-        opts = self.current_options
-        widgets_to_block = [
-            self.padding_slider, self.radius_slider, self.color_overlay_cb,
-            self.remove_bg_cb, self.fill_bg_cb, self.brightness_slider,
-            self.contrast_slider, self.saturation_slider, self.fx_group,
-            self.fx_shadow_rb, self.fx_stroke_rb, self.shadow_blur_slider,
-            self.shadow_x_slider, self.shadow_y_slider, self.stroke_width_slider,
-            self.watermark_group, self.watermark_size_slider, self.watermark_opacity_slider
-        ]
-        # Block signals to prevent feedback loops
-        if block_signals: [w.blockSignals(True) for w in widgets_to_block]
-        self.watermark_pos_group.blockSignals(True)
-
-        # 基础选项
-        self.padding_slider.setValue(opts.get('padding', 0))
-        self.radius_slider.setValue(opts.get('radius', 0))
-        self.color_overlay_cb.setChecked(opts.get('color_overlay_enabled', False))
-        self._update_color_btn(self.color_overlay_btn, opts.get('color_overlay', '#4f46e5'))
-        self.remove_bg_cb.setChecked(opts.get('remove_bg', False))
-        self.fill_bg_cb.setChecked(opts.get('bg_color') is not None)
-        if opts.get('bg_color'): self._update_color_btn(self.bg_color_btn, opts['bg_color'])
-
-        # 图像校正
-        self.brightness_slider.setValue(opts.get('adv_brightness', 0))
-        self.contrast_slider.setValue(opts.get('adv_contrast', 0))
-        self.saturation_slider.setValue(opts.get('adv_saturation', 0))
-
-        # 阴影/描边
-        self.fx_group.setChecked(opts.get('adv_fx_enabled', False))
-        if opts.get('adv_fx_mode') == 'stroke':
-            self.fx_stroke_rb.setChecked(True)
-            self.fx_stack.setCurrentIndex(1)
-        else:
-            self.fx_shadow_rb.setChecked(True)
-            self.fx_stack.setCurrentIndex(0)
-        self._update_color_btn(self.shadow_color_btn, opts.get('adv_shadow_color', '#000000'))
-        self.shadow_blur_slider.setValue(opts.get('adv_shadow_blur', 5))
-        self.shadow_x_slider.setValue(opts.get('adv_shadow_offset_x', 5))
-        self.shadow_y_slider.setValue(opts.get('adv_shadow_offset_y', 5))
-        self._update_color_btn(self.stroke_color_btn, opts.get('adv_stroke_color', '#ffffff'))
-        self.stroke_width_slider.setValue(opts.get('adv_stroke_width', 2))
-
-        # 水印
-        self.watermark_group.setChecked(opts.get('adv_watermark_enabled', False))
-        path = opts.get('adv_watermark_path', '')
-        
-        # [核心修正] 使用 self.watermark_image_path 进行可靠的比较
-        if path and self.watermark_image_path != path:
-            if os.path.exists(path):
-                try:
-                    self.watermark_image = Image.open(path).convert("RGBA")
-                    self.watermark_image_path = path
-                except Exception as e:
-                    print(f"在UI更新期间加载水印失败: {e}")
-                    self.watermark_image = None
-                    self.watermark_image_path = ""
-            else: # Path exists in options but not on disk
-                self.watermark_image = None
-                self.watermark_image_path = ""
-        elif not path: # Path is empty in options
-            self.watermark_image = None
-            self.watermark_image_path = ""
-
-        # 更新UI标签
-        if self.watermark_image and self.watermark_image_path:
-            self.watermark_path_label.setText(os.path.basename(self.watermark_image_path))
-        else:
-            self.watermark_path_label.setText("未选择文件")
-        
-        pos_names = ['top_left', 'top_center', 'top_right', 'mid_left', 'center', 'mid_right', 'bottom_left', 'bottom_center', 'bottom_right']
-        try:
-            pos_id = pos_names.index(opts.get('adv_watermark_pos', 'bottom_right'))
-            self.watermark_pos_group.button(pos_id).setChecked(True)
-        except ValueError:
-            self.watermark_pos_group.button(8).setChecked(True)
-        
-        self.watermark_size_slider.setValue(opts.get('adv_watermark_size', 20))
-        self.watermark_opacity_slider.setValue(opts.get('adv_watermark_opacity', 50))
-        
-        # Unblock signals
-        if block_signals: [w.blockSignals(False) for w in widgets_to_block]
-        self.watermark_pos_group.blockSignals(False)
-    def _add_files_to_batch(self, files=None):
-        """
-        [已升级] 异步地将文件添加到批量列表，并切换到列表视图。
-        现在支持 SVG 文件类型。
-        """
-        if not files:
-            # [核心修正] 在文件对话框的过滤器中添加 *.svg
-            files, _ = QFileDialog.getOpenFileNames(self, "选择图片", "", "图片文件 (*.png *.jpg *.jpeg *.bmp *.svg)")
-        
-        if files:
-            # 只要有文件添加，就切换到列表视图
-            self.left_stack.setCurrentWidget(self.batch_list)
-            
-            added_count = 0
-            for f in files:
-                if f not in self.batch_items:
-                    self.batch_items.append(f)
-                    added_count += 1
-                    item = QListWidgetItem(os.path.basename(f))
-                    item.setData(Qt.UserRole, f)
-                    item.setToolTip(f)
-                    self.batch_list.addItem(item)
-                    # ThumbnailWorker 已经被修改为可以处理 .svg 文件
-                    worker = ThumbnailWorker(item, f, self.batch_list.iconSize())
-                    worker.signals.finished.connect(self._on_thumbnail_ready)
-                    self.thread_pool.start(worker)
-
-            self.statusBar().showMessage(f"已添加 {added_count} 个文件。当前共 {len(self.batch_items)} 个。")
-    def _on_thumbnail_ready(self, item: QListWidgetItem, icon: QIcon):
-        """[槽] 当后台缩略图生成完毕后，在主线程中更新列表项的图标。"""
-        item.setIcon(icon)
-    def _add_folder_to_batch(self):
-        folder = QFileDialog.getExistingDirectory(self, "选择图片文件夹")
-        if folder: self._add_files_to_batch([os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp'))])
-
-    def _clear_batch(self):
-        """清空列表，并切换回空状态引导页。"""
-        self.batch_list.clear()
-        self.batch_items.clear()
-        self.main_preview.setText("请从左侧列表选择一张图片")
-        self.central_header.setText("未选择文件")
-        self.statusBar().showMessage("列表已清空。")
-        
-        # [核心修改] 切换回引导页
-        self.left_stack.setCurrentWidget(self.empty_list_widget)
-
-    def _on_batch_selection_changed(self, current: QListWidgetItem, previous: QListWidgetItem):
-        if current:
-            self.central_header.setText(f"当前预览: {current.text()}")
-            self._update_realtime_preview()
-        else:
-            self.central_header.setText("未选择文件")
-            self.main_preview.clear()
-            self.main_preview.setText("请从左侧列表选择一张图片")
-
-    def _update_realtime_preview(self):
-        current_item = self.batch_list.currentItem()
-        if not current_item:
-            return
-            
-        source_path = current_item.data(Qt.UserRole)
-        try:
-            # [核心修正] 增加对 SVG 源文件的处理
-            if source_path.lower().endswith('.svg'):
-                renderer = QSvgRenderer(source_path)
-                # 渲染到一个足够大的 QPixmap (例如 1024x1024) 以保留矢量细节
-                pixmap = QPixmap(1024, 1024)
-                pixmap.fill(Qt.transparent)
-                painter = QPainter(pixmap)
-                renderer.render(painter)
-                painter.end()
-                
-                # 将 QPixmap 转换为 Pillow Image 以便后续处理
-                # 注意: 需要 from PyQt5.QtCore import QBuffer
-                buffer = QBuffer()
-                buffer.open(QBuffer.ReadWrite)
-                pixmap.save(buffer, "PNG")
-                source_img = Image.open(BytesIO(buffer.data()))
-            else:
-                # 原有的位图文件处理逻辑
-                source_img = Image.open(source_path)
-            
-            # [核心修正] 将 remove_func 传入
-            processed_img = self.icon_generator.process_image(source_img, self.current_options, self.rembg_remove_func)
-            
-            # 将最终处理好的 Pillow Image 转换为 QPixmap 以在 UI 中显示
-            final_pixmap = self._pil_to_pixmap(processed_img)
-            
-            # 缩放以适应预览窗口大小并显示
-            self.main_preview.setPixmap(final_pixmap.scaled(self.main_preview.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
-            self.main_preview.setToolTip("") 
-            
-        except Exception as e:
-            # [UX改进] 预览失败时提供更详细的用户反馈
-            error_msg = f"预览更新失败: {e}"
-            print(error_msg)
-            self.main_preview.setText("预览失败")
-            self.main_preview.setToolTip(error_msg)
-            self.statusBar().showMessage(error_msg, 5000)
-
-    def _on_template_changed(self):
-        """[已重写] 当模板改变时，更新尺寸复选框并调整UI以适应SVG模式。"""
-        btn = self.template_group.checkedButton()
-        if not btn: return
-        
-        template_data = self.PLATFORM_TEMPLATES.get(btn.text())
-        if not template_data: return
-
-        sizes_to_check = template_data['sizes']
-        is_icns_or_svg = template_data['format'] in ['icns', 'svg']
-
-        for size, cb in self.size_checkboxes.items():
-            cb.setChecked(size in sizes_to_check)
-            cb.setEnabled(not is_icns_or_svg)
-            
-        # 调用新的辅助函数来处理UI状态
-        self._set_svg_mode_ui(template_data['format'] == 'svg')
-
-    # [UX改进] 1.3: 新增方法，用于重置处理选项
-    def _reset_process_options(self):
-        """将所有处理选项恢复为默认值，并将整个操作记录到撤销堆栈中。"""
-        self.undo_stack.beginMacro("恢复默认处理选项")
-        
-        defaults = self._get_default_options()
-        for key, default_value in defaults.items():
-            if self.current_options.get(key) != default_value:
-                # 复用现有的 Command 逻辑，为每个变化的属性创建一个命令
-                command = ModifyOptionsCommand(self, key, default_value, f"重置 {key}")
-                self.undo_stack.push(command)
-        
-        self.undo_stack.endMacro()
-        self.statusBar().showMessage("处理选项已恢复默认。", 3000)
-
-    def _load_presets(self):
-        try:
-            if os.path.exists("iconforge_presets.json"):
-                with open("iconforge_presets.json", "r") as f:
-                    self.presets.update(json.load(f))
-        except Exception as e:
-            print(f"加载预设失败: {e}")
-        self._update_presets_list()
-
-    def _save_presets(self):
-        try:
-            with open("iconforge_presets.json", "w") as f:
-                json.dump(self.presets, f, indent=2)
-        except Exception as e:
-            QMessageBox.warning(self, "错误", f"保存预设失败: {e}")
-
-    def _update_presets_list(self):
-        self.presets_list.clear()
-        preview_dir = "presets_previews"
-        
-        for name in sorted(self.presets.keys()):
-            item = QListWidgetItem(name)
-            
-            # [新增] 尝试加载并设置预览图标
-            safe_filename = "".join(c for c in name if c.isalnum() or c in " _-").rstrip()
-            preview_path = os.path.join(preview_dir, f"{safe_filename}.png")
-            
-            if os.path.exists(preview_path):
-                icon = QIcon(preview_path)
-                item.setIcon(icon)
-            
-            self.presets_list.addItem(item)
-
-    def _on_preset_selected(self, item: QListWidgetItem):
-        name = item.text()
-        self.preset_name_edit.setText(name)
-        if name in self.presets:
-            new_options = self.presets[name]
-            # Use QUndoCommand for each property change to build a macro command
-            self.undo_stack.beginMacro(f"加载预设 '{name}'")
-            for key, value in new_options.items():
-                if self.current_options.get(key) != value:
-                    command = ModifyOptionsCommand(self, key, value, f"设置 {key}")
-                    self.undo_stack.push(command)
-            self.undo_stack.endMacro()
-    
-    def _save_preset(self):
-        name = self.preset_name_edit.text().strip()
-        if not name:
-            QMessageBox.warning(self, "无效名称", "预设名称不能为空。")
-            return
-        
-        # 1. 保存配置数据
-        self.presets[name] = self.current_options.copy()
-        self._save_presets()
-
-        # 2. [新增] 生成并保存预览图
-        self._generate_and_save_preset_preview(name)
-
-        # 3. 更新UI
-        self._update_presets_list()
-        self.statusBar().showMessage(f"已保存预设 '{name}'", 3000)
-    def _generate_and_save_preset_preview(self, preset_name: str):
-        """为指定的预设生成并保存一张预览缩略图。"""
-        try:
-            # 确定使用哪张图片作为样本
-            source_path = ""
-            current_item = self.batch_list.currentItem()
-            if current_item:
-                source_path = current_item.data(Qt.UserRole)
-            elif os.path.exists(self.preview_sample_path):
-                source_path = self.preview_sample_path
-            else:
-                print("警告: 找不到样本图片，无法生成预设预览。")
-                return
-
-            source_img = Image.open(source_path)
-            
-            # 应用当前设置生成效果图
-            options = self.presets[preset_name]
-            processed_img = self.icon_generator.process_image(source_img, options, self.rembg_remove_func)
-            
-            # 缩放到合适的尺寸
-            processed_img.thumbnail((96, 96), Image.LANCZOS)
-            
-            # 创建一个正方形的背景以保证尺寸统一
-            preview_canvas = Image.new("RGBA", (96, 96), (0,0,0,0))
-            paste_pos = ((96 - processed_img.width) // 2, (96 - processed_img.height) // 2)
-            preview_canvas.paste(processed_img, paste_pos, processed_img)
-            
-            # 保存到预览文件夹
-            preview_dir = "presets_previews"
-            if not os.path.exists(preview_dir):
-                os.makedirs(preview_dir)
-            
-            # 文件名不允许包含非法字符，这里做一个简单的替换
-            safe_filename = "".join(c for c in preset_name if c.isalnum() or c in " _-").rstrip()
-            preview_path = os.path.join(preview_dir, f"{safe_filename}.png")
-            preview_canvas.save(preview_path, "PNG")
-
-        except Exception as e:
-            print(f"为预设 '{preset_name}' 生成预览图失败: {e}")
-
-    def _delete_preset(self):
-        item = self.presets_list.currentItem()
-        if not item:
-            QMessageBox.warning(self, "未选择", "请先在列表中选择一个要删除的预设。")
-            return
-        
-        name = item.text()
-        if name == "默认" and name in self.presets and self.presets[name].get('is_default'): # 更严谨的判断
-            QMessageBox.warning(self, "无法删除", "不能删除内置的默认预设。")
-            return
-            
-        reply = QMessageBox.question(self, "确认", f"确定要删除预设 '{name}' 吗？", QMessageBox.Yes | QMessageBox.No)
-        if reply == QMessageBox.Yes and name in self.presets:
-            # 1. 删除配置
-            del self.presets[name]
-            self._save_presets()
-            
-            # 2. [新增] 删除对应的预览图
-            try:
-                preview_dir = "presets_previews"
-                safe_filename = "".join(c for c in name if c.isalnum() or c in " _-").rstrip()
-                preview_path = os.path.join(preview_dir, f"{safe_filename}.png")
-                if os.path.exists(preview_path):
-                    os.remove(preview_path)
-            except Exception as e:
-                print(f"删除预设预览图失败: {e}")
-                
-            # 3. 更新UI
-            self._update_presets_list()
-    def _select_watermark_image(self):
-        path, _ = QFileDialog.getOpenFileName(self, "选择水印图片", "", "图片文件 (*.png)")
-        if path:
-            try:
-                # 尝试加载图片以确保它是有效的
-                self.watermark_image = Image.open(path).convert("RGBA")
-                self.watermark_image_path = path # [核心修正] 更新路径追踪器
-                # 使用命令系统来记录路径的更改
-                self._on_property_changed('adv_watermark_path', path, "选择水印图片")
-            except Exception as e:
-                QMessageBox.warning(self, "错误", f"无法加载水印图片: {e}")
-                self.watermark_image = None
-                self.watermark_image_path = "" # [核心修正] 清空路径追踪器
-                self._on_property_changed('adv_watermark_path', '', "清除水印图片")
-    def _start_single_generation(self):
-        """
-        [新增] 启动对当前选中的单个图标的生成过程。
-        """
-        current_item = self.batch_list.currentItem()
-        if not current_item:
-            QMessageBox.warning(self, "操作无效", "请先在左侧列表中选择一个要生成的图片。")
-            return
-        
-        source_path = current_item.data(Qt.UserRole)
-        self._start_generation_process([source_path]) # 调用通用的处理函数，但只传入一个文件
-
-    def _start_batch_generation(self):
-        """
-        [重命名] 启动对列表中所有图标的批量生成过程。
-        """
-        if not self.batch_items:
-            QMessageBox.warning(self, "操作无效", "请先添加至少一张图片到处理列表。")
-            return
-        
-        self._start_generation_process(self.batch_items) # 调用通用的处理函数，传入所有文件
-
-    def _start_generation_process(self, items_to_process: List[str]):
-        """
-        [已修正] [通用处理函数] 处理指定文件列表的生成逻辑。
-        - 现在会根据是单文件还是批量操作，弹出正确的文件/文件夹选择对话框。
-        - 会将异步加载的 rembg 函数传递给后台工作器。
-        """
-        is_batch = len(items_to_process) > 1
-        opts = self._get_current_options_for_generation()
-        fmt = opts['format']
-        
-        output_path = ""
-        # 仅在单文件模式下，建议的文件名才有意义
-        suggested_name = os.path.splitext(os.path.basename(items_to_process[0]))[0] if not is_batch else "icon"
-
-        # [核心修正] 根据操作类型选择正确的对话框
-        if is_batch or fmt == 'png_suite':
-            # 以下情况应选择目录：
-            # 1. 任何批量操作 (is_batch == True)
-            # 2. 单文件操作，但输出为PNG套件 (需要一个目录来存放多个PNG)
-            dialog_title = "选择批量导出的目标文件夹" if is_batch else "选择保存PNG套件的文件夹"
-            output_path = QFileDialog.getExistingDirectory(self, dialog_title)
-        else:
-            # 唯一剩下的情况：单文件输入 -> 单文件输出 (.ico 或 .icns)
-            # 这种情况下才需要用户指定确切的文件名
-            output_path, _ = QFileDialog.getSaveFileName(
-                self, "保存图标", f"{suggested_name}.{fmt}", f"图标文件 (*.{fmt})"
-            )
-        
-        if not output_path:
-            return # 用户取消了选择
-
-        self.progress_dialog = QProgressDialog("生成中...", "取消", 0, len(items_to_process), self)
-        self.progress_dialog.setWindowModality(Qt.WindowModal)
-        
-        # [核心修正] 创建 GenerateWorker 时传入 self.rembg_remove_func
-        self.worker = GenerateWorker(self.icon_generator, items_to_process, output_path, opts, self.rembg_remove_func)
-        
-        self.worker.signals.progress.connect(lambda i, t, n: self.progress_dialog.setLabelText(f"{n} ({i+1}/{t})") or self.progress_dialog.setValue(i))
-        self.worker.signals.finished.connect(lambda msg: (self.progress_dialog.close(), QMessageBox.information(self, "完成", msg)))
-        self.worker.signals.error.connect(lambda err: (self.progress_dialog.close(), QMessageBox.critical(self, "错误", err)))
-        self.progress_dialog.canceled.connect(self.worker.cancel)
-        
-        self.thread_pool.start(self.worker)
-        self.progress_dialog.show()
-
-    def _get_current_options_for_generation(self) -> Dict[str, Any]:
-        """
-        [已修正] 从UI收集最终用于生成的选项。
-        此版本确保总是使用当前勾选框的状态，而不是模板的默认状态。
-        """
-        opts = self.current_options.copy()
-        
-        # 1. 确定输出格式
-        template_name = self.template_group.checkedButton().text()
-        fmt = self.PLATFORM_TEMPLATES[template_name]['format']
-        opts['format'] = fmt
-
-        # 2. [关键修正] 无论模板如何，都从UI重新收集当前所有被勾选的尺寸
-        selected_sizes = [(s, s) for s, cb in self.size_checkboxes.items() if cb.isChecked()]
-        
-        # 3. 为需要尺寸的格式赋值
-        if fmt == 'ico' or fmt == 'png_suite':
-            opts['sizes'] = selected_sizes
-        else: # for 'icns'
-            opts['sizes'] = []
-            
-        return opts
-
-    def _get_default_options(self) -> Dict[str, Any]:
-        return {
-            # --- 基础选项 ---
-            'padding': 0,
-            'radius': 0,
-            'color_overlay_enabled': False,
-            'color_overlay': '#4f46e5',
-            'remove_bg': False,
-            'bg_color': None,
-            
-            # --- [新增] 图像校正选项 ---
-            'adv_brightness': 0,    # -100 to 100
-            'adv_contrast': 0,      # -100 to 100
-            'adv_saturation': 0,    # -100 to 100
-            
-            # --- [新增] 阴影与描边选项 ---
-            'adv_fx_enabled': False,
-            'adv_fx_mode': 'shadow', # 'shadow' or 'stroke'
-            
-            'adv_shadow_color': '#000000',
-            'adv_shadow_blur': 5,     # 0 to 20
-            'adv_shadow_offset_x': 5, # -20 to 20
-            'adv_shadow_offset_y': 5, # -20 to 20
-            
-            'adv_stroke_color': '#ffffff',
-            'adv_stroke_width': 2,    # 1 to 10
-            
-            # --- [新增] 水印选项 ---
-            'adv_watermark_enabled': False,
-            'adv_watermark_path': '',
-            'adv_watermark_pos': 'bottom_right', # 9-grid position
-            'adv_watermark_size': 20, # 5 to 50 percent
-            'adv_watermark_opacity': 50 # 0 to 100 percent
-        }
-
-    def _create_slider_with_label(self, value, min_val, max_val, suffix):
-        slider = QSlider(Qt.Horizontal)
-        slider.setRange(min_val, max_val)
-        slider.setValue(value)
-        label = QLabel(f"{value}{suffix}")
-        label.setMinimumWidth(40)
-        slider.valueChanged.connect(lambda val, l=label: l.setText(f"{val}{suffix}"))
-        return slider, label
-
-    def _update_color_btn(self, btn: QPushButton, color_hex: str = "#4f46e5"):
-        btn.setFixedSize(24, 24)
-        btn.setProperty("color", color_hex)
-        btn.setStyleSheet(f"background-color: {color_hex}; border: 1px solid #ccc; border-radius: 4px;")
-
-    def _select_color_for_btn(self, btn: QPushButton, key: str, desc: str, cb_enabler: Optional[QCheckBox] = None):
-        if cb_enabler and not cb_enabler.isChecked():
-            cb_enabler.setChecked(True) # Automatically enable the feature
-        
-        current_color = QColor(btn.property("color"))
-        new_color = QColorDialog.getColor(current_color, self, "选择颜色")
-        if new_color.isValid():
-            self._on_property_changed(key, new_color.name(), desc)
-
-    def _pil_to_pixmap(self, img: Image.Image) -> QPixmap:
-        buffer = BytesIO()
-        img.save(buffer, "PNG")
-        qimage = QImage.fromData(buffer.getvalue())
-        return QPixmap.fromImage(qimage)
-
-# ==============================================================================
-# SECTION 4: 应用程序入口点 (APPLICATION ENTRY POINT)
-# ==============================================================================
-if __name__ == '__main__':
-    if hasattr(Qt, 'AA_EnableHighDpiScaling'):
-        QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
-    if hasattr(Qt, 'AA_UseHighDpiPixmaps'):
-        QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
-    
-    app = QApplication(sys.argv)
-    app.setStyle("Fusion")
-    
-    main_window = IconForgeWindow()
-    main_window.show()
-    
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MCD图标工具 (IconForge Pro) V4.0 - 专业图标批量生成与处理套件
+作者：跳舞的火公子
+功能：批量处理、预设系统、撤销/重做、高级图像调整 (颜色叠加)、平台化输出模板。
+"""
+
+# ==============================================================================
+# SECTION 0: 核心依赖导入
+# ==============================================================================
+import sys
+import os
+import json
+import threading  # [性能优化] 用于批量生成的并行计数与取消控制
+import re       # [新增] 用于处理 SVG 文件内容的正则表达式
+import shutil   # [新增] 用于文件复制
+import zipfile  # [新增] 用于处理 ZIP 压缩文件
+import xml.etree.ElementTree as ET  # [新增] 用于 SVG 重着色的结构化改写
+import functools  # [性能优化] 用于热路径上的 LRU 缓存
+import hashlib  # [性能优化] 像素内容哈希，作为 QPixmapCache 的键
+from concurrent.futures import ThreadPoolExecutor  # [性能优化] 多尺寸导出的并行保存
+from collections import OrderedDict, namedtuple  # [性能优化] 预览缓存 / 不可变调色板
+from contextlib import ExitStack  # [性能优化] 批量托管控件信号屏蔽
+from typing import List, Tuple, Optional, Dict, Any
+
+from PyQt5.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
+    QPushButton, QLabel, QLineEdit, QCheckBox, QFrame, QFileDialog,
+    QMessageBox, QGroupBox, QStatusBar, QSlider, QColorDialog, QRadioButton,
+    QButtonGroup, QDockWidget, QTabWidget, QListWidget, QListWidgetItem,
+    QAbstractItemView, QProgressDialog, QUndoStack, QUndoView, QUndoCommand,
+    QToolBar, QSizePolicy, QStackedWidget
+)
+from PyQt5.QtGui import QPixmap, QImage, QPainter, QColor, QIcon, QBrush, QPixmapCache, QPalette
+from PyQt5.QtCore import Qt, QSize, pyqtSignal, QRunnable, QObject, QThreadPool, QByteArray, QTimer, QSignalBlocker
+
+try:
+    from PIL import Image, ImageColor, ImageDraw, ImageFilter, ImageEnhance
+    PILLOW_AVAILABLE = True
+except ImportError:
+    # Pillow是核心依赖，没有它程序无法运行
+    print("严重错误: Pillow (PIL) 库未找到。程序无法运行。请运行: pip install Pillow")
+    sys.exit(1)
+
+try:
+    import numpy as np  # [性能优化] 用于像素级批量运算的可选加速依赖
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+    print("提示: numpy 库未找到。部分图像处理将回退到较慢的 Pillow 路径。若要加速，请运行: pip install numpy")
+
+try:
+    import orjson  # [性能优化] C 实现的 JSON 编解码，预设读写提速数倍
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+try:
+    import requests  # [新增] 用于下载图标库文件
+except ImportError:
+    # requests 是自动下载功能的核心依赖，但我们可以让程序在没有它的情况下也能运行，只是功能降级
+    print("警告: requests 库未找到。'图标库自动下载'功能将被禁用。若要启用，请运行: pip install requests")
+    # 为了防止程序崩溃，我们可以在后面创建一个假的 requests 对象或在调用处检查
+    # 但更简单的做法是让依赖明确，如果需要自动下载，就必须安装。
+    # 这里我们选择让程序继续运行，并在需要下载时再处理错误。
+    pass
+
+# --- [核心修正] 移除顶层的 rembg 导入，改为在主窗口中异步加载 ---
+# 默认情况下，rembg 功能是不可用的，直到后台初始化成功。
+REMBG_AVAILABLE = False
+
+# ==============================================================================
+# SECTION 1: 数据模型与核心逻辑 (MODELS & CORE LOGIC)
+# ==============================================================================
+
+# [性能优化] SVG 重着色的正则在模块加载时编译一次，批量处理时不再依赖 re 的内部缓存。
+# 非捕获组 (?:...) 避免构造用不到的分组。
+_SVG_FILL_RE = re.compile(r'fill="(?!(?:none|url))[^"]+"')
+_SVG_STROKE_RE = re.compile(r'stroke="(?!(?:none|url))[^"]+"')
+
+# [性能优化] 支持的源文件扩展名集合：成员判定 O(1)，大目录枚举时优于
+# 对元组逐项 endswith
+_SUPPORTED_EXTS = frozenset({'.png', '.jpg', '.jpeg', '.bmp', '.svg'})
+
+# [性能优化] 处理链活动特性的位标志：选项变更时折叠一次，
+# process_image 内各阶段用整数按位测试代替逐项字典查找
+FEATURE_BG_REMOVE = 1
+FEATURE_COLOR_OVERLAY = 2
+FEATURE_FX = 4
+FEATURE_WATERMARK = 8
+FEATURE_COLOR_ADJ = 16
+
+
+def _compute_active_mask(options: Dict[str, Any]) -> int:
+    """把选项字典中启用的处理特性折叠为位掩码。"""
+    mask = 0
+    if options.get('remove_bg'):
+        mask |= FEATURE_BG_REMOVE
+    if options.get('color_overlay_enabled'):
+        mask |= FEATURE_COLOR_OVERLAY
+    if options.get('adv_fx_enabled'):
+        mask |= FEATURE_FX
+    if options.get('adv_watermark_enabled') and options.get('adv_watermark_path'):
+        mask |= FEATURE_WATERMARK
+    if (options.get('adv_brightness', 0) or options.get('adv_contrast', 0)
+            or options.get('adv_saturation', 0)):
+        mask |= FEATURE_COLOR_ADJ
+    return mask
+
+
+@functools.lru_cache(maxsize=128)
+def _read_svg_bytes(path: str, mtime: float) -> bytes:
+    """[性能优化] 以 (路径, 修改时间) 为键缓存 SVG 文件内容，批量转换时免去重复磁盘读取。"""
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _svg_renderer(path: str) -> 'QSvgRenderer':
+    """
+    [性能优化] 从缓存的文件字节构造 QSvgRenderer。
+    渲染器本身不跨线程共享（QSvgRenderer 非线程安全），但源字节在
+    批量/缩略图/预览三条路径间复用，避免每次都重新打开文件。
+    QtSvg 延迟到首次用到 SVG 时才导入，不用矢量源就不付加载成本。
+    """
+    from PyQt5.QtSvg import QSvgRenderer  # [性能优化] 惰性导入，Python 会缓存模块
+    try:
+        data = _read_svg_bytes(path, os.path.getmtime(path))
+    except OSError:
+        return QSvgRenderer(path)
+    return QSvgRenderer(QByteArray(data))
+
+
+def _qimage_to_pil(qimage: QImage) -> Image.Image:
+    """
+    [性能优化] 直接从 QImage 的原始像素缓冲构建 Pillow 图像。
+    替代原先 "QPixmap.save(PNG) -> Image.open" 的编码+解码往返，
+    跨越 Qt/PIL 边界时不再调用任何压缩编解码器。
+    """
+    if qimage.format() != QImage.Format_RGBA8888:
+        qimage = qimage.convertToFormat(QImage.Format_RGBA8888)
+    ptr = qimage.constBits()
+    ptr.setsize(qimage.byteCount())
+    return Image.frombuffer('RGBA', (qimage.width(), qimage.height()), bytes(ptr), 'raw', 'RGBA', 0, 1)
+
+
+def _pil_to_qimage(img: Image.Image) -> QImage:
+    """[性能优化] 从 Pillow 图像的原始字节直接构建 QImage，同样跳过 PNG 往返。"""
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+    data = img.tobytes('raw', 'RGBA')
+    qimage = QImage(data, img.width, img.height, img.width * 4, QImage.Format_RGBA8888)
+    # QImage 构造函数不持有 data 的引用，copy() 让像素归 QImage 所有
+    return qimage.copy()
+
+
+class _ScratchPool:
+    """
+    [性能优化] 线程本地的 NumPy 画布缓冲池。
+    批量处理时 process_image 每个图标都要分配/释放数兆的透明画布
+    （阴影、内边距），频繁的大块分配会扰动分配器并冲刷缓存。
+    按 (形状, dtype) 复用同一块缓冲：同一线程内上一图标的画布在其
+    图像被保存/转换后即不再被引用，清零重用是安全的；线程之间由
+    threading.local 隔离，互不干扰。
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def zeros(self, shape: Tuple[int, ...], dtype) -> 'np.ndarray':
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        key = (shape, np.dtype(dtype).str)
+        arr = buffers.get(key)
+        if arr is None:
+            arr = buffers[key] = np.zeros(shape, dtype=dtype)
+        else:
+            arr.fill(0)
+        return arr
+
+
+class _SourceCache:
+    """
+    [性能优化] 已解码源图像的内存缓存（路径 -> RGBA Pillow 图像）。
+    预览每次都从磁盘重新解码 PNG/JPEG 是最大的重复开销之一；文件加入
+    批次时即后台解码一次，之后的渲染只剩一次哈希查找。按总字节数
+    预算做 LRU 逐出，threading.Lock 保证后台解码线程与 GUI 线程互斥。
+    缓存的图像在处理链中不会被原地修改（process_image 写前复制）。
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self._entries: 'OrderedDict[str, Image.Image]' = OrderedDict()
+        self._bytes = 0
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cost(img: Image.Image) -> int:
+        return img.width * img.height * 4
+
+    def get(self, path: str) -> Optional[Image.Image]:
+        with self._lock:
+            img = self._entries.get(path)
+            if img is not None:
+                self._entries.move_to_end(path)
+            return img
+
+    def put(self, path: str, img: Image.Image):
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._bytes -= self._cost(old)
+            self._entries[path] = img
+            self._bytes += self._cost(img)
+            while self._bytes > self._max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._cost(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+@functools.lru_cache(maxsize=128)
+def _preset_preview_path(name: str) -> str:
+    """预设预览图的存放路径。名称净化需逐字符扫描，按预设名缓存结果。"""
+    safe_filename = "".join(c for c in name if c.isalnum() or c in " _-").rstrip()
+    return os.path.join("presets_previews", f"{safe_filename}.png")
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_color(color: str) -> Tuple[int, ...]:
+    """[性能优化] 缓存 ImageColor.getrgb 的解析结果；批量模式下同一个十六进制串会被反复解析。"""
+    return ImageColor.getrgb(color)
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_rgba(color: str) -> Tuple[int, int, int, int]:
+    """[性能优化] 同上，但补齐 alpha 分量，可直接用于 RGBA 模式的 Image.new。"""
+    rgb = _parse_color(color)
+    return rgb if len(rgb) == 4 else rgb + (255,)
+
+
+@functools.lru_cache(maxsize=32)
+def _rounded_mask(width: int, height: int, radius: int) -> Image.Image:
+    """
+    [性能优化] 缓存圆角遮罩。批量输出时尺寸与圆角固定，同一张遮罩
+    会被请求数百次，从 N 次光栅化降为每种形状 1 次。
+    返回的遮罩被视为只读，调用方不得修改。
+    """
+    mask = Image.new("L", (width, height), 0)
+    ImageDraw.Draw(mask).rounded_rectangle((0, 0, width, height), radius, fill=255)
+    return mask
+
+
+def _box_blur_1d(arr: 'np.ndarray', radius: int, axis: int) -> 'np.ndarray':
+    """
+    [性能优化] 沿单轴的盒式模糊：对前缀和做两次取数相减，每个输出像素
+    只需一次减法和一次除法，耗时与半径完全无关，且整行/整列向量化。
+    边缘按实际窗口长度归一化（窗口越界部分不计入）。
+    """
+    n = arr.shape[axis]
+    csum = np.cumsum(arr, axis=axis, dtype=np.float32)
+    csum = np.insert(csum, 0, 0.0, axis=axis)
+    hi = np.minimum(np.arange(n) + radius + 1, n)
+    lo = np.maximum(np.arange(n) - radius, 0)
+    total = np.take(csum, hi, axis=axis) - np.take(csum, lo, axis=axis)
+    counts = (hi - lo).astype(np.float32)
+    if axis == 0:
+        counts = counts.reshape(-1, 1)
+    return total / counts
+
+
+def _blur_alpha(alpha: Image.Image, radius: int) -> Image.Image:
+    """
+    [性能优化] 阴影用的 alpha 模糊。
+    大半径时以三次盒式模糊近似高斯（中心极限定理），模糊耗时与半径无关；
+    NumPy 可用时盒滤波走前缀和路径，三趟横向+三趟纵向全部在同一个
+    float32 数组上完成，省掉 BoxBlur 链每一环的中间图像分配。
+    小半径下精确高斯的开销本就很低，保留原实现以免近似误差在锐利边缘上可见。
+    """
+    if radius < 5:
+        return alpha.filter(ImageFilter.GaussianBlur(radius))
+    # 三次方差为 ((2r+1)²-1)/12 的盒滤波叠加 ≈ 标准差为 radius 的高斯
+    box_radius = ((4 * radius * radius + 1) ** 0.5 - 1) / 2
+    if NUMPY_AVAILABLE:
+        r = max(1, int(round(box_radius)))
+        arr = np.asarray(alpha, dtype=np.float32)
+        for _ in range(3):
+            arr = _box_blur_1d(arr, r, axis=1)
+            arr = _box_blur_1d(arr, r, axis=0)
+        return Image.fromarray(np.clip(arr, 0.0, 255.0).astype(np.uint8), 'L')
+    box = ImageFilter.BoxBlur(box_radius)
+    return alpha.filter(box).filter(box).filter(box)
+
+
+@functools.lru_cache(maxsize=32)
+def _bc_lut(brightness: float, contrast: float) -> 'np.ndarray':
+    """
+    [性能优化] 亮度+对比度查找表。256 项曲线按 (b, c) 组合只构建一次，
+    对比度以 128 为固定支点缩放，省去先对整图求灰度均值的额外遍历。
+    """
+    lut = np.arange(256, dtype=np.float32)
+    lut *= brightness
+    lut = (lut - 128.0) * contrast + 128.0
+    return np.clip(lut, 0.0, 255.0).astype(np.uint8)
+
+
+def _adjust_bcs(arr: 'np.ndarray', brightness: float, contrast: float, saturation: float):
+    """
+    [性能优化] 亮度/对比度/饱和度校正，就地修改 (H,W,4) uint8 数组。
+    饱和度未动时走 256 项查找表（曲线构建与尺寸无关，整图仅一次
+    gather）；饱和度启用时三项线性运算融合进同一个 float32 内核，
+    灰度混合与亮度/对比度在像素缓冲的单次遍历内完成。该段为内存
+    带宽瓶颈，融合遍历次数即近似等比例提速。
+    """
+    if saturation == 1.0:
+        if brightness != 1.0 or contrast != 1.0:
+            arr[..., :3] = _bc_lut(brightness, contrast)[arr[..., :3]]
+        return
+    rgb = arr[..., :3].astype(np.float32)
+    weights = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    luma = (rgb @ weights)[..., None]
+    rgb = luma + (rgb - luma) * saturation
+    if brightness != 1.0:
+        rgb *= brightness
+    if contrast != 1.0:
+        rgb -= 128.0
+        rgb *= contrast
+        rgb += 128.0
+    np.clip(rgb, 0.0, 255.0, out=rgb)
+    arr[..., :3] = rgb.astype(np.uint8)
+
+
+class IconGenerator:
+    """
+    核心图标生成器 (V4.0)，支持更复杂的处理链和批量操作。
+    [已修正] 支持 SVG 源文件输入、rembg 异步加载和独立的单尺寸ICO文件生成。
+    """
+
+    #: 水印缩放缓存的最大条目数
+    _WM_CACHE_MAX = 16
+
+    def __init__(self):
+        # [性能优化] 画布临时缓冲池（线程本地），供 process_image 的 NumPy 路径复用
+        self._scratch = _ScratchPool()
+        # [性能优化] 水印缩放结果缓存：(路径, 目标宽度) -> 已解码并缩放的 RGBA。
+        # 预览阶段画布尺寸稳定，命中后可同时省掉 PNG 解码与 LANCZOS 缩放
+        self._wm_cache: 'OrderedDict[Tuple[str, int], Image.Image]' = OrderedDict()
+        self._wm_lock = threading.Lock()
+
+    def clear_watermark_cache(self):
+        """清空水印缩放缓存（更换水印图片后调用）。"""
+        with self._wm_lock:
+            self._wm_cache.clear()
+
+    def _resized_watermark(self, path: str, target_width: int) -> Image.Image:
+        """按目标宽度返回缩放后的水印图（带 LRU 缓存，线程安全）。"""
+        key = (path, target_width)
+        with self._wm_lock:
+            cached = self._wm_cache.get(key)
+            if cached is not None:
+                self._wm_cache.move_to_end(key)
+                return cached
+        watermark = Image.open(path).convert("RGBA")
+        wm_ratio = watermark.height / watermark.width
+        watermark = watermark.resize(
+            (target_width, int(target_width * wm_ratio)), Image.LANCZOS)
+        with self._wm_lock:
+            self._wm_cache[key] = watermark
+            while len(self._wm_cache) > self._WM_CACHE_MAX:
+                self._wm_cache.popitem(last=False)
+        return watermark
+
+
+    def process_image(self, source_img: Image.Image, options: Dict[str, Any], remove_func: Optional[callable] = None, mask: Optional[int] = None) -> Image.Image:
+        """
+        [已重写] 根据指定的选项，对源图像进行一系列处理，包含高级效果。
+        处理顺序: 校正 -> 基础处理 -> 特效 -> 水印 -> 最终裁剪/塑形
+
+        mask 为预计算的特性位掩码（见 _compute_active_mask）；未提供时
+        在此计算一次，各阶段的启用判断只做整数按位测试。
+        """
+        if mask is None:
+            mask = _compute_active_mask(options)
+        # [性能优化] 写时复制：convert() 本身就会为非 RGBA 源生成新图；
+        # 对已是 RGBA 的源先直接引用，仅在即将发生就地修改且 img 仍是
+        # 调用方对象时才复制。
+        # [性能优化] 整条流水线只维护一个"权威"缓冲：img（Pillow 图像）和
+        # arr（(H,W,4) uint8 数组）二者始终只有一个有效，连续的 NumPy 阶段
+        # 之间不再做 array->Image->array 的往返拷贝，只有在进入需要 Pillow
+        # 的操作（滤镜、paste、保存）时才按需物化。
+        img: Optional[Image.Image] = source_img if source_img.mode == 'RGBA' else source_img.convert('RGBA')
+        arr: Optional['np.ndarray'] = None
+
+        def as_image() -> Image.Image:
+            nonlocal img, arr
+            if img is None:
+                img = Image.fromarray(arr, 'RGBA')
+                arr = None
+            return img
+
+        def as_array() -> 'np.ndarray':
+            nonlocal img, arr
+            if arr is None:
+                arr = np.array(img)  # 可写副本，天然满足写时复制
+                img = None
+            return arr
+
+        def set_image(new_img: Image.Image):
+            nonlocal img, arr
+            img, arr = new_img, None
+
+        def set_array(new_arr: 'np.ndarray'):
+            nonlocal img, arr
+            img, arr = None, new_arr
+
+        def dims() -> Tuple[int, int]:
+            return img.size if img is not None else (arr.shape[1], arr.shape[0])
+
+        # --- 阶段 1: 图像校正 ---
+        if mask & FEATURE_COLOR_ADJ:
+            brightness = 1.0 + (options.get('adv_brightness', 0) / 100.0)
+            contrast = 1.0 + (options.get('adv_contrast', 0) / 100.0)
+            saturation = 1.0 + (options.get('adv_saturation', 0) / 100.0)
+            if NUMPY_AVAILABLE:
+                # [性能优化] 三项校正融合为对权威数组的就地修改
+                _adjust_bcs(as_array(), brightness, contrast, saturation)
+            else:
+                if brightness != 1.0: set_image(ImageEnhance.Brightness(as_image()).enhance(brightness))
+                if contrast != 1.0: set_image(ImageEnhance.Contrast(as_image()).enhance(contrast))
+                if saturation != 1.0: set_image(ImageEnhance.Color(as_image()).enhance(saturation))
+
+        # --- 阶段 2: 核心处理 (背景和颜色) ---
+        if (mask & FEATURE_BG_REMOVE) and REMBG_AVAILABLE and remove_func:
+            try: set_image(remove_func(as_image()))
+            except Exception as e: print(f"背景移除失败: {e}")
+
+        if options.get('bg_color'):
+            base = as_image()
+            background = Image.new("RGBA", base.size, _parse_rgba(options['bg_color']))
+            background.paste(base, (0, 0), base)
+            set_image(background)
+
+        if mask & FEATURE_COLOR_OVERLAY:
+            overlay_color = options.get('color_overlay', '#ffffff')
+            if NUMPY_AVAILABLE:
+                # [性能优化] 直接改写 RGB 三个通道并保留原 alpha，
+                # 省去整幅纯色图的分配和一次 paste 合成遍历
+                as_array()[..., :3] = _parse_color(overlay_color)[:3]
+            else:
+                base = as_image()
+                if base is source_img:
+                    base = base.copy()
+                    set_image(base)
+                overlay = Image.new("RGBA", base.size, _parse_rgba(overlay_color))
+                base.paste(overlay, (0, 0), base.getchannel('A'))
+
+        # --- 阶段 3: 阴影与描边 ---
+        if mask & FEATURE_FX:
+            alpha = as_image().getchannel('A')
+
+            if options.get('adv_fx_mode') == 'shadow':
+                blur = options.get('adv_shadow_blur', 5)
+                offset_x = options.get('adv_shadow_offset_x', 5)
+                offset_y = options.get('adv_shadow_offset_y', 5)
+                color = options.get('adv_shadow_color', '#000000')
+
+                shadow_alpha = _blur_alpha(alpha, blur)
+
+                base = as_image()
+                canvas_size = (base.width + abs(offset_x) + blur*2, base.height + abs(offset_y) + blur*2)
+                shadow_paste_pos = (blur + (offset_x if offset_x > 0 else 0), blur + (offset_y if offset_y > 0 else 0))
+                img_paste_pos = (blur - (offset_x if offset_x < 0 else 0), blur - (offset_y if offset_y < 0 else 0))
+                if NUMPY_AVAILABLE:
+                    # [性能优化] 阴影层落在透明画布上，等价于写入纯色 RGB + 模糊后的
+                    # alpha，切片赋值即可；只有之后图像压在阴影上那一步才需要真正的
+                    # alpha 合成（仍交给 paste）
+                    canvas = self._scratch.zeros((canvas_size[1], canvas_size[0], 4), np.uint8)
+                    sx, sy = shadow_paste_pos
+                    canvas[sy:sy + base.height, sx:sx + base.width, :3] = _parse_color(color)[:3]
+                    canvas[sy:sy + base.height, sx:sx + base.width, 3] = np.asarray(shadow_alpha)
+                    fx_canvas = Image.fromarray(canvas, 'RGBA')
+                else:
+                    shadow = Image.new('RGBA', base.size, _parse_rgba(color))
+                    fx_canvas = Image.new('RGBA', canvas_size, (0,0,0,0))
+                    fx_canvas.paste(shadow, shadow_paste_pos, shadow_alpha)
+                fx_canvas.paste(base, img_paste_pos, base)
+                set_image(fx_canvas)
+
+            elif options.get('adv_fx_mode') == 'stroke':
+                width = options.get('adv_stroke_width', 2)
+                color = options.get('adv_stroke_color', '#ffffff')
+
+                # [性能优化] 形态学膨胀改为迭代 w 次 3x3 MaxFilter：
+                # 与单次 MaxFilter(2w+1) 结果等价，但每像素窗口代价从
+                # (2w+1)^2 降为 9w，描边越宽收益越大
+                stroke_alpha = alpha
+                for _ in range(max(1, width)):
+                    stroke_alpha = stroke_alpha.filter(ImageFilter.MaxFilter(3))
+
+                if NUMPY_AVAILABLE:
+                    # [性能优化] 把 "填充描边色 + 图像 over 描边" 两次合成
+                    # 融合为一个向量化表达式，单趟完成
+                    src = as_array().astype(np.uint16)
+                    sa = src[..., 3:]
+                    stroke_rgb = np.array(_parse_color(color)[:3], dtype=np.uint16)
+                    out = np.empty(src.shape, dtype=np.uint8)
+                    out[..., :3] = (stroke_rgb * (255 - sa) + src[..., :3] * sa) // 255
+                    # 膨胀后的描边 alpha 必然覆盖原 alpha，取逐像素最大值即可
+                    out[..., 3] = np.maximum(np.asarray(stroke_alpha), src[..., 3].astype(np.uint8))
+                    set_array(out)
+                else:
+                    base = as_image()
+                    stroke = Image.new('RGBA', base.size, _parse_rgba(color))
+                    fx_canvas = Image.new('RGBA', base.size, (0,0,0,0))
+                    fx_canvas.paste(stroke, (0,0), stroke_alpha)
+                    fx_canvas.paste(base, (0,0), base)
+                    set_image(fx_canvas)
+
+        # --- 阶段 4: 尺寸与内边距 ---
+        padding = options.get('padding', 0)
+        if padding > 0:
+            w, h = dims()
+            target_size_inner = max(w, h)
+            new_size = int(target_size_inner / (1 - (padding / 100)))
+            paste_pos = ((new_size - w) // 2, (new_size - h) // 2)
+            if NUMPY_AVAILABLE:
+                # [性能优化] 背景完全透明，直接切片赋值即可，
+                # 无需 paste 的逐像素 alpha 合成
+                canvas = self._scratch.zeros((new_size, new_size, 4), np.uint8)
+                px, py = paste_pos
+                canvas[py:py + h, px:px + w] = as_array()
+                set_array(canvas)
+            else:
+                base = as_image()
+                padded_img = Image.new("RGBA", (new_size, new_size), (0, 0, 0, 0))
+                padded_img.paste(base, paste_pos, base)
+                set_image(padded_img)
+
+        # --- 阶段 5: 水印 ---
+        if mask & FEATURE_WATERMARK:
+            watermark_path = options.get('adv_watermark_path')
+            if os.path.exists(watermark_path):
+                try:
+                    wm_size_perc = options.get('adv_watermark_size', 20) / 100.0
+                    w, h = dims()
+                    base_size = min(w, h)
+                    new_wm_width = int(base_size * wm_size_perc)
+                    # [性能优化] 解码+缩放结果按 (路径, 宽度) 缓存复用
+                    watermark = self._resized_watermark(watermark_path, new_wm_width)
+                    new_wm_height = watermark.height
+
+                    opacity_perc = options.get('adv_watermark_opacity', 50)
+                    if opacity_perc < 100:
+                        # putalpha 会就地修改，先复制以免污染缓存条目
+                        watermark = watermark.copy()
+                        if NUMPY_AVAILABLE:
+                            # [性能优化] alpha 通道直接做整数乘除，
+                            # 跳过 ImageEnhance.Brightness 的浮点 LUT 路径
+                            a = np.asarray(watermark.getchannel('A'))
+                            a = ((a.astype(np.uint16) * opacity_perc) // 100).astype(np.uint8)
+                            watermark.putalpha(Image.fromarray(a, 'L'))
+                        else:
+                            wm_alpha = watermark.getchannel('A')
+                            wm_alpha = ImageEnhance.Brightness(wm_alpha).enhance(opacity_perc / 100.0)
+                            watermark.putalpha(wm_alpha)
+
+                    pos_map = {
+                        'top_left': (0, 0), 'top_center': ((w - new_wm_width)//2, 0), 'top_right': (w - new_wm_width, 0),
+                        'mid_left': (0, (h - new_wm_height)//2), 'center': ((w - new_wm_width)//2, (h - new_wm_height)//2), 'mid_right': (w - new_wm_width, (h - new_wm_height)//2),
+                        'bottom_left': (0, h - new_wm_height), 'bottom_center': ((w - new_wm_width)//2, h - new_wm_height), 'bottom_right': (w - new_wm_width, h - new_wm_height)
+                    }
+                    pos = pos_map.get(options.get('adv_watermark_pos'), 'bottom_right')
+
+                    base = as_image()
+                    if base is source_img:
+                        base = base.copy()
+                        set_image(base)
+                    base.paste(watermark, pos, watermark)
+                except Exception as e:
+                    print(f"应用水印失败: {e}")
+
+        # --- 阶段 6: 最终塑形 (圆角) ---
+        radius_percent = options.get('radius', 0)
+        if radius_percent > 0:
+            w, h = dims()
+            radius = int(min(w, h) * (radius_percent / 100) / 2)
+            if radius > 0:
+                corner_mask = _rounded_mask(w, h, radius)
+                if NUMPY_AVAILABLE:
+                    # [性能优化] 遮罩与现有 alpha 相乘而非整体覆盖，
+                    # 既保留图像原有的透明区域，也避免 putalpha(mask) 覆写缓存遮罩之外的语义
+                    a = as_array()
+                    a[..., 3] = (a[..., 3].astype(np.uint16) * np.asarray(corner_mask) // 255).astype(np.uint8)
+                else:
+                    base = as_image()
+                    if base is source_img:
+                        base = base.copy()
+                        set_image(base)
+                    base.putalpha(corner_mask)
+
+        return as_image()
+
+
+    def _generate_svg(self, source_path: str, output_dir: str, base_name: str, options: Dict[str, Any]):
+        """
+        [新增] 专门处理 SVG 到 SVG 的生成。
+        仅支持颜色叠加，忽略其他所有光栅效果。
+        """
+        output_file = os.path.join(output_dir, f"{base_name}.svg")
+        
+        # 如果未启用颜色叠加，直接复制源文件
+        if not options.get('color_overlay_enabled'):
+            # [性能优化] 同一文件系统上用硬链接实现零字节拷贝，失败时回退到普通复制
+            try:
+                if os.path.exists(output_file):
+                    os.remove(output_file)
+                os.link(source_path, output_file)
+            except OSError:
+                shutil.copy2(source_path, output_file)
+            return
+
+        # 如果启用了颜色叠加，改写 SVG 中的填充/描边颜色
+        new_color = options.get('color_overlay', '#000000')
+        try:
+            try:
+                # [性能优化] 用 ElementTree 只触碰带 fill/stroke 属性的节点，
+                # 不再对整个文档文本做两趟正则扫描；同时不会误改注释或
+                # 文本内容里恰好形如属性的片段
+                ET.register_namespace('', 'http://www.w3.org/2000/svg')
+                ET.register_namespace('xlink', 'http://www.w3.org/1999/xlink')
+                tree = ET.parse(source_path)
+                for elem in tree.iter():
+                    for attr in ('fill', 'stroke'):
+                        value = elem.get(attr)
+                        if value and value != 'none' and not value.startswith('url'):
+                            elem.set(attr, new_color)
+                tree.write(output_file, encoding='utf-8', xml_declaration=True)
+            except ET.ParseError:
+                # 非规范 XML 的 SVG：回退到预编译正则的文本替换
+                with open(source_path, 'r', encoding='utf-8') as f:
+                    svg_content = f.read()
+                svg_content = _SVG_FILL_RE.sub(f'fill="{new_color}"', svg_content)
+                svg_content = _SVG_STROKE_RE.sub(f'stroke="{new_color}"', svg_content)
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    f.write(svg_content)
+
+        except Exception as e:
+            raise IOError(f"处理 SVG 文件 '{os.path.basename(source_path)}' 失败: {e}")
+
+    def _export_sizes(self, processed_img: Image.Image, sizes: List[Tuple[int, int]],
+                      make_path, fmt: str):
+        """
+        [性能优化] 多尺寸导出。
+        先串行构建 BOX 半尺寸金字塔（每级廉价的 2x 下采样），每个目标尺寸
+        只从最邻近的较大层做一次 LANCZOS 精缩放，而不是每次都从全分辨率
+        原图重新采样；随后把各尺寸的精缩放+编码保存分发到线程池——Pillow
+        的 resize 与 PNG/ICO 编码都会释放 GIL，多个尺寸得以真正并行。
+        """
+        levels: List[Tuple[int, Image.Image]] = []
+        prev = processed_img
+        for size in sorted({s[0] for s in sizes}, reverse=True):
+            while prev.width // 2 >= size and prev.height // 2 >= size:
+                prev = prev.resize((prev.width // 2, prev.height // 2), Image.BOX)
+            levels.append((size, prev))
+
+        def render_one(entry: Tuple[int, Image.Image]):
+            size, level = entry
+            level.resize((size, size), Image.LANCZOS).save(make_path(size), format=fmt)
+
+        max_workers = min(len(levels), os.cpu_count() or 1)
+        if max_workers <= 1:
+            for entry in levels:
+                render_one(entry)
+            return
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # list() 迫使异常在此处重新抛出，保持与串行路径一致的错误传播
+            list(pool.map(render_one, levels))
+
+    def generate(self, source_path: str, output_dir: str, base_name: str, options: Dict[str, Any], remove_func: Optional[callable] = None):
+        """
+        [已重构] 生成图标的主入口点。
+        - 支持 SVG 源文件输入。
+        - 接收 remove_func 以支持异步加载。
+        - ICO格式现在会为每个选定的尺寸生成一个单独的文件。
+        - [新增] 增加了对 SVG 输出格式的特殊处理分支。
+        """
+        fmt = options.get('format', 'ico')
+        
+        # 确保输出目录存在
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        # --- [核心修正] SVG 输出的独立处理路径 ---
+        if fmt == 'svg':
+            # SVG输出格式仅在源文件也是SVG时有效
+            if not source_path.lower().endswith('.svg'):
+                raise ValueError("SVG输出格式仅支持SVG源文件。")
+            
+            # 调用专门的SVG处理方法，该方法仅处理颜色替换
+            self._generate_svg(source_path, output_dir, base_name, options)
+            return # SVG 处理完毕，直接返回，不执行后续的光栅化操作
+
+        # --- 原有的光栅图像处理路径 (ICO, ICNS, PNG) ---
+        # 步骤 1: 将源文件（无论是SVG还是位图）加载为 Pillow Image 对象
+        if source_path.lower().endswith('.svg'):
+            renderer = _svg_renderer(source_path)
+            # 渲染到一个足够大的 QImage (例如 1024x1024) 以保留矢量细节
+            qimage = QImage(1024, 1024, QImage.Format_RGBA8888)
+            qimage.fill(Qt.transparent)
+            painter = QPainter(qimage)
+            renderer.render(painter)
+            painter.end()
+
+            # [性能优化] 直接从原始像素缓冲转为 Pillow Image，跳过 PNG 编解码往返
+            source_img = _qimage_to_pil(qimage)
+        else:
+            # 原有的位图文件处理逻辑
+            source_img = Image.open(source_path)
+            # [性能优化] Image.open 是惰性的，显式 load() 把解码提前到此处；
+            # PNG/JPEG 解码期间 Pillow 会释放 GIL，并行批量时各 worker 才能真正重叠
+            source_img.load()
+
+        # 步骤 2: 对加载好的 Pillow Image 进行所有光栅效果处理
+        processed_img = self.process_image(source_img, options, remove_func)
+        
+        # 步骤 3: 根据目标格式保存处理后的图像
+        sizes = options.get('sizes', [])
+
+        if fmt == 'ico':
+            if not sizes: raise ValueError("ICO 格式必须至少选择一个尺寸。")
+            if options.get('ico_single_file'):
+                # [性能优化] 单文件多分辨率 ICO：一次 save 调用内嵌所有尺寸，
+                # 由 Pillow 内部完成各级重采样，省去 N-1 次独立编码
+                size_list = sorted({s[0] for s in sizes})
+                output_file = os.path.join(output_dir, f"{base_name}.ico")
+                processed_img.save(output_file, format='ICO', sizes=[(s, s) for s in size_list])
+            else:
+                # [性能优化] 多尺寸输出共享同一条下采样金字塔，并行精缩放+编码
+                self._export_sizes(
+                    processed_img, sizes,
+                    lambda size: os.path.join(output_dir, f"{base_name}_{size}x{size}.ico"),
+                    'ICO')
+        
+        elif fmt == 'icns':
+            output_file = os.path.join(output_dir, f"{base_name}.icns")
+            processed_img.save(output_file, format='ICNS')
+            
+        elif fmt == 'png_suite':
+            if not sizes: raise ValueError("PNG套件必须至少选择一个尺寸。")
+            # [性能优化] 与 ICO 分支相同，复用金字塔缩放并行保存
+            self._export_sizes(
+                processed_img, sizes,
+                lambda size: os.path.join(output_dir, f"{base_name}_{size}x{size}.png"),
+                'PNG')
+        else:
+            # 如果程序执行到这里，说明是一个未知的非SVG格式
+            raise ValueError(f"不支持的输出格式: {fmt}")
+
+
+class _GenerateFileTask(QRunnable):
+    """[性能优化] GenerateWorker 的单文件子任务，由其私有线程池并行调度。"""
+
+    def __init__(self, worker: 'GenerateWorker', source_path: str, base_name: str, output_dir: str):
+        super().__init__()
+        self.worker = worker
+        self.source_path = source_path
+        self.base_name = base_name
+        self.output_dir = output_dir
+
+    def run(self):
+        if self.worker.is_cancelled:
+            return
+        try:
+            self.worker.generator.generate(
+                self.source_path, self.output_dir, self.base_name,
+                self.worker.options, self.worker.remove_func
+            )
+            self.worker._on_file_done(self.base_name)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            self.worker._on_file_error(str(e))
+
+
+class GenerateWorker(QRunnable):
+    """
+    [已修正] 在后台线程中执行批量生成任务。
+    现在会接收并传递 remove_func 以支持异步加载的 rembg。
+    [性能优化] 批次内的文件彼此独立，改为按文件拆分成子任务在私有线程池中
+    并行处理（Pillow 的重型操作会释放 GIL，可获得接近核数的加速）。
+    """
+    class Signals(QObject):
+        progress = pyqtSignal(int, int, str)
+        finished = pyqtSignal(str)
+        error = pyqtSignal(str)
+
+    def __init__(self, generator: IconGenerator, batch: List[str], output_path: str, options: Dict[str, Any], remove_func: Optional[callable]):
+        super().__init__()
+        self.signals = self.Signals()
+        self.generator = generator
+        self.batch = batch
+        self.output_path = output_path
+        self.options = options
+        # [核心修正] 存储从主线程传入的 rembg 的 remove 函数
+        self.remove_func = remove_func
+        # [性能优化] 取消改用 threading.Event：对子任务线程的可见性有明确
+        # 保证，不依赖解释器对普通属性写入的内存序
+        self._cancel_event = threading.Event()
+        # [性能优化] 完成计数与首个错误由锁保护，供各子任务并发更新
+        self._lock = threading.Lock()
+        self._done_count = 0
+        self._first_error: Optional[str] = None
+
+    def cancel(self):
+        """设置取消标志，以请求中断任务。"""
+        self._cancel_event.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def _on_file_done(self, base_name: str):
+        """[线程安全] 子任务完成回调：推进计数并发射进度信号。"""
+        with self._lock:
+            self._done_count += 1
+            done = self._done_count
+        self.signals.progress.emit(done - 1, len(self.batch), base_name)
+
+    def _on_file_error(self, message: str):
+        """[线程安全] 记录首个错误并请求取消剩余子任务。"""
+        with self._lock:
+            if self._first_error is None:
+                self._first_error = message
+        self._cancel_event.set()
+
+    def run(self):
+        try:
+            total = len(self.batch)
+            fmt = self.options.get('format')
+            is_batch = total > 1
+
+            # 采用更健壮的方式来确定输出目录 (output_dir)
+            if is_batch or fmt == 'png_suite':
+                output_dir = self.output_path
+            else:
+                output_dir = os.path.dirname(self.output_path)
+
+            # [性能优化] 使用私有线程池做按文件的任务扇出。
+            # 不复用 globalInstance()：本 worker 自身占用着全局池的一个线程，
+            # 在其中等待子任务完成在小池子上可能死锁。
+            pool = QThreadPool()
+            # [性能优化] 并发度压在 min(8, 核数-1)：每个在途文件都持有
+            # 全尺寸 RGBA 画布，超大批次下不设上限会把内存峰值推得过高
+            pool.setMaxThreadCount(
+                max(1, min(8, QThreadPool.globalInstance().maxThreadCount() - 1)))
+
+            for source_path in self.batch:
+                base_name = os.path.splitext(os.path.basename(source_path))[0]
+
+                # 如果是单文件 ico/icns，base_name 需要被重写为用户指定的文件名
+                if not is_batch and fmt in ['ico', 'icns']:
+                    base_name = os.path.splitext(os.path.basename(self.output_path))[0]
+
+                pool.start(_GenerateFileTask(self, source_path, base_name, output_dir))
+
+            pool.waitForDone()
+
+            if self._first_error is not None:
+                self.signals.error.emit(self._first_error)
+            elif self.is_cancelled:
+                self.signals.finished.emit("操作已取消。")
+            else:
+                self.signals.finished.emit(f"成功生成 {total} 个图标批次到:\n{output_dir}")
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            self.signals.error.emit(str(e))
+class BatchThumbnailWorker(QRunnable):
+    """
+    [性能优化] 一次任务为一整批列表项生成缩略图，并按小批量回报结果。
+    相比每个图标各起一个单项任务，单个任务省去了数百个任务对象、
+    信号连接与线程切换；对 JPEG 源还通过 Image.draft 让解码器直接按
+    1/2、1/4、1/8 比例输出，跳过高频系数的完整反变换。
+    """
+    BATCH_SIZE = 20  # 每积累 20 个结果发射一次信号，避免逐项刷新UI
+
+    class Signals(QObject):
+        ready = pyqtSignal(list)  # List[Tuple[QListWidgetItem, QPixmap]]
+
+    def __init__(self, entries: List[Tuple[QListWidgetItem, str]], size: QSize):
+        super().__init__()
+        self.signals = self.Signals()
+        self.entries = entries
+        self.size = size
+        self.is_cancelled = False
+
+    def run(self):
+        batch = []
+        for item, path in self.entries:
+            if self.is_cancelled:
+                return
+            pixmap = self._make_pixmap(path)
+            if pixmap is not None:
+                batch.append((item, pixmap))
+            if len(batch) >= self.BATCH_SIZE:
+                self.signals.ready.emit(batch)
+                batch = []
+        if batch and not self.is_cancelled:
+            self.signals.ready.emit(batch)
+
+    def _make_pixmap(self, path: str) -> Optional[QPixmap]:
+        try:
+            if path.lower().endswith('.svg'):
+                renderer = _svg_renderer(path)
+                qimage = QImage(self.size, QImage.Format_ARGB32)
+                qimage.fill(Qt.transparent)
+                painter = QPainter(qimage)
+                renderer.render(painter)
+                painter.end()
+                pixmap = QPixmap.fromImage(qimage)
+            else:
+                img = Image.open(path)
+                # draft 仅对 JPEG 等支持缩放解码的格式生效，其余格式是空操作
+                img.draft("RGB", (128, 128))
+                img.thumbnail((self.size.width(), self.size.height()), Image.BILINEAR)
+                pixmap = QPixmap.fromImage(_pil_to_qimage(img))
+            return pixmap
+        except Exception as e:
+            print(f"为 {os.path.basename(path)} 生成缩略图失败: {e}")
+            return None
+
+class DecodeWorker(QRunnable):
+    """[性能优化] 在后台把新加入批次的位图源预解码进 _SourceCache。"""
+
+    def __init__(self, paths: List[str], cache: _SourceCache):
+        super().__init__()
+        self.paths = paths
+        self.cache = cache
+
+    def run(self):
+        for path in self.paths:
+            if self.cache.get(path) is not None:
+                continue
+            try:
+                img = Image.open(path)
+                img.load()  # 解码在此完成并释放 GIL
+                self.cache.put(path, img.convert('RGBA'))
+            except Exception as e:
+                print(f"预解码 {os.path.basename(path)} 失败: {e}")
+
+class RenderTask(QRunnable):
+    """
+    [性能优化] 在后台线程执行预览渲染（process_image + QImage 转换）。
+    GUI 线程只负责 QPixmap.fromImage 和上屏——QImage 的构建是可重入的，
+    QPixmap 则必须留在主线程。seq 为单调序号：用户持续拖动时，过期
+    任务的结果在槽里直接丢弃，不会出现旧帧覆盖新帧。
+    """
+
+    class Signals(QObject):
+        finished = pyqtSignal(int, object, QImage)  # (序号, 缓存键, 渲染结果)
+        failed = pyqtSignal(int, str)
+
+    def __init__(self, icon_generator: 'IconGenerator', source_img: Image.Image,
+                 options: Dict[str, Any], remove_func: Optional[callable],
+                 mask: int, preview_dim: int, seq: int, cache_key: Any):
+        super().__init__()
+        self.signals = self.Signals()
+        self.icon_generator = icon_generator
+        self.source_img = source_img
+        self.options = options
+        self.remove_func = remove_func
+        self.mask = mask
+        self.preview_dim = preview_dim
+        self.seq = seq
+        self.cache_key = cache_key
+
+    def run(self):
+        try:
+            source_img = self.source_img
+            # [性能优化] 预览只需预览区 2 倍的像素量，先缩小再过流水线
+            if self.preview_dim > 0 and max(source_img.width, source_img.height) > self.preview_dim:
+                source_img = source_img.copy()
+                source_img.thumbnail((self.preview_dim, self.preview_dim), Image.BILINEAR)
+
+            processed = self.icon_generator.process_image(
+                source_img, self.options, self.remove_func, mask=self.mask)
+            self.signals.finished.emit(self.seq, self.cache_key, _pil_to_qimage(processed))
+        except Exception as e:
+            self.signals.failed.emit(self.seq, str(e))
+
+
+class PresetLoader(QRunnable):
+    """[性能优化] 在后台线程读取并解析预设 JSON，缩短窗口可交互前的等待。"""
+
+    class Signals(QObject):
+        finished = pyqtSignal(dict)
+
+    def __init__(self, presets_path: str = "iconforge_presets.json"):
+        super().__init__()
+        self.signals = self.Signals()
+        self.presets_path = presets_path
+
+    def run(self):
+        presets = {}
+        try:
+            if os.path.exists(self.presets_path):
+                with open(self.presets_path, "rb") as f:
+                    raw = f.read()
+                # [性能优化] orjson 可用时用 C 路径解析
+                presets = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+        except Exception as e:
+            print(f"加载预设失败: {e}")
+        self.signals.finished.emit(presets)
+
+class _PresetPreviewTask(QRunnable):
+    """[性能优化] 在后台线程渲染并落盘预设预览图，保存预设不再卡住 UI。"""
+
+    class Signals(QObject):
+        finished = pyqtSignal()
+
+    def __init__(self, icon_generator: 'IconGenerator', source_path: str,
+                 preset_name: str, options: Dict[str, Any],
+                 remove_func: Optional[callable]):
+        super().__init__()
+        self.signals = self.Signals()
+        self.icon_generator = icon_generator
+        self.source_path = source_path
+        self.preset_name = preset_name
+        self.options = options
+        self.remove_func = remove_func
+
+    def run(self):
+        try:
+            source_img = Image.open(self.source_path)
+            processed_img = self.icon_generator.process_image(
+                source_img, self.options, self.remove_func)
+
+            # 缩放到合适的尺寸，并以正方形画布保证尺寸统一。
+            # [性能优化] reducing_gap 让 thumbnail 先用廉价的 reduce()
+            # 粗缩到目标的 3 倍，LANCZOS 核只扫描粗缩后的像素
+            processed_img.thumbnail((96, 96), Image.LANCZOS, reducing_gap=3.0)
+            preview_canvas = Image.new("RGBA", (96, 96), (0, 0, 0, 0))
+            paste_pos = ((96 - processed_img.width) // 2, (96 - processed_img.height) // 2)
+            preview_canvas.paste(processed_img, paste_pos, processed_img)
+
+            preview_dir = "presets_previews"
+            if not os.path.exists(preview_dir):
+                os.makedirs(preview_dir)
+
+            # 文件名不允许包含非法字符，净化逻辑统一收在 _preset_preview_path
+            preview_canvas.save(_preset_preview_path(self.preset_name), "PNG")
+        except Exception as e:
+            print(f"为预设 '{self.preset_name}' 生成预览图失败: {e}")
+        self.signals.finished.emit()
+
+
+class RembgInitializer(QRunnable):
+    """在后台线程中安全地初始化rembg库，避免阻塞UI。"""
+    class Signals(QObject):
+        # 信号：(初始化是否成功, 成功时返回的 remove 函数, ONNX 会话或 None)
+        finished = pyqtSignal(bool, object, object)
+
+    def __init__(self):
+        super().__init__()
+        self.signals = self.Signals()
+
+    def run(self):
+        """尝试导入 rembg。这可能会触发模型下载。"""
+        try:
+            from rembg import remove
+            # [性能优化] 优先构建量化 INT8 模型的会话：推理速度约 2-4 倍于
+            # 默认的 FP32 模型，权重体积也只有四分之一。有 CUDA 时优先用 GPU。
+            try:
+                from rembg import new_session
+                providers = ["CPUExecutionProvider"]
+                try:
+                    import onnxruntime
+                    if "CUDAExecutionProvider" in onnxruntime.get_available_providers():
+                        providers = ["CUDAExecutionProvider"] + providers
+                except Exception:
+                    pass
+                session = new_session("u2net_quantized", providers=providers)
+                remove_func = functools.partial(remove, session=session)
+            except Exception as e:
+                # 量化模型不可用（旧版 rembg、下载失败等）时退回默认路径
+                print(f"提示: rembg 量化模型会话创建失败，使用默认模型: {e}")
+                session = None
+                remove_func = remove
+            # 成功，发射带有 True、remove 函数和会话的信号
+            self.signals.finished.emit(True, remove_func, session)
+        except Exception as e:
+            print(f"Rembg 初始化失败: {e}")
+            # 失败，发射带有 False 和 None 的信号
+            self.signals.finished.emit(False, None, None)
+
+class LibraryScanner(QRunnable):
+    """
+    [最终修正版] 在后台扫描本地的图标库目录，现在支持 SVG 文件。
+    """
+    class Signals(QObject):
+        finished = pyqtSignal(dict)
+        # [核心修正] 恢复 progress 信号，以修复 AttributeError
+        progress = pyqtSignal(int, int, str)
+
+    def __init__(self, library_path="icon_library"):
+        super().__init__()
+        self.signals = self.Signals()
+        self.library_path = library_path
+
+    def run(self):
+        """直接扫描本地目录并构建索引。"""
+        icon_library = {}
+        if not os.path.isdir(self.library_path):
+            print(f"提示: 图标库目录 '{self.library_path}' 未找到。请根据说明手动创建并填充。")
+            self.signals.finished.emit({})
+            return
+
+        try:
+            # 因为 lucide 的 svg 是扁平结构，我们不再寻找子目录
+            self.signals.progress.emit(0, 100, "正在扫描图标库...")
+            # [性能优化] os.scandir 在一次 readdir 中就能过滤文件类型，
+            # 无需像 listdir + 逐项判断那样产生额外 stat 调用
+            with os.scandir(self.library_path) as it:
+                icons = [e.path for e in it
+                         if e.is_file(follow_symlinks=False) and e.name.lower().endswith('.svg')]
+            icons.sort()
+
+            # [性能优化] 跨线程信号封送开销不小：不再每个文件发射一次进度，
+            # 扫描本身只剩一次目录枚举，完成时发射一次即可
+            self.signals.progress.emit(100, 100, "正在扫描图标库...")
+
+            if icons:
+                icon_library["通用图标"] = icons
+            
+            self.signals.finished.emit(icon_library)
+
+        except Exception as e:
+            print(f"扫描图标库时出错: {e}")
+            self.signals.finished.emit({})
+
+
+
+
+
+
+
+
+
+
+
+# ==============================================================================
+# SECTION 2: QT 特定模型与命令 (QT MODELS & COMMANDS)
+# ==============================================================================
+class ModifyOptionsCommand(QUndoCommand):
+    """
+    一个用于记录处理选项修改的 QUndoCommand。
+    [性能优化] 同一选项的连续修改（例如拖动滑块）通过 id()/mergeWith()
+    在撤销栈上合并为一条命令，避免一次拖动留下几十条记录并触发等量重绘。
+    """
+    # 每个选项 key 对应一个稳定的命令 id，QUndoStack 以此判断可否合并
+    _KEY_IDS: Dict[str, int] = {}
+
+    def __init__(self, main_window: 'IconForgeWindow', key: str, new_value: Any, description: str):
+        super().__init__(description)
+        self.main = main_window
+        self.key = key
+        self.new_value = new_value
+        self.old_value = self.main.current_options[key]
+
+    def id(self) -> int:
+        return self._KEY_IDS.setdefault(self.key, len(self._KEY_IDS) + 1)
+
+    def mergeWith(self, other: QUndoCommand) -> bool:
+        if not isinstance(other, ModifyOptionsCommand) or other.key != self.key:
+            return False
+        self.new_value = other.new_value
+        return True
+
+    def redo(self):
+        self.main.current_options[self.key] = self.new_value
+        self.main._notify_options_changed()
+
+    def undo(self):
+        self.main.current_options[self.key] = self.old_value
+        self.main._notify_options_changed()
+
+# ==============================================================================
+# SECTION 3: 主窗口与控制器 (MAIN WINDOW & CONTROLLER)
+# ==============================================================================
+class Theme:
+    """管理应用程序的颜色和全局样式表 (QSS)。"""
+    # [性能优化] 调色板从 dict 换成不可变 namedtuple：取色是一次 C 层属性
+    # 访问而非哈希查找，且常量天然防止运行期被意外改写
+    Palette = namedtuple('Palette', [
+        'bg_primary', 'bg_secondary', 'bg_tertiary',
+        'content_primary', 'content_secondary',
+        'accent_primary', 'accent_primary_hover', 'accent_primary_pressed',
+        'border_primary', 'danger', 'success', 'warning', 'info'
+    ])
+
+    LIGHT = Palette(
+        bg_primary="#f8fafc", bg_secondary="#ffffff", bg_tertiary="#f1f5f9",
+        content_primary="#0f172a", content_secondary="#64748b",
+        accent_primary="#4f46e5", accent_primary_hover="#6366f1", accent_primary_pressed="#4338ca",
+        border_primary="#e2e8f0", danger="#ef4444", success="#22c55e",
+        warning="#f59e0b", info="#3b82f6"
+    )
+
+    # [性能优化] 渲染结果缓存：QSS 文本在模块导入时构建一次（见类定义之后），
+    # 所有调用方共享同一份字符串
+    _QSS_CACHE: str = ""
+
+    @staticmethod
+    def get_qss() -> str:
+        return Theme._QSS_CACHE
+
+    @staticmethod
+    def _render_qss() -> str:
+        colors = Theme.LIGHT
+        return f"""
+            QMainWindow, QStatusBar, QDockWidget {{
+                background-color: {colors.bg_primary};
+            }}
+            QToolBar {{
+                background-color: {colors.accent_primary};
+                border: none;
+                padding: 0px;
+                spacing: 10px;
+            }}
+            QLabel#NavTitleLabel {{
+                color: white;
+                font-size: 16pt;
+                font-weight: bold;
+                padding-left: 10px;
+            }}
+            QTabWidget::pane {{
+                border: none;
+            }}
+            QTabBar::tab {{
+                background: transparent;
+                color: {colors.content_secondary};
+                padding: 8px 15px;
+                border-bottom: 2px solid transparent;
+                font-weight: bold;
+            }}
+            QTabBar::tab:hover {{
+                color: {colors.content_primary};
+            }}
+            QTabBar::tab:selected {{
+                color: {colors.accent_primary};
+                border-bottom: 2px solid {colors.accent_primary};
+            }}
+            QListWidget {{
+                background-color: {colors.bg_secondary};
+                border: 1px solid {colors.border_primary};
+                border-radius: 4px;
+            }}
+            QListWidget::item:selected {{
+                background-color: {colors.accent_primary};
+                color: white;
+            }}
+            QPushButton {{
+                border: none;
+                padding: 8px 12px;
+                border-radius: 4px;
+                font-weight: bold;
+                font-size: 10pt;
+            }}
+            QPushButton[cssClass="toolbar"] {{
+                background-color: {colors.accent_primary_hover};
+                color: white;
+                padding: 8px 14px;
+            }}
+            QPushButton[cssClass="toolbar"]:hover {{
+                background-color: {colors.accent_primary_pressed};
+            }}
+            QPushButton#PrimaryButton {{
+                background-color: {colors.success};
+                color: white;
+                font-size: 11pt;
+                padding: 12px;
+            }}
+            QPushButton#PrimaryButton:hover {{
+                background-color: #16a34a;
+            }}
+            QPushButton[cssClass="colorSwatch"] {{
+                background-color: palette(button);
+                border: 1px solid #ccc;
+                border-radius: 4px;
+                padding: 0px;
+            }}
+            QSlider::groove:horizontal {{
+                border: 1px solid #bbb;
+                background: white;
+                height: 8px;
+                border-radius: 4px;
+            }}
+            QSlider::handle:horizontal {{
+                background: {colors.accent_primary};
+                border: 1px solid {colors.accent_primary};
+                width: 16px;
+                margin: -4px 0;
+                border-radius: 8px;
+            }}
+            QLineEdit {{
+                border: 1px solid {colors.border_primary};
+                border-radius: 4px;
+                padding: 5px;
+            }}
+            /* [性能优化] 原先由 CardWidget / EmptyListWidget 以实例级
+               setStyleSheet 设置的规则，统一并入主窗口样式表：
+               整个应用只解析、只 polish 一次 */
+            #CardWidget {{
+                background-color: {colors.bg_secondary};
+                border: 1px solid {colors.border_primary};
+                border-radius: 6px;
+            }}
+            QLabel#CardTitleBar {{
+                background-color: {colors.bg_tertiary};
+                color: {colors.content_primary};
+                padding: 10px 15px;
+                border-top-left-radius: 6px;
+                border-top-right-radius: 6px;
+                border-bottom: 1px solid {colors.border_primary};
+                font-size: 11pt;
+                font-weight: bold;
+            }}
+            QPushButton#EmptyListIconButton {{
+                font-size: 48pt;
+                border: none;
+                background: transparent;
+                padding: 10px;
+            }}
+            QPushButton#EmptyListIconButton:hover {{
+                /* 轻微的背景色提示可点击 */
+                background-color: #f0f0f0;
+                border-radius: 8px;
+            }}
+            QLabel#EmptyListTextLabel {{
+                color: {colors.content_primary};
+                font-size: 14pt;
+                font-weight: bold;
+            }}
+            QLabel#EmptyListInfoLabel {{
+                color: {colors.content_secondary};
+            }}
+            QLabel#CentralHeader {{
+                background-color: {colors.bg_secondary};
+                padding-left: 15px;
+                font-weight: bold;
+                border-bottom: 1px solid {colors.border_primary};
+            }}
+            QLabel#MainPreview {{
+                background-color: {colors.bg_tertiary};
+            }}
+            QLabel#SvgWarningLabel {{
+                color: {colors.info};
+                background-color: #eff6ff;
+                border: 1px solid #dbeafe;
+                border-radius: 4px;
+                padding: 8px;
+            }}
+            QLabel#WatermarkPathLabel {{
+                font-size: 8pt;
+                color: grey;
+            }}
+            QPushButton#GenerateCurrentButton {{
+                background-color: {colors.info};
+                color: white;
+            }}
+        """
+
+# [性能优化] 主题色是常量，所有 {colors[...]} 替换在导入期一次性完成；
+# 运行时（含未来的主题切换热路径）不再执行任何 f-string 格式化
+Theme._QSS_CACHE = Theme._render_qss()
+
+
+class CardWidget(QFrame):
+    """
+    一个可重用的、带标题的卡片式布局容器。
+    [性能优化] 样式由主窗口统一的样式表按 objectName 选择器提供，
+    实例不再各自 setStyleSheet（省去每张卡片的 CSS 解析与 re-polish）。
+    """
+
+    def __init__(self, title: str, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.theme = Theme.LIGHT
+        main_layout = QVBoxLayout(self)
+        main_layout.setContentsMargins(1, 1, 1, 1)
+        main_layout.setSpacing(0)
+
+        self.title_bar = QLabel(title)
+        self.title_bar.setObjectName("CardTitleBar")
+        self._content_widget = QWidget()
+
+        main_layout.addWidget(self.title_bar)
+        main_layout.addWidget(self._content_widget, 1)
+
+        self.setObjectName("CardWidget")
+    def contentWidget(self) -> QWidget:
+        return self._content_widget
+class EmptyListWidget(QWidget):
+    """
+    当列表为空时显示的引导性Widget。
+    [已升级] 文件夹图标现在可以点击，并会发射一个信号。
+    """
+    # 1. 定义一个自定义信号，当图标被点击时发射
+    folder_icon_clicked = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setAlignment(Qt.AlignCenter)
+        layout.setSpacing(15)
+
+        # 2. 将原来的 QLabel 换成 QPushButton
+        # [性能优化] 样式同样并入主窗口样式表，这里只设置 objectName
+        self.icon_button = QPushButton("📂")
+        # 3. 按钮外观由全局 QSS 提供（无边框图标 + 悬停提示），此处仅设置手形光标
+        self.icon_button.setCursor(Qt.PointingHandCursor)
+        self.icon_button.setObjectName("EmptyListIconButton")
+
+        text_label = QLabel("列表为空")
+        text_label.setObjectName("EmptyListTextLabel")
+
+        info_label = QLabel("将文件/文件夹拖拽到此处\n或点击上方图标及顶部工具栏按钮添加")
+        info_label.setAlignment(Qt.AlignCenter)
+        info_label.setObjectName("EmptyListInfoLabel")
+
+        # 4. 将按钮的 clicked 信号连接到我们自定义信号的 emit() 方法
+        self.icon_button.clicked.connect(self.folder_icon_clicked.emit)
+
+        # 5. 将新的按钮添加到布局中
+        layout.addWidget(self.icon_button, alignment=Qt.AlignCenter)
+        layout.addWidget(text_label, alignment=Qt.AlignCenter)
+        layout.addWidget(info_label, alignment=Qt.AlignCenter)
+
+
+class IconForgeWindow(QMainWindow):
+    """应用程序的主窗口 V4.0。"""
+    
+    PLATFORM_TEMPLATES = {
+        "Windows (.ico)": {'sizes': [16, 24, 32, 48, 256], 'format': 'ico'},
+        "macOS (.icns)": {'sizes': [], 'format': 'icns'},
+        "Android Adaptive": {'sizes': [48, 72, 96, 144, 192, 512], 'format': 'png_suite'},
+        "iOS AppIcon": {'sizes': [20, 29, 40, 58, 60, 76, 80, 87, 120, 152, 167, 180, 1024], 'format': 'png_suite'},
+        "Vector (.svg)": {'sizes': [], 'format': 'svg'} # [新增] SVG 模板
+    }
+
+    # [性能优化] 九宫格水印位置：元组 + 反查字典挂在类上，热路径不再
+    # 每次重建列表并线性 index()
+    WATERMARK_POS = ('top_left', 'top_center', 'top_right',
+                     'mid_left', 'center', 'mid_right',
+                     'bottom_left', 'bottom_center', 'bottom_right')
+    WATERMARK_POS_IDX = {name: i for i, name in enumerate(WATERMARK_POS)}
+
+    def __init__(self):
+        super().__init__()
+        self.icon_generator = IconGenerator()
+        self.batch_items: List[str] = []
+        # [性能优化] batch_items 的集合镜像：去重判断 O(1)，大目录重复导入不再平方级
+        self._batch_items_set: set = set()
+        self.presets: Dict[str, Dict] = {}
+        self.current_options: Dict[str, Any] = self._get_default_options()
+        # [性能优化] 默认选项快照，供预览的"无任何效果"快速路径做比对
+        self._default_options: Dict[str, Any] = self._get_default_options()
+        # [性能优化] 选项宏嵌套计数；宏内挂起逐命令的 UI 刷新
+        self._in_macro = 0
+        # [性能优化] 活动特性位掩码，选项变更时折叠一次，预览热路径直接复用
+        self._active_mask = _compute_active_mask(self.current_options)
+        # [性能优化] 预览渲染的单调序号；后台任务回报时据此丢弃过期帧
+        self._render_seq = 0
+        # [性能优化] 复用的取色对话框（首次取色时惰性构建）
+        self._color_dialog: Optional[QColorDialog] = None
+        # [性能优化] 滑块 -> (数值标签, 后缀)，共享标签刷新槽用 sender() 反查
+        self._slider_labels: Dict[QSlider, Tuple[QLabel, str]] = {}
+        # [性能优化] _pil_to_pixmap 当前帧像素缓冲的存活锚点（见该方法文档）
+        self._last_buf: Optional[bytes] = None
+        # [性能优化] _pil_to_pixmap 当前帧 BGRA 数组的存活锚点（numpy 路径）
+        self._last_arr: Optional['np.ndarray'] = None
+        self.undo_stack = QUndoStack(self)
+        self.setAcceptDrops(True)
+        self.thread_pool = QThreadPool.globalInstance()
+        self.active_workers = []
+        # [性能优化] 当前分类的批量缩略图工作器，切换分类时用于取消旧任务
+        self._library_thumb_worker: Optional[BatchThumbnailWorker] = None
+        # [新增] 定义内置样本图片的路径，用于生成预设预览
+        self.preview_sample_path = "preview_sample.png"
+
+        # [核心修正] 用于存储异步加载成功的 rembg.remove 函数
+        self.rembg_remove_func: Optional[callable] = None
+        # [性能优化] 复用的 rembg ONNX 会话（rembg_remove_func 已绑定到它）
+        self.rembg_session: Optional[object] = None
+        # [核心修正] 用于存储已加载水印图片的 Pillow Image 对象
+        self.watermark_image: Optional[Image.Image] = None
+        # [核心修正] 用于追踪当前加载的水印图片的文件路径
+        self.watermark_image_path: str = ""
+        self.icon_library_data: Dict[str, List[str]] = {}
+
+        # [性能优化] 预览刷新防抖定时器：短时间内的多次刷新请求只触发一次重绘
+        self._preview_timer = QTimer(self)
+        self._preview_timer.setSingleShot(True)
+        self._preview_timer.setInterval(60)
+        self._preview_timer.timeout.connect(self._update_realtime_preview)
+
+        # [性能优化] 滑块拖动产生的属性变更先进入待定表，由单发定时器
+        # 合并后统一提交：拖动因此能实时反馈，又不必为每个中间值都重渲染。
+        # 数值标签不走防抖（_create_slider_with_label 里直连），始终即时
+        # 跟手；30ms 窗口在合并效果与松手后的响应之间取得平衡
+        self._pending_props: Dict[str, Tuple[Any, str]] = {}
+        self._prop_flush_timer = QTimer(self)
+        self._prop_flush_timer.setSingleShot(True)
+        self._prop_flush_timer.setInterval(30)
+        self._prop_flush_timer.timeout.connect(self._flush_pending_props)
+
+        # [性能优化] 已渲染预览的 LRU 缓存：键为 (源路径, 选项指纹)，
+        # 在多张图片间来回切换而选项未变时，重渲染代价降为零
+        self._preview_cache: 'OrderedDict[tuple, QPixmap]' = OrderedDict()
+        self._PREVIEW_CACHE_MAX = 32
+
+        # [性能优化] 已解码源图像缓存：文件加入批次时后台填充
+        self._source_cache = _SourceCache()
+
+        # [性能优化] 缩略图共享 Qt 全局像素缓存（100 MB）：同一图标再次出现
+        # （切回分类、重复加入批次）时直接命中，不再重新解码渲染
+        QPixmapCache.setCacheLimit(102400)
+
+        self.setWindowTitle("MCD图标工具 (IconForge Pro) V4.0")
+        self.setGeometry(100, 100, 1300, 850)
+        self.setStyleSheet(Theme.get_qss())
+
+        self._create_toolbar()
+        self._create_central_widget()
+        self._create_docks()
+        self._create_statusbar()
+        self._connect_signals()
+        
+        self.setDockOptions(QMainWindow.AnimatedDocks | QMainWindow.AllowNestedDocks)
+        self.setTabPosition(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea, QTabWidget.North)
+        self._load_presets()
+
+        # [核心修正] 在UI完全加载后，启动 rembg 后台初始化
+        self._initialize_rembg_async()
+        self._initialize_library_async()
+    
+    # --- 添加一个新的方法 ---
+    def _initialize_rembg_async(self):
+        """启动一个后台任务来加载 rembg 库。"""
+        self.statusBar().showMessage("正在初始化背景移除模块，请稍候...")
+        self.remove_bg_cb.setEnabled(False)
+        self.remove_bg_cb.setToolTip("正在加载 rembg 模块...")
+
+        worker = RembgInitializer()
+        worker.signals.finished.connect(self._on_rembg_initialized)
+        
+        # [核心修正] 将 worker 添加到 active_workers 列表以保持其存活
+        self.active_workers.append(worker)
+        worker.signals.finished.connect(lambda: self.active_workers.remove(worker)) # 任务完成后自动移除
+
+        self.thread_pool.start(worker)
+
+    # --- 添加一个新的槽函数 ---
+    def _on_rembg_initialized(self, success: bool, remove_function: Optional[callable], session: object = None):
+        """当 rembg 初始化完成后，此槽函数被调用。"""
+        global REMBG_AVAILABLE
+        if success:
+            REMBG_AVAILABLE = True
+            # [性能优化] 全程只持有这一个 ONNX 会话：模型解析与图优化只发生
+            # 一次，批量处理的每次 remove 调用都复用它
+            self.rembg_session = session
+            self.rembg_remove_func = remove_function
+            # [性能优化] rembg 就绪后，启用了背景移除的旧预览结果不再有效
+            self._preview_cache.clear()
+            self.remove_bg_cb.setEnabled(True)
+            self.remove_bg_cb.setToolTip("启用或禁用背景移除功能 (由 rembg 提供)")
+            self.statusBar().showMessage("背景移除功能已准备就绪。", 5000)
+        else:
+            REMBG_AVAILABLE = False
+            self.remove_bg_cb.setToolTip("rembg 模块加载失败，此功能不可用。")
+            self.statusBar().showMessage("背景移除模块加载失败。", 5000)
+
+    def _initialize_library_async(self):
+        """
+        [已修正] 启动一个后台任务来扫描本地图标库。
+        现在会正确管理 worker 的生命周期，防止其被意外销毁。
+        """
+        self.statusBar().showMessage("正在加载图标库...")
+        
+        worker = LibraryScanner()
+        worker.signals.finished.connect(self._on_library_loaded)
+        worker.signals.progress.connect(lambda cur, tot, msg: self.statusBar().showMessage(msg))
+        
+        # [核心修正] 将 worker 添加到 active_workers 列表以保持其存活，
+        # 并在其任务完成后（finished信号发出时）自动从列表中移除。
+        self.active_workers.append(worker)
+        worker.signals.finished.connect(lambda: self.active_workers.remove(worker))
+
+        self.thread_pool.start(worker)
+    def _on_library_progress(self, current, total, message):
+        """更新图标库下载/解压的进度对话框。"""
+        if hasattr(self, 'library_progress_dialog'):
+            self.library_progress_dialog.setMaximum(total)
+            self.library_progress_dialog.setValue(current)
+            self.library_progress_dialog.setLabelText(message)
+    def _on_library_loaded(self, library_data: dict):
+        """当图标库扫描完成后，此槽函数被调用。"""
+        self.icon_library_data = library_data
+        if not library_data:
+            self.statusBar().showMessage("图标库为空或未找到。", 5000)
+            # 可以在“图标库”选项卡中显示一个“空”状态的提示
+            return
+        
+        self.library_categories.clear()
+        self.library_categories.addItems(self.icon_library_data.keys())
+        # 默认选中第一个分类并加载其图标
+        if self.library_categories.count() > 0:
+            self.library_categories.setCurrentRow(0)
+        
+        self.statusBar().showMessage("图标库已加载。", 5000)
+
+    def _on_library_category_changed(self):
+        """当用户选择一个新的图标分类时，更新右侧的图标展示区。"""
+        self.library_icons.clear()
+        selected_item = self.library_categories.currentItem()
+        if not selected_item:
+            return
+            
+        # [性能优化] 切换分类时取消上一批缩略图任务，不再为已清空的列表解码
+        if self._library_thumb_worker is not None:
+            self._library_thumb_worker.is_cancelled = True
+            self._library_thumb_worker = None
+
+        category = selected_item.text()
+        if category in self.icon_library_data:
+            icon_paths = self.icon_library_data[category]
+            entries = []
+            # [核心修正] 缓存键带上目标尺寸：图标库 (64px) 与批次列表 (48px)
+            # 各自渲染，避免一方的缩略图被另一方拉伸复用
+            thumb_w = self.library_icons.iconSize().width()
+            for path in icon_paths:
+                # 创建列表项，但不立即加载图标
+                item = QListWidgetItem(os.path.splitext(os.path.basename(path))[0])
+                item.setData(Qt.UserRole, path)
+                item.setToolTip(path)
+                # 先设置一个占位符或留空
+                self.library_icons.addItem(item)
+                # [性能优化] 先查 QPixmapCache，命中则免去后台重新渲染
+                cached = QPixmapCache.find(f"thumb:{path}@{thumb_w}")
+                if cached is not None and not cached.isNull():
+                    item.setIcon(QIcon(cached))
+                else:
+                    entries.append((item, path))
+            if entries:
+                # [性能优化] 整个分类只提交一个批量工作器，结果按小批量回报
+                worker = BatchThumbnailWorker(entries, self.library_icons.iconSize())
+                worker.signals.ready.connect(self._on_thumbnails_ready)
+                self._library_thumb_worker = worker
+                self.thread_pool.start(worker)
+
+    def _on_library_icon_activated(self, item: QListWidgetItem):
+        """当用户双击图标库中的一个图标时，将其添加到“我的文件”列表。"""
+        icon_path = item.data(Qt.UserRole)
+        if icon_path:
+            # 1. 添加文件到处理批次
+            self._add_files_to_batch([icon_path])
+            
+            # 2. 切换到“我的文件”选项卡
+            self.source_tabs.setCurrentIndex(0) # 假设“我的文件”是第一个选项卡
+            
+            # 3. 在列表中找到并选中刚刚添加的项
+            # (这是一个小优化，确保用户能立即看到它)
+            for i in range(self.batch_list.count()):
+                list_item = self.batch_list.item(i)
+                if list_item.data(Qt.UserRole) == icon_path:
+                    self.batch_list.setCurrentItem(list_item)
+                    break
+    # --- UI 创建辅助函数 ---
+    def _create_toolbar(self):
+        toolbar = QToolBar("主工具栏")
+        toolbar.setMovable(False)
+        title = QLabel("MCD图标工具   作者：跳舞的火公子")
+        title.setObjectName("NavTitleLabel")
+        toolbar.addWidget(title)
+        
+        spacer = QWidget()
+        spacer.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        toolbar.addWidget(spacer)
+        
+        self.add_files_btn = QPushButton("添加文件")
+        self.add_folder_btn = QPushButton("添加文件夹")
+        self.clear_batch_btn = QPushButton("清空列表")
+        for btn in [self.add_files_btn, self.add_folder_btn, self.clear_batch_btn]:
+            btn.setProperty("cssClass", "toolbar")
+            toolbar.addWidget(btn)
+        self.addToolBar(toolbar)
+
+    def _create_central_widget(self):
+        main_widget = QWidget()
+        layout = QVBoxLayout(main_widget)
+        layout.setSpacing(0)
+        layout.setContentsMargins(0, 0, 0, 0)
+        
+        self.central_header = QLabel("未选择文件")
+        self.central_header.setFixedHeight(40)
+        # [性能优化] 样式经 objectName 并入全局 QSS，不再逐控件解析
+        self.central_header.setObjectName("CentralHeader")
+
+        self.main_preview = QLabel("请从左侧列表选择一张图片")
+        self.main_preview.setAlignment(Qt.AlignCenter)
+        self.main_preview.setObjectName("MainPreview")
+        
+        layout.addWidget(self.central_header)
+        layout.addWidget(self.main_preview, 1)
+        self.setCentralWidget(main_widget)
+
+    def _create_docks(self):
+        """
+        [已重写] 创建左右两侧的可停靠面板。
+        左侧源浏览器现在包含“我的文件”和“图标库”两个选项卡。
+        """
+        # --- 左侧：源浏览器 ---
+        left_dock = QDockWidget("源浏览器", self)
+        left_dock.setAllowedAreas(Qt.LeftDockWidgetArea)
+        left_dock.setMinimumWidth(320) # 稍微加宽以容纳新UI
+        left_dock.setTitleBarWidget(QWidget())
+        left_dock.setFeatures(QDockWidget.NoDockWidgetFeatures)
+
+        # 创建一个包含选项卡和内容区域的容器
+        left_dock_content = QWidget()
+        left_layout = QVBoxLayout(left_dock_content)
+        left_layout.setSpacing(0)
+        left_layout.setContentsMargins(0, 0, 0, 0)
+        
+        # 1. [新增] 创建顶部选项卡栏
+        self.source_tabs = QTabWidget()
+        left_layout.addWidget(self.source_tabs)
+        
+        # --- 选项卡1: 我的文件 ---
+        my_files_widget = QWidget()
+        my_files_layout = QVBoxLayout(my_files_widget)
+        my_files_layout.setContentsMargins(0,0,0,0)
+        
+        # 使用 QStackedWidget 来切换“空列表”和“文件列表”
+        self.left_stack = QStackedWidget()
+        self.empty_list_widget = EmptyListWidget()
+        self.empty_list_widget.folder_icon_clicked.connect(self._add_folder_to_batch)
+        self.batch_list = QListWidget()
+        self.batch_list.setIconSize(QSize(48, 48))
+        self.batch_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.left_stack.addWidget(self.empty_list_widget)
+        self.left_stack.addWidget(self.batch_list)
+        
+        my_files_layout.addWidget(self.left_stack)
+        self.source_tabs.addTab(my_files_widget, "我的文件")
+        self.left_stack.setCurrentWidget(self.empty_list_widget)
+
+        # --- [新增] 选项卡2: 图标库 ---
+        library_widget = QWidget()
+        library_layout = QHBoxLayout(library_widget)
+        library_layout.setSpacing(5)
+        
+        # 图标库左侧：分类列表
+        self.library_categories = QListWidget()
+        self.library_categories.setMaximumWidth(120)
+        
+        # 图标库右侧：图标展示区
+        self.library_icons = QListWidget()
+        self.library_icons.setViewMode(QListWidget.IconMode)
+        self.library_icons.setIconSize(QSize(64, 64))
+        self.library_icons.setResizeMode(QListWidget.Adjust)
+        self.library_icons.setSpacing(10)
+        
+        library_layout.addWidget(self.library_categories)
+        library_layout.addWidget(self.library_icons)
+        self.source_tabs.addTab(library_widget, "图标库")
+
+        # --- 最终设置 ---
+        left_dock.setWidget(left_dock_content)
+        self.addDockWidget(Qt.LeftDockWidgetArea, left_dock)
+
+        # --- 右侧：属性检查器 (保持不变) ---
+        right_dock = QDockWidget("属性检查器", self)
+        right_dock.setAllowedAreas(Qt.RightDockWidgetArea)
+        right_dock.setMinimumWidth(380)
+        right_dock.setTitleBarWidget(QWidget())
+        right_dock.setFeatures(QDockWidget.NoDockWidgetFeatures)
+        
+        self.inspector_tabs = QTabWidget()
+        # [性能优化] 仅默认显示的"处理"选项卡急切构建；输出/预设/历史三个
+        # 选项卡先放空占位页，首次切换到时才真正创建其中的几十个控件，
+        # 把它们移出冷启动关键路径
+        self.inspector_tabs.addTab(self._create_process_tab(), "🎨 处理")
+        self._lazy_tab_builders: Dict[int, Tuple[str, Any]] = {
+            1: ("📤 输出", self._create_output_tab),
+            2: ("⚙️ 预设", self._create_presets_tab),
+            3: ("📜 历史", self._create_history_tab),
+        }
+        for index in sorted(self._lazy_tab_builders):
+            self.inspector_tabs.addTab(QWidget(), self._lazy_tab_builders[index][0])
+        self.inspector_tabs.currentChanged.connect(self._ensure_tab_built)
+
+        right_dock.setWidget(self.inspector_tabs)
+        self.addDockWidget(Qt.RightDockWidgetArea, right_dock)
+
+    def _ensure_tab_built(self, index: int):
+        """[性能优化] 首次切换到懒构建选项卡时，用真实内容替换占位页。"""
+        builder = self._lazy_tab_builders.pop(index, None)
+        if builder is None:
+            return
+        title, build = builder
+        widget = build()
+        self.inspector_tabs.blockSignals(True)
+        self.inspector_tabs.removeTab(index)
+        self.inspector_tabs.insertTab(index, widget, title)
+        self.inspector_tabs.setCurrentIndex(index)
+        self.inspector_tabs.blockSignals(False)
+
+
+    def dragEnterEvent(self, event):
+        """处理文件拖拽进入主窗口区域的事件。"""
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+        else:
+            event.ignore()
+
+    def dropEvent(self, event):
+        """
+        处理文件在主窗口区域释放的事件。
+        [已修正] 增加了对拖拽 .svg 文件的支持。
+        """
+        urls = event.mimeData().urls()
+        files_to_add = []
+
+        for url in urls:
+            if url.isLocalFile():
+                path = url.toLocalFile()
+                if os.path.isdir(path):
+                    # [性能优化] scandir 一次 readdir 拿到类型信息，
+                    # 扩展名用 frozenset 做 O(1) 成员判定
+                    with os.scandir(path) as it:
+                        files_to_add.extend(
+                            e.path for e in it
+                            if e.is_file(follow_symlinks=False)
+                            and os.path.splitext(e.name)[1].lower() in _SUPPORTED_EXTS)
+                elif os.path.splitext(path)[1].lower() in _SUPPORTED_EXTS:
+                    files_to_add.append(path)
+        
+        if files_to_add:
+            self._add_files_to_batch(files_to_add)
+
+    def _create_process_tab(self):
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setSpacing(15)
+        layout.setContentsMargins(10, 15, 10, 10)
+
+        # --- 卡片1: 基础图像处理 (大部分不变) ---
+        base_card = CardWidget("图像处理")
+        proc_layout = QGridLayout(base_card.contentWidget())
+        
+        self.padding_slider, self.padding_label = self._create_slider_with_label(0, 0, 80, "%")
+        self.radius_slider, self.radius_label = self._create_slider_with_label(0, 0, 100, "%")
+        self.color_overlay_cb = QCheckBox("颜色叠加:")
+        self.color_overlay_btn = QPushButton()
+        self._init_color_btn(self.color_overlay_btn)
+        self.remove_bg_cb = QCheckBox("移除背景")
+        self.remove_bg_cb.setEnabled(False) # 初始禁用，等待异步加载
+        self.fill_bg_cb = QCheckBox("填充背景色:")
+        self.bg_color_btn = QPushButton()
+        self._init_color_btn(self.bg_color_btn, "#ffffff")
+
+        proc_layout.addWidget(QLabel("内边距:"), 0, 0); proc_layout.addWidget(self.padding_slider, 0, 1); proc_layout.addWidget(self.padding_label, 0, 2)
+        proc_layout.addWidget(QLabel("圆角半径:"), 1, 0); proc_layout.addWidget(self.radius_slider, 1, 1); proc_layout.addWidget(self.radius_label, 1, 2)
+        overlay_layout = QHBoxLayout(); overlay_layout.addWidget(self.color_overlay_cb); overlay_layout.addWidget(self.color_overlay_btn); overlay_layout.addStretch()
+        proc_layout.addLayout(overlay_layout, 2, 0, 1, 3)
+        proc_layout.addWidget(self.remove_bg_cb, 3, 0, 1, 3)
+        bg_layout = QHBoxLayout(); bg_layout.addWidget(self.fill_bg_cb); bg_layout.addWidget(self.bg_color_btn); bg_layout.addStretch()
+        proc_layout.addLayout(bg_layout, 4, 0, 1, 3)
+        
+        self.reset_options_btn = QPushButton("恢复默认")
+        reset_layout = QHBoxLayout(); reset_layout.addStretch(); reset_layout.addWidget(self.reset_options_btn)
+        proc_layout.addLayout(reset_layout, 5, 0, 1, 3)
+
+        self.color_overlay_btn.setEnabled(self.color_overlay_cb.isChecked())
+        self.bg_color_btn.setEnabled(self.fill_bg_cb.isChecked())
+
+        # --- [新增] 卡片2: 高级效果 ---
+        adv_card = CardWidget("高级效果")
+        adv_layout = QVBoxLayout(adv_card.contentWidget())
+
+        # 1. 图像校正组
+        correction_group = QGroupBox("图像校正")
+        correction_layout = QGridLayout(correction_group)
+        self.brightness_slider, self.brightness_label = self._create_slider_with_label(0, -100, 100, "%")
+        self.contrast_slider, self.contrast_label = self._create_slider_with_label(0, -100, 100, "%")
+        self.saturation_slider, self.saturation_label = self._create_slider_with_label(0, -100, 100, "%")
+        correction_layout.addWidget(QLabel("亮度:"), 0, 0); correction_layout.addWidget(self.brightness_slider, 0, 1); correction_layout.addWidget(self.brightness_label, 0, 2)
+        correction_layout.addWidget(QLabel("对比度:"), 1, 0); correction_layout.addWidget(self.contrast_slider, 1, 1); correction_layout.addWidget(self.contrast_label, 1, 2)
+        correction_layout.addWidget(QLabel("饱和度:"), 2, 0); correction_layout.addWidget(self.saturation_slider, 2, 1); correction_layout.addWidget(self.saturation_label, 2, 2)
+        
+        # 2. 阴影/描边组
+        # [核心修正] 使用 self.fx_group
+        self.fx_group = QGroupBox("阴影与描边")
+        self.fx_group.setCheckable(True) # 总开关
+        fx_layout = QVBoxLayout(self.fx_group)
+        
+        self.fx_mode_group = QButtonGroup(self)
+        self.fx_shadow_rb = QRadioButton("阴影")
+        self.fx_stroke_rb = QRadioButton("描边")
+        self.fx_mode_group.addButton(self.fx_shadow_rb, 0)
+        self.fx_mode_group.addButton(self.fx_stroke_rb, 1)
+        self.fx_shadow_rb.setChecked(True)
+        
+        mode_layout = QHBoxLayout(); mode_layout.addWidget(self.fx_shadow_rb); mode_layout.addWidget(self.fx_stroke_rb); mode_layout.addStretch()
+        
+        self.fx_stack = QStackedWidget()
+        
+        # 阴影设置面板
+        shadow_widget = QWidget()
+        shadow_layout = QGridLayout(shadow_widget)
+        self.shadow_color_btn = QPushButton(); self._init_color_btn(self.shadow_color_btn, "#000000")
+        self.shadow_blur_slider, self.shadow_blur_label = self._create_slider_with_label(5, 0, 20, "px")
+        self.shadow_x_slider, self.shadow_x_label = self._create_slider_with_label(5, -20, 20, "px")
+        self.shadow_y_slider, self.shadow_y_label = self._create_slider_with_label(5, -20, 20, "px")
+        shadow_layout.addWidget(QLabel("颜色:"), 0, 0); shadow_layout.addWidget(self.shadow_color_btn, 0, 1)
+        shadow_layout.addWidget(QLabel("模糊:"), 1, 0); shadow_layout.addWidget(self.shadow_blur_slider, 1, 1); shadow_layout.addWidget(self.shadow_blur_label, 1, 2)
+        shadow_layout.addWidget(QLabel("X偏移:"), 2, 0); shadow_layout.addWidget(self.shadow_x_slider, 2, 1); shadow_layout.addWidget(self.shadow_x_label, 2, 2)
+        shadow_layout.addWidget(QLabel("Y偏移:"), 3, 0); shadow_layout.addWidget(self.shadow_y_slider, 3, 1); shadow_layout.addWidget(self.shadow_y_label, 3, 2)
+        
+        # 描边设置面板
+        stroke_widget = QWidget()
+        stroke_layout = QGridLayout(stroke_widget)
+        self.stroke_color_btn = QPushButton(); self._init_color_btn(self.stroke_color_btn, "#FFFFFF")
+        self.stroke_width_slider, self.stroke_width_label = self._create_slider_with_label(2, 1, 10, "px")
+        stroke_layout.addWidget(QLabel("颜色:"), 0, 0); stroke_layout.addWidget(self.stroke_color_btn, 0, 1)
+        stroke_layout.addWidget(QLabel("宽度:"), 1, 0); stroke_layout.addWidget(self.stroke_width_slider, 1, 1); stroke_layout.addWidget(self.stroke_width_label, 1, 2)
+        
+        self.fx_stack.addWidget(shadow_widget)
+        self.fx_stack.addWidget(stroke_widget)
+        
+        fx_layout.addLayout(mode_layout)
+        fx_layout.addWidget(self.fx_stack)
+        # [性能优化] idClicked 直接携带按钮 id，免去 lambda 闭包和 id() 反查
+        self.fx_mode_group.idClicked.connect(self.fx_stack.setCurrentIndex)
+
+        # 3. 水印组
+        # [核心修正] 使用 self.watermark_group
+        self.watermark_group = QGroupBox("水印/角标")
+        self.watermark_group.setCheckable(True)
+        watermark_layout = QVBoxLayout(self.watermark_group)
+        
+        wm_file_layout = QHBoxLayout()
+        self.watermark_select_btn = QPushButton("选择图片...")
+        self.watermark_path_label = QLabel("未选择文件")
+        self.watermark_path_label.setObjectName("WatermarkPathLabel")
+        wm_file_layout.addWidget(self.watermark_select_btn)
+        wm_file_layout.addWidget(self.watermark_path_label, 1)
+        
+        wm_props_layout = QGridLayout()
+        self.watermark_size_slider, self.watermark_size_label = self._create_slider_with_label(20, 5, 50, "%")
+        self.watermark_opacity_slider, self.watermark_opacity_label = self._create_slider_with_label(50, 0, 100, "%")
+        wm_props_layout.addWidget(QLabel("大小:"), 0, 0); wm_props_layout.addWidget(self.watermark_size_slider, 0, 1); wm_props_layout.addWidget(self.watermark_size_label, 0, 2)
+        wm_props_layout.addWidget(QLabel("不透明度:"), 1, 0); wm_props_layout.addWidget(self.watermark_opacity_slider, 1, 1); wm_props_layout.addWidget(self.watermark_opacity_label, 1, 2)
+        
+        self.watermark_pos_group = QButtonGroup(self)
+        pos_grid = QGridLayout()
+        for i, name in enumerate(self.WATERMARK_POS):
+            rb = QRadioButton(); rb.setFixedSize(20, 20)
+            self.watermark_pos_group.addButton(rb, i)
+            pos_grid.addWidget(rb, i // 3, i % 3)
+        self.watermark_pos_group.button(8).setChecked(True) # Default to bottom right
+
+        watermark_layout.addLayout(wm_file_layout)
+        watermark_layout.addLayout(wm_props_layout)
+        watermark_layout.addWidget(QLabel("位置:"))
+        watermark_layout.addLayout(pos_grid)
+        
+        adv_layout.addWidget(correction_group)
+        adv_layout.addWidget(self.fx_group)
+        adv_layout.addWidget(self.watermark_group)
+        
+        # 将所有卡片添加到主布局
+        layout.addWidget(base_card)
+        layout.addWidget(adv_card)
+        layout.addStretch()
+        return widget
+    def _create_output_tab(self):
+        """
+        [已重构] 创建“输出”选项卡，区分“生成当前”和“批量生成”操作。
+        [新增] 增加了对SVG导出模式的UI支持（警告标签和单列布局）。
+        """
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setSpacing(15)
+        layout.setContentsMargins(10, 15, 10, 10)
+        
+        # --- 卡片1: 平台模板 ---
+        template_card = CardWidget("平台模板")
+        template_layout = QGridLayout(template_card.contentWidget())
+        self.template_group = QButtonGroup(self)
+        
+        # 遍历所有模板并创建单选按钮
+        for i, name in enumerate(self.PLATFORM_TEMPLATES.keys()):
+            radio = QRadioButton(name)
+            self.template_group.addButton(radio, i)
+            # [修正] 改为单列布局，以更好地适应新添加的模板选项
+            template_layout.addWidget(radio, i, 0)
+        
+        self.template_group.button(0).setChecked(True)
+
+        # [新增] SVG 模式下的警告标签
+        self.svg_warning_label = QLabel(
+            "ℹ️ SVG导出模式下，仅“颜色叠加”生效。\n源文件也必须是SVG。"
+        )
+        self.svg_warning_label.setObjectName("SvgWarningLabel")
+        self.svg_warning_label.setWordWrap(True)
+        self.svg_warning_label.hide() # 默认隐藏，由 _on_template_changed 控制显示
+        
+        # 将警告标签添加到模板列表的下方
+        template_layout.addWidget(self.svg_warning_label, len(self.PLATFORM_TEMPLATES), 0)
+
+        # --- 卡片2: 自定义尺寸 ---
+        sizes_card = CardWidget("自定义尺寸")
+        sizes_layout = QGridLayout(sizes_card.contentWidget())
+        self.size_checkboxes: Dict[int, QCheckBox] = {}
+        standard_sizes = [16, 24, 32, 48, 64, 128, 256, 512, 1024]
+        for i, size in enumerate(standard_sizes):
+            cb = QCheckBox(f"{size}x{size}")
+            self.size_checkboxes[size] = cb
+            sizes_layout.addWidget(cb, i % 5, i // 5)
+
+        # [新增] ICO 可选择合并为单个多分辨率文件（单次编码，所有尺寸内嵌）
+        self.ico_single_file_cb = QCheckBox("ICO 合并为单文件 (内嵌所有尺寸)")
+        sizes_layout.addWidget(self.ico_single_file_cb, 5, 0, 1, 2)
+
+        # --- 卡片3: 导出当前选中的图标 ---
+        export_current_card = CardWidget("导出当前图标")
+        export_current_layout = QVBoxLayout(export_current_card.contentWidget())
+        self.generate_current_button = QPushButton("📄 生成当前选中图标")
+        self.generate_current_button.setObjectName("GenerateCurrentButton")
+        export_current_layout.addWidget(self.generate_current_button)
+
+        # --- 卡片4: 批量导出所有图标 ---
+        export_batch_card = CardWidget("批量导出")
+        export_batch_layout = QVBoxLayout(export_batch_card.contentWidget())
+        
+        prefix_layout = QHBoxLayout()
+        self.prefix_label = QLabel("PNG文件名前缀:")
+        self.prefix_edit = QLineEdit("icon")
+        prefix_layout.addWidget(self.prefix_label)
+        prefix_layout.addWidget(self.prefix_edit)
+        export_batch_layout.addLayout(prefix_layout)
+
+        self.generate_batch_button = QPushButton("🚀 批量生成所有图标")
+        self.generate_batch_button.setObjectName("PrimaryButton")
+        self.generate_batch_button.setFixedHeight(50)
+        export_batch_layout.addWidget(self.generate_batch_button)
+
+        # 将所有卡片添加到主布局中
+        layout.addWidget(template_card)
+        layout.addWidget(sizes_card)
+        layout.addWidget(export_current_card)
+        layout.addWidget(export_batch_card)
+        layout.addStretch()
+
+        # [性能优化] 本选项卡为懒构建，其信号在此处连接而非 _connect_signals
+        self.template_group.buttonClicked.connect(self._on_template_changed)
+        self.generate_current_button.clicked.connect(self._start_single_generation)
+        self.generate_batch_button.clicked.connect(self._start_batch_generation)
+
+        # 初始化UI状态
+        self._on_template_changed()
+        return widget
+
+    def _set_svg_mode_ui(self, is_svg_mode: bool):
+        """[新增] 根据是否为SVG导出模式，启用或禁用相关UI控件。"""
+        # 这些控件在SVG模式下无效，应禁用
+        controls_to_disable = [
+            self.padding_slider, self.radius_slider, self.remove_bg_cb,
+            self.fill_bg_cb, self.reset_options_btn,
+            # 高级效果中的所有控件
+            self.brightness_slider, self.contrast_slider, self.saturation_slider,
+            self.fx_group, self.watermark_group
+        ]
+        
+        for control in controls_to_disable:
+            control.setEnabled(not is_svg_mode)
+            
+        # “颜色叠加”是唯一在SVG模式下仍可用的选项
+        self.color_overlay_cb.setEnabled(True)
+        self.color_overlay_btn.setEnabled(self.color_overlay_cb.isChecked())
+        
+        # 显示或隐藏警告信息
+        self.svg_warning_label.setVisible(is_svg_mode)
+    def _create_presets_tab(self):
+        widget = QWidget(); layout = QVBoxLayout(widget); layout.setSpacing(15); layout.setContentsMargins(10,15,10,10)
+        card = CardWidget("预设管理"); card_layout = QVBoxLayout(card.contentWidget())
+        
+        self.presets_list = QListWidget()
+        card_layout.addWidget(self.presets_list, 1)
+        
+        btn_layout = QGridLayout()
+        self.preset_name_edit = QLineEdit("我的预设"); btn_layout.addWidget(self.preset_name_edit, 0, 0, 1, 2)
+        self.save_preset_btn = QPushButton("保存/更新"); btn_layout.addWidget(self.save_preset_btn, 1, 0)
+        self.delete_preset_btn = QPushButton("删除选中"); btn_layout.addWidget(self.delete_preset_btn, 1, 1)
+        card_layout.addLayout(btn_layout)
+
+        layout.addWidget(card); layout.addStretch()
+
+        # [性能优化] 本选项卡为懒构建，其信号在此处连接而非 _connect_signals
+        self.presets_list.itemClicked.connect(self._on_preset_selected)
+        self.save_preset_btn.clicked.connect(self._save_preset)
+        self.delete_preset_btn.clicked.connect(self._delete_preset)
+        self._update_presets_list()
+        return widget
+
+    def _create_history_tab(self):
+        widget = QWidget(); layout = QVBoxLayout(widget); layout.setContentsMargins(10,15,10,10)
+        card = CardWidget("操作历史"); card_layout = QVBoxLayout(card.contentWidget())
+        history_view = QUndoView(self.undo_stack)
+        history_view.setEmptyLabel("尚无操作")
+        card_layout.addWidget(history_view)
+        layout.addWidget(card); layout.addStretch()
+        return widget
+
+    def _create_statusbar(self): self.statusBar().showMessage("就绪。")
+    
+    def _connect_signals(self):
+        """连接所有UI组件的信号到本类的槽函数。"""
+        # --- 工具栏与源浏览器信号 ---
+        self.add_files_btn.clicked.connect(lambda: self._add_files_to_batch())
+        self.add_folder_btn.clicked.connect(self._add_folder_to_batch)
+        self.clear_batch_btn.clicked.connect(self._clear_batch)
+        self.batch_list.currentItemChanged.connect(self._on_batch_selection_changed)
+        
+        # --- 基础处理选项卡信号 ---
+        # [性能优化] 滑块改为监听 valueChanged 以获得拖动中的实时预览；
+        # 变更经 _queue_slider_property 防抖合并，不会逐个中间值重渲染
+        self.padding_slider.valueChanged.connect(functools.partial(self._queue_slider_property, 'padding', "调整内边距"))
+        self.radius_slider.valueChanged.connect(functools.partial(self._queue_slider_property, 'radius', "调整圆角"))
+        self.color_overlay_cb.stateChanged.connect(lambda s: self._on_property_changed('color_overlay_enabled', bool(s), "切换颜色叠加"))
+        self.color_overlay_btn.clicked.connect(lambda: self._select_color_for_btn(self.color_overlay_btn, 'color_overlay', "更改叠加颜色"))
+        self.remove_bg_cb.stateChanged.connect(lambda s: self._on_property_changed('remove_bg', bool(s), "切换移除背景"))
+        self.fill_bg_cb.stateChanged.connect(lambda s: self._on_property_changed('bg_color', self.bg_color_btn.property("color") if s else None, "切换填充背景"))
+        self.bg_color_btn.clicked.connect(lambda: self._select_color_for_btn(self.bg_color_btn, 'bg_color', "更改背景色", self.fill_bg_cb))
+        self.color_overlay_cb.stateChanged.connect(self.color_overlay_btn.setEnabled)
+        self.fill_bg_cb.stateChanged.connect(self.bg_color_btn.setEnabled)
+        self.reset_options_btn.clicked.connect(self._reset_process_options)
+
+        # --- [新增] 高级效果信号 ---
+        # 图像校正
+        self.brightness_slider.valueChanged.connect(functools.partial(self._queue_slider_property, 'adv_brightness', "调整亮度"))
+        self.contrast_slider.valueChanged.connect(functools.partial(self._queue_slider_property, 'adv_contrast', "调整对比度"))
+        self.saturation_slider.valueChanged.connect(functools.partial(self._queue_slider_property, 'adv_saturation', "调整饱和度"))
+        
+        # 阴影/描边
+        self.fx_group.toggled.connect(functools.partial(self._toggle_property, 'adv_fx_enabled', "切换阴影/描边"))
+        self.fx_mode_group.idClicked.connect(self._on_fx_mode_clicked)
+        self.shadow_color_btn.clicked.connect(lambda: self._select_color_for_btn(self.shadow_color_btn, 'adv_shadow_color', "更改阴影颜色"))
+        self.shadow_blur_slider.valueChanged.connect(functools.partial(self._queue_slider_property, 'adv_shadow_blur', "调整阴影模糊"))
+        self.shadow_x_slider.valueChanged.connect(functools.partial(self._queue_slider_property, 'adv_shadow_offset_x', "调整阴影X偏移"))
+        self.shadow_y_slider.valueChanged.connect(functools.partial(self._queue_slider_property, 'adv_shadow_offset_y', "调整阴影Y偏移"))
+        self.stroke_color_btn.clicked.connect(lambda: self._select_color_for_btn(self.stroke_color_btn, 'adv_stroke_color', "更改描边颜色"))
+        self.stroke_width_slider.valueChanged.connect(functools.partial(self._queue_slider_property, 'adv_stroke_width', "调整描边宽度"))
+
+        # 水印
+        self.watermark_group.toggled.connect(functools.partial(self._toggle_property, 'adv_watermark_enabled', "切换水印"))
+        self.watermark_select_btn.clicked.connect(self._select_watermark_image)
+        self.watermark_pos_group.idClicked.connect(self._on_watermark_pos_changed)
+        self.watermark_size_slider.valueChanged.connect(functools.partial(self._queue_slider_property, 'adv_watermark_size', "调整水印大小"))
+        self.watermark_opacity_slider.valueChanged.connect(functools.partial(self._queue_slider_property, 'adv_watermark_opacity', "调整水印不透明度"))
+
+        # 输出/预设选项卡的信号随各自的懒构建一起连接（见对应的 _create_*_tab）
+
+        # --- [新增] 图标库信号 ---
+        self.library_categories.currentItemChanged.connect(self._on_library_category_changed)
+        self.library_icons.itemDoubleClicked.connect(self._on_library_icon_activated)
+    def _on_fx_mode_clicked(self, mode_id: int):
+        """[槽] idClicked 直接携带模式 id：1 为描边，0 为阴影。"""
+        self._on_property_changed('adv_fx_mode', 'stroke' if mode_id == 1 else 'shadow', "切换效果模式")
+
+    def _on_watermark_pos_changed(self, pos_id: int):
+        self._on_property_changed('adv_watermark_pos', self.WATERMARK_POS[pos_id], "更改水印位置")
+    # --- 槽函数与核心逻辑 ---
+    def _schedule_preview_update(self):
+        """[性能优化] 请求一次预览刷新；连续请求会被防抖定时器合并为一次重绘。"""
+        self._preview_timer.start()
+
+    def _toggle_property(self, key: str, desc: str, on: bool):
+        """[性能优化] 分组框开关的 partial 绑定目标，参数序与滑块槽一致。"""
+        self._on_property_changed(key, on, desc)
+
+    def _queue_slider_property(self, key: str, desc: str, value: Any):
+        """[性能优化] 暂存一次滑块值变更；同一轮拖动内的连续变更会被防抖合并。"""
+        self._pending_props[key] = (value, desc)
+        self._prop_flush_timer.start()
+
+    def _flush_pending_props(self):
+        """[槽] 防抖到期后，把积压的属性变更逐项提交到撤销堆栈。"""
+        pending, self._pending_props = self._pending_props, {}
+        for key, (value, desc) in pending.items():
+            self._on_property_changed(key, value, desc)
+
+    def _on_property_changed(self, key: str, value: Any, description: str):
+        if self.current_options.get(key) != value:
+            # [性能优化] 命令 redo 会把变更扇出到一串控件（滑块、色板、
+            # 标签），挂起重绘让 Qt 把这些更新合并成一次 paint
+            self.setUpdatesEnabled(False)
+            try:
+                command = ModifyOptionsCommand(self, key, value, description)
+                self.undo_stack.push(command)
+            finally:
+                self.setUpdatesEnabled(True)
+                self.update()
+
+    def _begin_options_macro(self, description: str):
+        """[性能优化] 开启选项宏：宏内的命令只改数据，不逐条刷新 UI。"""
+        self._in_macro += 1
+        self.undo_stack.beginMacro(description)
+
+    def _end_options_macro(self):
+        """结束选项宏，并做一次统一的 UI 刷新与预览调度。"""
+        self.undo_stack.endMacro()
+        self._in_macro -= 1
+        self._notify_options_changed()
+
+    def _notify_options_changed(self):
+        """[性能优化] 选项变更后的统一刷新入口。
+
+        宏构建期间（加载预设/恢复默认会推入十几条命令）挂起刷新，
+        宏结束时只执行一次，把控件信号簿记从 O(N·W) 压到 O(W)。
+        """
+        if self._in_macro:
+            return
+        self._active_mask = _compute_active_mask(self.current_options)
+        self._update_ui_from_options()
+        self._schedule_preview_update()
+
+    def _update_ui_from_options(self, block_signals=True):
+        widgets_to_block = [
+            self.padding_slider, self.radius_slider, self.color_overlay_cb,
+            self.remove_bg_cb, self.fill_bg_cb, self.brightness_slider,
+            self.contrast_slider, self.saturation_slider, self.fx_group,
+            self.fx_shadow_rb, self.fx_stroke_rb, self.shadow_blur_slider,
+            self.shadow_x_slider, self.shadow_y_slider, self.stroke_width_slider,
+            self.watermark_group, self.watermark_size_slider, self.watermark_opacity_slider
+        ]
+        # [性能优化] QSignalBlocker + ExitStack 一次性托管全部信号屏蔽：
+        # 控件列表只遍历一遍，RAII 语义保证赋值中途抛异常也能解除屏蔽
+        with ExitStack() as stack:
+            if block_signals:
+                for w in widgets_to_block:
+                    stack.enter_context(QSignalBlocker(w))
+            stack.enter_context(QSignalBlocker(self.watermark_pos_group))
+            self._apply_options_to_widgets()
+
+    def _apply_options_to_widgets(self):
+        """把 current_options 逐项写入控件（调用方负责信号屏蔽）。"""
+        opts = self.current_options
+
+        # 基础选项
+        self.padding_slider.setValue(opts.get('padding', 0))
+        self.radius_slider.setValue(opts.get('radius', 0))
+        self.color_overlay_cb.setChecked(opts.get('color_overlay_enabled', False))
+        self._set_color_btn_color(self.color_overlay_btn, opts.get('color_overlay', '#4f46e5'))
+        self.remove_bg_cb.setChecked(opts.get('remove_bg', False))
+        self.fill_bg_cb.setChecked(opts.get('bg_color') is not None)
+        if opts.get('bg_color'): self._set_color_btn_color(self.bg_color_btn, opts['bg_color'])
+
+        # 图像校正
+        self.brightness_slider.setValue(opts.get('adv_brightness', 0))
+        self.contrast_slider.setValue(opts.get('adv_contrast', 0))
+        self.saturation_slider.setValue(opts.get('adv_saturation', 0))
+
+        # 阴影/描边
+        self.fx_group.setChecked(opts.get('adv_fx_enabled', False))
+        if opts.get('adv_fx_mode') == 'stroke':
+            self.fx_stroke_rb.setChecked(True)
+            self.fx_stack.setCurrentIndex(1)
+        else:
+            self.fx_shadow_rb.setChecked(True)
+            self.fx_stack.setCurrentIndex(0)
+        self._set_color_btn_color(self.shadow_color_btn, opts.get('adv_shadow_color', '#000000'))
+        self.shadow_blur_slider.setValue(opts.get('adv_shadow_blur', 5))
+        self.shadow_x_slider.setValue(opts.get('adv_shadow_offset_x', 5))
+        self.shadow_y_slider.setValue(opts.get('adv_shadow_offset_y', 5))
+        self._set_color_btn_color(self.stroke_color_btn, opts.get('adv_stroke_color', '#ffffff'))
+        self.stroke_width_slider.setValue(opts.get('adv_stroke_width', 2))
+
+        # 水印
+        self.watermark_group.setChecked(opts.get('adv_watermark_enabled', False))
+        path = opts.get('adv_watermark_path', '')
+        
+        # [核心修正] 使用 self.watermark_image_path 进行可靠的比较
+        if path and self.watermark_image_path != path:
+            if os.path.exists(path):
+                try:
+                    self.watermark_image = Image.open(path).convert("RGBA")
+                    self.watermark_image_path = path
+                except Exception as e:
+                    print(f"在UI更新期间加载水印失败: {e}")
+                    self.watermark_image = None
+                    self.watermark_image_path = ""
+            else: # Path exists in options but not on disk
+                self.watermark_image = None
+                self.watermark_image_path = ""
+        elif not path: # Path is empty in options
+            self.watermark_image = None
+            self.watermark_image_path = ""
+
+        # 更新UI标签
+        if self.watermark_image and self.watermark_image_path:
+            self.watermark_path_label.setText(os.path.basename(self.watermark_image_path))
+        else:
+            self.watermark_path_label.setText("未选择文件")
+        
+        pos_id = self.WATERMARK_POS_IDX.get(opts.get('adv_watermark_pos', 'bottom_right'), 8)
+        self.watermark_pos_group.button(pos_id).setChecked(True)
+        
+        self.watermark_size_slider.setValue(opts.get('adv_watermark_size', 20))
+        self.watermark_opacity_slider.setValue(opts.get('adv_watermark_opacity', 50))
+
+    def _add_files_to_batch(self, files=None):
+        """
+        [已升级] 异步地将文件添加到批量列表，并切换到列表视图。
+        现在支持 SVG 文件类型。
+        """
+        if not files:
+            # [核心修正] 在文件对话框的过滤器中添加 *.svg
+            files, _ = QFileDialog.getOpenFileNames(self, "选择图片", "", "图片文件 (*.png *.jpg *.jpeg *.bmp *.svg)")
+        
+        if files:
+            # 只要有文件添加，就切换到列表视图
+            self.left_stack.setCurrentWidget(self.batch_list)
+            
+            added_count = 0
+            added_raster = []
+            need_thumbs = []
+            # [核心修正] 缩略图缓存键含目标尺寸，与图标库的 64px 条目区分
+            thumb_w = self.batch_list.iconSize().width()
+            # [性能优化] 批量插入期间关闭重绘与信号：数百个 addItem 只触发
+            # 一次布局/绘制，而不是每项一次。缩略图任务先攒着，等列表
+            # 恢复重绘后再统一派发，避免后台结果抢在插入完成前回灌
+            self.batch_list.setUpdatesEnabled(False)
+            self.batch_list.blockSignals(True)
+            try:
+                for f in files:
+                    if f not in self._batch_items_set:
+                        self._batch_items_set.add(f)
+                        self.batch_items.append(f)
+                        added_count += 1
+                        item = QListWidgetItem(os.path.basename(f))
+                        item.setData(Qt.UserRole, f)
+                        item.setToolTip(f)
+                        self.batch_list.addItem(item)
+                        # [性能优化] 先查 QPixmapCache（图标库加入的文件多半已渲染过）
+                        cached = QPixmapCache.find(f"thumb:{f}@{thumb_w}")
+                        if cached is not None and not cached.isNull():
+                            item.setIcon(QIcon(cached))
+                        else:
+                            need_thumbs.append((item, f))
+                        if not f.lower().endswith('.svg'):
+                            added_raster.append(f)
+            finally:
+                self.batch_list.blockSignals(False)
+                self.batch_list.setUpdatesEnabled(True)
+                self.batch_list.viewport().update()
+
+            # 第二阶段：列表已就绪，再提交缩略图渲染。
+            # [性能优化] 按 32 个一组复用 BatchThumbnailWorker：上千文件时
+            # 任务对象、信号连接与跨线程投递都按组摊销，而多组之间仍能
+            # 吃满线程池的并行度
+            icon_size = self.batch_list.iconSize()
+            chunk_size = 32
+            for i in range(0, len(need_thumbs), chunk_size):
+                worker = BatchThumbnailWorker(need_thumbs[i:i + chunk_size], icon_size)
+                worker.signals.ready.connect(self._on_thumbnails_ready)
+                self.thread_pool.start(worker)
+
+            # [性能优化] 位图源在后台预解码进缓存，预览时免去磁盘读取+解码
+            if added_raster:
+                self.thread_pool.start(DecodeWorker(added_raster, self._source_cache))
+
+            self.statusBar().showMessage(f"已添加 {added_count} 个文件。当前共 {len(self.batch_items)} 个。")
+    def _on_thumbnail_ready(self, item: QListWidgetItem, pixmap: QPixmap):
+        """[槽] 当后台缩略图生成完毕后，在主线程中更新列表项的图标并入缓存。"""
+        path = item.data(Qt.UserRole)
+        view = item.listWidget()
+        if path and view is not None:
+            # [核心修正] 按所属视图的图标尺寸入缓存，与查找端的键一致
+            QPixmapCache.insert(f"thumb:{path}@{view.iconSize().width()}", pixmap)
+        item.setIcon(QIcon(pixmap))
+
+    def _on_thumbnails_ready(self, results: list):
+        """[槽] 批量缩略图工作器回报一小批结果，在主线程中统一设置图标。"""
+        for item, pixmap in results:
+            self._on_thumbnail_ready(item, pixmap)
+    def _add_folder_to_batch(self):
+        folder = QFileDialog.getExistingDirectory(self, "选择图片文件夹")
+        if folder:
+            # [性能优化] os.scandir 一次系统调用拿到目录项，免去逐文件 stat
+            with os.scandir(folder) as entries:
+                self._add_files_to_batch([
+                    e.path for e in entries
+                    if os.path.splitext(e.name)[1].lower() in _SUPPORTED_EXTS
+                ])
+
+    def _clear_batch(self):
+        """清空列表，并切换回空状态引导页。"""
+        self.batch_list.clear()
+        self.batch_items.clear()
+        self._batch_items_set.clear()
+        self._preview_cache.clear()
+        self._source_cache.clear()
+        # [核心修正] 作废在途的后台渲染，防止过期帧在清空后回灌预览区
+        self._render_seq += 1
+        self.main_preview.setText("请从左侧列表选择一张图片")
+        self.central_header.setText("未选择文件")
+        self.statusBar().showMessage("列表已清空。")
+        
+        # [核心修改] 切换回引导页
+        self.left_stack.setCurrentWidget(self.empty_list_widget)
+
+    def _on_batch_selection_changed(self, current: QListWidgetItem, previous: QListWidgetItem):
+        if current:
+            self.central_header.setText(f"当前预览: {current.text()}")
+            # [性能优化] 同样走防抖：按住方向键快速滚动列表时只渲染停留项
+            self._schedule_preview_update()
+        else:
+            self.central_header.setText("未选择文件")
+            # [核心修正] 取消选中时同样作废在途渲染，避免旧帧覆盖空状态
+            self._render_seq += 1
+            self.main_preview.clear()
+            self.main_preview.setText("请从左侧列表选择一张图片")
+
+    def _load_source_rgba(self, source_path: str) -> Image.Image:
+        """
+        [性能优化] 统一的源图像加载入口，结果进入 _SourceCache。
+        SVG 源首次访问时栅格化一次后入缓存——此前每次滑块移动都要完整
+        重栅格化矢量图并经 PNG 编解码往返；位图源则复用预解码缓存。
+        返回的图像不会被处理链原地修改（process_image 写前复制）。
+        """
+        source_img = self._source_cache.get(source_path)
+        if source_img is not None:
+            return source_img
+
+        if source_path.lower().endswith('.svg'):
+            renderer = _svg_renderer(source_path)
+            # [性能优化] 直接渲染进 QImage 并按原始字节交给 Pillow，
+            # 省去 QPixmap 中转和 PNG 编码+解码往返（1024² 约 10-50ms）。
+            # 画布固定 1024x1024：足以覆盖 2 倍超采样的预览尺寸，且让
+            # 缓存条目只需按路径为键
+            image = QImage(1024, 1024, QImage.Format_RGBA8888)
+            image.fill(Qt.transparent)
+            painter = QPainter(image)
+            renderer.render(painter)
+            painter.end()
+            source_img = _qimage_to_pil(image)
+        else:
+            source_img = Image.open(source_path)
+            source_img.load()
+            source_img = source_img.convert('RGBA')
+
+        self._source_cache.put(source_path, source_img)
+        return source_img
+
+    def _update_realtime_preview(self):
+        current_item = self.batch_list.currentItem()
+        if not current_item:
+            return
+            
+        source_path = current_item.data(Qt.UserRole)
+        try:
+            # [性能优化] 相同源文件 + 相同选项 + 相同预览尺寸的渲染直接走缓存
+            target = self.main_preview.size()
+            preview_dim = max(target.width(), target.height()) * 2
+            cache_key = (source_path, preview_dim, tuple(sorted(self.current_options.items())))
+            cached = self._preview_cache.get(cache_key)
+            if cached is not None:
+                self._preview_cache.move_to_end(cache_key)
+                self.main_preview.setPixmap(cached.scaled(self.main_preview.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+                self.main_preview.setToolTip("")
+                return
+
+            source_img = self._load_source_rgba(source_path)
+
+            # [性能优化] 全部选项仍是默认值时流水线是恒等变换，
+            # 直接显示源图，跳过整条 Pillow/NumPy 处理链
+            if all(self.current_options.get(k) == v
+                   for k, v in self._default_options.items()):
+                final_pixmap = self._pil_to_pixmap(source_img)
+                self.main_preview.setPixmap(final_pixmap.scaled(self.main_preview.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+                self.main_preview.setToolTip("")
+                return
+
+            # [性能优化] 渲染整体移入线程池：缩放、process_image 和 QImage
+            # 转换都在 RenderTask 里执行，GUI 线程只做最终的 fromImage 上屏。
+            # 单调序号保证持续拖动时过期帧被直接丢弃
+            self._render_seq += 1
+            task = RenderTask(self.icon_generator, source_img,
+                              self.current_options.copy(), self.rembg_remove_func,
+                              self._active_mask, preview_dim,
+                              self._render_seq, cache_key)
+            task.signals.finished.connect(self._on_preview_rendered)
+            task.signals.failed.connect(self._on_preview_failed)
+            self.thread_pool.start(task)
+
+        except Exception as e:
+            # [UX改进] 预览失败时提供更详细的用户反馈
+            self._show_preview_error(str(e))
+
+    def _on_preview_rendered(self, seq: int, cache_key: Any, qimage: QImage):
+        """[槽] 后台渲染完成；丢弃过期帧，在 GUI 线程构建并显示 QPixmap。"""
+        if seq != self._render_seq:
+            return
+        final_pixmap = QPixmap.fromImage(qimage)
+
+        # [性能优化] 存入 LRU 缓存，超出容量时逐出最久未用的条目
+        self._preview_cache[cache_key] = final_pixmap
+        if len(self._preview_cache) > self._PREVIEW_CACHE_MAX:
+            self._preview_cache.popitem(last=False)
+
+        self.main_preview.setPixmap(final_pixmap.scaled(self.main_preview.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        self.main_preview.setToolTip("")
+
+    def _on_preview_failed(self, seq: int, message: str):
+        """[槽] 后台渲染失败；同样只对最新一次请求作出反馈。"""
+        if seq != self._render_seq:
+            return
+        self._show_preview_error(message)
+
+    def _show_preview_error(self, message: str):
+        error_msg = f"预览更新失败: {message}"
+        print(error_msg)
+        self.main_preview.setText("预览失败")
+        self.main_preview.setToolTip(error_msg)
+        self.statusBar().showMessage(error_msg, 5000)
+
+    def _on_template_changed(self):
+        """[已重写] 当模板改变时，更新尺寸复选框并调整UI以适应SVG模式。"""
+        btn = self.template_group.checkedButton()
+        if not btn: return
+        
+        template_data = self.PLATFORM_TEMPLATES.get(btn.text())
+        if not template_data: return
+
+        sizes_to_check = template_data['sizes']
+        is_icns_or_svg = template_data['format'] in ['icns', 'svg']
+
+        for size, cb in self.size_checkboxes.items():
+            cb.setChecked(size in sizes_to_check)
+            cb.setEnabled(not is_icns_or_svg)
+            
+        # 调用新的辅助函数来处理UI状态
+        self._set_svg_mode_ui(template_data['format'] == 'svg')
+
+    # [UX改进] 1.3: 新增方法，用于重置处理选项
+    def _reset_process_options(self):
+        """将所有处理选项恢复为默认值，并将整个操作记录到撤销堆栈中。"""
+        self._begin_options_macro("恢复默认处理选项")
+
+        defaults = self._get_default_options()
+        for key, default_value in defaults.items():
+            if self.current_options.get(key) != default_value:
+                # 复用现有的 Command 逻辑，为每个变化的属性创建一个命令
+                command = ModifyOptionsCommand(self, key, default_value, f"重置 {key}")
+                self.undo_stack.push(command)
+
+        self._end_options_macro()
+        self.statusBar().showMessage("处理选项已恢复默认。", 3000)
+
+    def _load_presets(self):
+        """[性能优化] 预设文件的读取与解析移入线程池，窗口先行可交互。"""
+        worker = PresetLoader()
+        worker.signals.finished.connect(self._on_presets_loaded)
+        # 与 rembg / 图标库的初始化一致：保活到任务完成
+        self.active_workers.append(worker)
+        worker.signals.finished.connect(lambda: self.active_workers.remove(worker))
+        self.thread_pool.start(worker)
+
+    def _on_presets_loaded(self, presets: dict):
+        """[槽] 预设在后台读取完毕后合并进内存并刷新列表。"""
+        self.presets.update(presets)
+        self._update_presets_list()
+
+    def _save_presets(self):
+        """[性能优化] 预设落盘：优先用 orjson 编码，并通过临时文件 +
+        os.replace 原子替换，中途崩溃也不会留下写了一半的预设文件。"""
+        path = "iconforge_presets.json"
+        tmp_path = path + ".tmp"
+        try:
+            if ORJSON_AVAILABLE:
+                data = orjson.dumps(self.presets, option=orjson.OPT_INDENT_2)
+            else:
+                data = json.dumps(self.presets, indent=2).encode('utf-8')
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            QMessageBox.warning(self, "错误", f"保存预设失败: {e}")
+
+    def _update_presets_list(self):
+        if 2 in self._lazy_tab_builders:
+            return  # [性能优化] 预设选项卡尚未构建，构建时会自动刷新
+        self.presets_list.clear()
+
+        for name in sorted(self.presets.keys()):
+            item = QListWidgetItem(name)
+            
+            # [新增] 尝试加载并设置预览图标
+            preview_path = _preset_preview_path(name)
+            
+            if os.path.exists(preview_path):
+                icon = QIcon(preview_path)
+                item.setIcon(icon)
+            
+            self.presets_list.addItem(item)
+
+    def _on_preset_selected(self, item: QListWidgetItem):
+        name = item.text()
+        self.preset_name_edit.setText(name)
+        if name in self.presets:
+            new_options = self.presets[name]
+            # Use QUndoCommand for each property change to build a macro command
+            self._begin_options_macro(f"加载预设 '{name}'")
+            for key, value in new_options.items():
+                if self.current_options.get(key) != value:
+                    command = ModifyOptionsCommand(self, key, value, f"设置 {key}")
+                    self.undo_stack.push(command)
+            self._end_options_macro()
+    
+    def _save_preset(self):
+        name = self.preset_name_edit.text().strip()
+        if not name:
+            QMessageBox.warning(self, "无效名称", "预设名称不能为空。")
+            return
+        
+        # 1. 保存配置数据
+        self.presets[name] = self.current_options.copy()
+        self._save_presets()
+
+        # 2. [新增] 生成并保存预览图
+        self._generate_and_save_preset_preview(name)
+
+        # 3. 更新UI
+        self._update_presets_list()
+        self.statusBar().showMessage(f"已保存预设 '{name}'", 3000)
+    def _generate_and_save_preset_preview(self, preset_name: str):
+        """[性能优化] 把预设预览图的渲染与落盘派发到后台线程。
+
+        复杂预设（阴影模糊 + rembg）的完整渲染可达数百毫秒，同步执行
+        会让保存按钮明显卡顿；这里只在 UI 线程解析样本路径，其余工作
+        交给 _PresetPreviewTask，完成后刷新预设列表以显示新图标。
+        """
+        # 确定使用哪张图片作为样本
+        source_path = ""
+        current_item = self.batch_list.currentItem()
+        if current_item:
+            source_path = current_item.data(Qt.UserRole)
+        elif os.path.exists(self.preview_sample_path):
+            source_path = self.preview_sample_path
+        else:
+            print("警告: 找不到样本图片，无法生成预设预览。")
+            return
+
+        task = _PresetPreviewTask(self.icon_generator, source_path, preset_name,
+                                  self.presets[preset_name].copy(),
+                                  self.rembg_remove_func)
+        task.signals.finished.connect(self._update_presets_list, Qt.QueuedConnection)
+        self.thread_pool.start(task)
+
+    def _delete_preset(self):
+        item = self.presets_list.currentItem()
+        if not item:
+            QMessageBox.warning(self, "未选择", "请先在列表中选择一个要删除的预设。")
+            return
+        
+        name = item.text()
+        if name == "默认" and name in self.presets and self.presets[name].get('is_default'): # 更严谨的判断
+            QMessageBox.warning(self, "无法删除", "不能删除内置的默认预设。")
+            return
+            
+        reply = QMessageBox.question(self, "确认", f"确定要删除预设 '{name}' 吗？", QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes and name in self.presets:
+            # 1. 删除配置
+            del self.presets[name]
+            self._save_presets()
+            
+            # 2. [新增] 删除对应的预览图
+            try:
+                preview_path = _preset_preview_path(name)
+                if os.path.exists(preview_path):
+                    os.remove(preview_path)
+            except Exception as e:
+                print(f"删除预设预览图失败: {e}")
+                
+            # 3. 更新UI
+            self._update_presets_list()
+    def _select_watermark_image(self):
+        path, _ = QFileDialog.getOpenFileName(self, "选择水印图片", "", "图片文件 (*.png)")
+        if path:
+            try:
+                # 尝试加载图片以确保它是有效的
+                self.watermark_image = Image.open(path).convert("RGBA")
+                self.watermark_image_path = path # [核心修正] 更新路径追踪器
+                # [性能优化] 换图后旧的缩放缓存全部失效
+                self.icon_generator.clear_watermark_cache()
+                # 使用命令系统来记录路径的更改
+                self._on_property_changed('adv_watermark_path', path, "选择水印图片")
+            except Exception as e:
+                QMessageBox.warning(self, "错误", f"无法加载水印图片: {e}")
+                self.watermark_image = None
+                self.watermark_image_path = "" # [核心修正] 清空路径追踪器
+                self._on_property_changed('adv_watermark_path', '', "清除水印图片")
+    def _start_single_generation(self):
+        """
+        [新增] 启动对当前选中的单个图标的生成过程。
+        """
+        current_item = self.batch_list.currentItem()
+        if not current_item:
+            QMessageBox.warning(self, "操作无效", "请先在左侧列表中选择一个要生成的图片。")
+            return
+        
+        source_path = current_item.data(Qt.UserRole)
+        self._start_generation_process([source_path]) # 调用通用的处理函数，但只传入一个文件
+
+    def _start_batch_generation(self):
+        """
+        [重命名] 启动对列表中所有图标的批量生成过程。
+        """
+        if not self.batch_items:
+            QMessageBox.warning(self, "操作无效", "请先添加至少一张图片到处理列表。")
+            return
+        
+        self._start_generation_process(self.batch_items) # 调用通用的处理函数，传入所有文件
+
+    def _start_generation_process(self, items_to_process: List[str]):
+        """
+        [已修正] [通用处理函数] 处理指定文件列表的生成逻辑。
+        - 现在会根据是单文件还是批量操作，弹出正确的文件/文件夹选择对话框。
+        - 会将异步加载的 rembg 函数传递给后台工作器。
+        """
+        is_batch = len(items_to_process) > 1
+        opts = self._get_current_options_for_generation()
+        fmt = opts['format']
+        
+        output_path = ""
+        # 仅在单文件模式下，建议的文件名才有意义
+        suggested_name = os.path.splitext(os.path.basename(items_to_process[0]))[0] if not is_batch else "icon"
+
+        # [核心修正] 根据操作类型选择正确的对话框
+        if is_batch or fmt == 'png_suite':
+            # 以下情况应选择目录：
+            # 1. 任何批量操作 (is_batch == True)
+            # 2. 单文件操作，但输出为PNG套件 (需要一个目录来存放多个PNG)
+            dialog_title = "选择批量导出的目标文件夹" if is_batch else "选择保存PNG套件的文件夹"
+            output_path = QFileDialog.getExistingDirectory(self, dialog_title)
+        else:
+            # 唯一剩下的情况：单文件输入 -> 单文件输出 (.ico 或 .icns)
+            # 这种情况下才需要用户指定确切的文件名
+            output_path, _ = QFileDialog.getSaveFileName(
+                self, "保存图标", f"{suggested_name}.{fmt}", f"图标文件 (*.{fmt})"
+            )
+        
+        if not output_path:
+            return # 用户取消了选择
+
+        self.progress_dialog = QProgressDialog("生成中...", "取消", 0, len(items_to_process), self)
+        self.progress_dialog.setWindowModality(Qt.WindowModal)
+        
+        # [核心修正] 创建 GenerateWorker 时传入 self.rembg_remove_func
+        self.worker = GenerateWorker(self.icon_generator, items_to_process, output_path, opts, self.rembg_remove_func)
+        
+        self.worker.signals.progress.connect(lambda i, t, n: self.progress_dialog.setLabelText(f"{n} ({i+1}/{t})") or self.progress_dialog.setValue(i))
+        self.worker.signals.finished.connect(lambda msg: (self.progress_dialog.close(), QMessageBox.information(self, "完成", msg)))
+        self.worker.signals.error.connect(lambda err: (self.progress_dialog.close(), QMessageBox.critical(self, "错误", err)))
+        self.progress_dialog.canceled.connect(self.worker.cancel)
+        
+        self.thread_pool.start(self.worker)
+        self.progress_dialog.show()
+
+    def _get_current_options_for_generation(self) -> Dict[str, Any]:
+        """
+        [已修正] 从UI收集最终用于生成的选项。
+        此版本确保总是使用当前勾选框的状态，而不是模板的默认状态。
+        """
+        opts = self.current_options.copy()
+        
+        # 1. 确定输出格式
+        template_name = self.template_group.checkedButton().text()
+        fmt = self.PLATFORM_TEMPLATES[template_name]['format']
+        opts['format'] = fmt
+
+        # 2. [关键修正] 无论模板如何，都从UI重新收集当前所有被勾选的尺寸
+        selected_sizes = [(s, s) for s, cb in self.size_checkboxes.items() if cb.isChecked()]
+        
+        # 3. 为需要尺寸的格式赋值
+        if fmt == 'ico' or fmt == 'png_suite':
+            opts['sizes'] = selected_sizes
+        else: # for 'icns'
+            opts['sizes'] = []
+
+        # [新增] ICO 单文件多尺寸输出开关
+        opts['ico_single_file'] = self.ico_single_file_cb.isChecked()
+
+        return opts
+
+    def _get_default_options(self) -> Dict[str, Any]:
+        return {
+            # --- 基础选项 ---
+            'padding': 0,
+            'radius': 0,
+            'color_overlay_enabled': False,
+            'color_overlay': '#4f46e5',
+            'remove_bg': False,
+            'bg_color': None,
+            
+            # --- [新增] 图像校正选项 ---
+            'adv_brightness': 0,    # -100 to 100
+            'adv_contrast': 0,      # -100 to 100
+            'adv_saturation': 0,    # -100 to 100
+            
+            # --- [新增] 阴影与描边选项 ---
+            'adv_fx_enabled': False,
+            'adv_fx_mode': 'shadow', # 'shadow' or 'stroke'
+            
+            'adv_shadow_color': '#000000',
+            'adv_shadow_blur': 5,     # 0 to 20
+            'adv_shadow_offset_x': 5, # -20 to 20
+            'adv_shadow_offset_y': 5, # -20 to 20
+            
+            'adv_stroke_color': '#ffffff',
+            'adv_stroke_width': 2,    # 1 to 10
+            
+            # --- [新增] 水印选项 ---
+            'adv_watermark_enabled': False,
+            'adv_watermark_path': '',
+            'adv_watermark_pos': 'bottom_right', # 9-grid position
+            'adv_watermark_size': 20, # 5 to 50 percent
+            'adv_watermark_opacity': 50 # 0 to 100 percent
+        }
+
+    def _create_slider_with_label(self, value, min_val, max_val, suffix):
+        slider = QSlider(Qt.Horizontal)
+        slider.setRange(min_val, max_val)
+        slider.setValue(value)
+        label = QLabel(f"{value}{suffix}")
+        label.setMinimumWidth(40)
+        # [性能优化] 全部滑块共用一个标签刷新槽（经 sender() 反查），
+        # 不再为每个滑块生成独立的闭包。槽与滑块同属 GUI 线程，
+        # DirectConnection 跳过 AutoConnection 每次发射的线程判定
+        self._slider_labels[slider] = (label, suffix)
+        slider.valueChanged.connect(self._on_slider_label_update, Qt.DirectConnection)
+        return slider, label
+
+    def _on_slider_label_update(self, value: int):
+        """[槽] 统一的滑块数值标签刷新：一次字典查找 + setText。"""
+        entry = self._slider_labels.get(self.sender())
+        if entry is not None:
+            label, suffix = entry
+            label.setText(f"{value}{suffix}")
+
+    def _init_color_btn(self, btn: QPushButton, color_hex: str = "#4f46e5"):
+        """色板按钮的一次性初始化：固定尺寸与 colorSwatch 样式标记。
+
+        [性能优化] setFixedSize 即便尺寸未变也会触发布局失效，因此
+        与样式标记一起只在创建时执行一次，换色走 _set_color_btn_color。
+        """
+        btn.setProperty("cssClass", "colorSwatch")
+        btn.setFixedSize(24, 24)
+        btn.setAutoFillBackground(True)
+        # 动态属性在首次设置后需要重新抛光一次才会命中选择器
+        btn.style().unpolish(btn)
+        btn.style().polish(btn)
+        self._set_color_btn_color(btn, color_hex)
+
+    def _set_color_btn_color(self, btn: QPushButton, color_hex: str):
+        """[性能优化] 轻量换色：只更新调色板，不做布局或 CSS 重解析。"""
+        if str(btn.property("color")).lower() == color_hex.lower():
+            return  # 颜色未变，连重绘都省掉
+        btn.setProperty("color", color_hex)
+        pal = btn.palette()
+        pal.setColor(QPalette.Button, QColor(color_hex))
+        btn.setPalette(pal)
+
+    def _select_color_for_btn(self, btn: QPushButton, key: str, desc: str, cb_enabler: Optional[QCheckBox] = None):
+        if cb_enabler and not cb_enabler.isChecked():
+            cb_enabler.setChecked(True) # Automatically enable the feature
+        
+        current_color = QColor(btn.property("color"))
+        # [性能优化] 取色对话框只构建一次并复用：QColorDialog.getColor
+        # 每次都要新建对话框并对其整个控件树做样式解析与布局
+        if self._color_dialog is None:
+            self._color_dialog = QColorDialog(self)
+            self._color_dialog.setWindowTitle("选择颜色")
+            self._color_dialog.setOption(QColorDialog.DontUseNativeDialog, True)
+        self._color_dialog.setCurrentColor(current_color)
+        if self._color_dialog.exec_() == QColorDialog.Accepted:
+            new_color = self._color_dialog.selectedColor()
+            if new_color.isValid():
+                # [性能优化] 选了与当前相同的颜色时直接返回，
+                # 不触发命令入栈与整条重渲染链
+                new_hex = new_color.name()
+                if new_hex.lower() == str(btn.property("color")).lower():
+                    return
+                self._on_property_changed(key, new_hex, desc)
+
+    def _pil_to_pixmap(self, img: Image.Image) -> QPixmap:
+        """[性能优化] 原始像素字节直达 QImage，再经 fromImage 上屏。
+
+        原实现把图像压成 PNG 再由 Qt 解码，整条预览链路是内存带宽
+        瓶颈，zlib 压缩+解析纯属开销；此外刻意不用 Image.toqpixmap
+        （PyQt5 下有已知崩溃）。
+
+        像素最多被拷贝两次：tobytes 物化一次，fromImage 进像素图存储
+        一次；QImage 本身只是对 data 的零拷贝包装。QImage 不持有
+        Python 缓冲的引用，data 被挂到 self._last_buf 上，保证在
+        fromImage 完成拷贝前（乃至下一帧覆盖它之前）始终存活。
+        """
+        # [性能优化] 按源图模式选择 QImage 格式，避免不必要的通道扩展：
+        # 全不透明的 RGBA 先降到 RGB（少搬四分之一的字节），RGB/L 直接
+        # 走 3/1 字节步长，仅其余模式才转 RGBA
+        mode = img.mode
+        if mode == 'RGBA' and img.getextrema()[3][0] == 255:
+            img = img.convert('RGB')
+            mode = 'RGB'
+        if mode == 'RGB':
+            data = img.tobytes('raw', 'RGB')
+            stride = img.width * 3
+            qformat = QImage.Format_RGB888
+        elif mode == 'L':
+            data = img.tobytes()
+            stride = img.width
+            qformat = QImage.Format_Grayscale8
+        else:
+            if mode != 'RGBA':
+                img = img.convert('RGBA')
+            stride = img.width * 4
+            if NUMPY_AVAILABLE:
+                # [性能优化] 一次性完成 alpha 预乘与 BGRA 重排：
+                # Format_ARGB32_Premultiplied（小端字节序即 B,G,R,A）是
+                # Qt 光栅引擎的原生格式，blit 时既不用逐像素预乘也不用
+                # 换通道。QImage 直接包装数组缓冲，不再经过 tobytes 物化
+                arr = np.asarray(img)
+                a = arr[..., 3:4].astype(np.uint16)
+                rgb = (arr[..., :3].astype(np.uint16) * a // 255).astype(np.uint8)
+                bgra = np.empty_like(arr)
+                bgra[..., 0] = rgb[..., 2]
+                bgra[..., 1] = rgb[..., 1]
+                bgra[..., 2] = rgb[..., 0]
+                bgra[..., 3] = arr[..., 3]
+                arr = np.ascontiguousarray(bgra)
+                self._last_arr = arr  # QImage 不持引用，数组须由窗口锚定
+                data = arr.data
+                qformat = QImage.Format_ARGB32_Premultiplied
+            else:
+                data = img.tobytes('raw', 'RGBA')
+                qformat = QImage.Format_RGBA8888
+        # [性能优化] 以像素内容哈希查 QPixmapCache：滑块来回拖动产生
+        # 相同结果时直接命中，连 QImage 构建和像素拷贝都省掉
+        cache_key = "pil:" + hashlib.blake2b(data, digest_size=16).hexdigest()
+        cached = QPixmapCache.find(cache_key)
+        if cached is not None and not cached.isNull():
+            return cached
+        self._last_buf = data
+        qimage = QImage(data, img.width, img.height, stride, qformat)
+        pixmap = QPixmap.fromImage(qimage)
+        QPixmapCache.insert(cache_key, pixmap)
+        return pixmap
+
+# ==============================================================================
+# SECTION 4: 应用程序入口点 (APPLICATION ENTRY POINT)
+# ==============================================================================
+if __name__ == '__main__':
+    if hasattr(Qt, 'AA_EnableHighDpiScaling'):
+        QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
+    # [性能优化] 2x 像素图会让 PIL->QImage->QPixmap 链路搬运翻倍的字节，
+    # 预览按固定尺寸创作时多半是浪费；提供 --no-hidpi 开关按需关闭
+    if hasattr(Qt, 'AA_UseHighDpiPixmaps') and '--no-hidpi' not in sys.argv:
+        QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
+    # [性能优化] 让 Qt 合并高频的鼠标移动/滚轮事件（Qt 5.14+），
+    # 与滑块防抖互补
+    if hasattr(Qt, 'AA_CompressHighFrequencyEvents'):
+        QApplication.setAttribute(Qt.AA_CompressHighFrequencyEvents, True)
+    # [性能优化] 共享 GL 上下文 + 双缓冲表面：多个控件展示 QPixmap 时
+    # 纹理上传可以复用，预览交互期间也不会撕裂。必须在 QApplication
+    # 构建之前设置
+    if hasattr(Qt, 'AA_ShareOpenGLContexts'):
+        QApplication.setAttribute(Qt.AA_ShareOpenGLContexts, True)
+    from PyQt5.QtGui import QSurfaceFormat
+    _fmt = QSurfaceFormat()
+    _fmt.setSwapBehavior(QSurfaceFormat.DoubleBuffer)
+    _fmt.setSwapInterval(1)
+    QSurfaceFormat.setDefaultFormat(_fmt)
+
+    app = QApplication(sys.argv)
+    app.setStyle("Fusion")
+    
+    main_window = IconForgeWindow()
+    main_window.show()
+    
     sys.exit(app.exec_())
\ No newline at end of file